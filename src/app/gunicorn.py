@@ -0,0 +1,13 @@
+"""
+Gunicorn configuration, used with ``gunicorn -c python:app.gunicorn``.
+
+The workers are forked from a master that may have loaded the application
+(``--preload``), so each one warms up on its own once forked.
+"""
+
+
+def post_worker_init(worker):
+    """Warm up the worker once it has loaded the application"""
+    from core.warmup import warm_up
+
+    warm_up()
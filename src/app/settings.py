@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -39,12 +41,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
-    'users',
-    'recipes',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'recipes.apps.RecipesConfig',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +58,27 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Middleware only serving the browser sessions of the admin, skipped by
+# core.middleware.BrowserMiddleware on the requests under these prefixes
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+API_PATH_PREFIXES = ('/api/', '/health')
+
+# Middleware of the production profile
+LEAN_MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'core.middleware.BrowserMiddleware',
+]
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -88,6 +113,142 @@ DATABASES = {
     }
 }
 
+# Seconds between the checks of an open connection when a request starts
+# (see core.receivers.check_connections), None for no checks
+RECIPE_DB_HEALTH_CHECK_INTERVAL = None
+
+# Read replicas, as a comma separated list of hosts sharing the
+# credentials of the primary. Tests read the primary through them.
+DATABASE_REPLICAS = []
+DB_REPLICA_HOSTS = os.environ.get('DB_REPLICA_HOSTS', '')
+for index, host in enumerate(filter(None, DB_REPLICA_HOSTS.split(','))):
+    alias = f'replica{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=host,
+        TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Models read from the replicas by the safe requests. The user versions
+# behind the ETags are read from the replica serving the data they tag.
+REPLICA_MODELS = (
+    'core.recipe',
+    'core.recipe_tags',
+    'core.recipe_ingredients',
+    'core.tag',
+    'core.ingredient',
+    'core.recipestats',
+    'core.userversion',
+)
+
+# How long a client reads from the primary after a write. The pins are
+# kept in the default cache, which must be shared between the processes.
+REPLICA_PIN_SECONDS = 10
+
+
+# Warm-up of the server processes (see core.warmup), run when the WSGI
+# application loads with DJANGO_WARM_UP=1. Servers loading it before
+# forking their workers leave it off and warm up each worker after the
+# fork instead, as the hook in app/gunicorn.py does.
+
+WARM_UP_ON_LOAD = os.environ.get('DJANGO_WARM_UP') == '1'
+
+
+# Request timing and logging
+
+SERVER_TIMING_HEADER = True
+
+# Requests slower than this many milliseconds log their queries
+REQUEST_SLOW_THRESHOLD = int(os.environ.get('REQUEST_SLOW_THRESHOLD', 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPE_ATTR_CACHE_TIMEOUT = 60 * 15
+
+# Serve the tag and ingredient autocomplete from an in-process index of
+# the names of up to this many users per model
+RECIPE_ATTR_PREFIX_INDEX = False
+
+RECIPE_ATTR_PREFIX_INDEX_SIZE = 1000
+
+USER_VERSION_CACHE_TIMEOUT = 60 * 15
+
+# Render the recipe, tag and ingredient lists from plain rows instead of
+# model instances and serializers, with the same output
+RECIPE_FAST_LISTS = False
+
+# Render the recipe lists holding tags or ingredients from the
+# denormalized card of each recipe, and the others from plain rows
+RECIPE_CARD_LISTS = False
+
+
+# Token authentication
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+AUTH_TOKEN_CACHE_TTL = 60
+
+AUTH_TOKEN_SHARED_CACHE = False
+
+AUTH_TOKEN_EXPIRE_AFTER = os.environ.get('AUTH_TOKEN_EXPIRE_AFTER')
+if AUTH_TOKEN_EXPIRE_AFTER is not None:
+    AUTH_TOKEN_EXPIRE_AFTER = int(AUTH_TOKEN_EXPIRE_AFTER)
+
+
+# Login
+
+# Threads hashing the login passwords, 0 to hash on the request thread
+LOGIN_HASH_WORKERS = 2
+
+# Logins allowed to wait for a hashing thread before refusing new ones
+LOGIN_HASH_QUEUE_SIZE = 16
+
+# Failed logins allowed per email and per client address, and the
+# seconds after which they are all forgiven
+LOGIN_EMAIL_FAILURES = (5, 300)
+
+LOGIN_IP_FAILURES = (20, 300)
+
+LOGIN_THROTTLE_MAX_KEYS = 10000
+
+
+# Full text search
+# https://www.postgresql.org/docs/current/textsearch-configuration.html
+
+RECIPE_SEARCH_CONFIG = 'english'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -131,4 +292,52 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+RECIPE_IMAGE_WORKERS = 2
+
+RECIPE_IMAGE_QUEUE_SIZE = 100
+
+AUTH_USER_MODEL = 'core.User'
+
+
+# Production profile, selected with DJANGO_PROFILE=production
+# https://docs.djangoproject.com/en/3.0/howto/deployment/checklist/
+
+if os.environ.get('DJANGO_PROFILE') == 'production':
+    DEBUG = False
+
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+    ALLOWED_HOSTS = list(
+        filter(None, os.environ.get('ALLOWED_HOSTS', '').split(','))
+    )
+
+    # Persistent connections, checked when a request starts at most once
+    # every RECIPE_DB_HEALTH_CHECK_INTERVAL seconds
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = int(
+            os.environ.get('DB_CONN_MAX_AGE', 600)
+        )
+    RECIPE_DB_HEALTH_CHECK_INTERVAL = 5
+
+    # The user versions behind the ETags, the cached lists and the replica
+    # pins are shared by all the workers, not kept by each process
+    if CACHES['default']['BACKEND'] == \
+            'django.core.cache.backends.locmem.LocMemCache':
+        raise ImproperlyConfigured(
+            'The production profile needs a shared CACHE_BACKEND'
+        )
+
+    # Cache the tokens there too, so that every worker rejects a revoked
+    # token at once
+    AUTH_TOKEN_SHARED_CACHE = True
+
+    MIDDLEWARE = LEAN_MIDDLEWARE
+
+    # The admin finds its middleware within BrowserMiddleware
+    SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
+    REST_FRAMEWORK = {
+        'DEFAULT_RENDERER_CLASSES': [
+            'rest_framework.renderers.JSONRenderer',
+        ],
+    }
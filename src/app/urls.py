@@ -18,7 +18,10 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import health
+
 urlpatterns = [
+    path('health', health, name='health'),
     path('admin/', admin.site.urls),
     path('api/users/', include('users.urls')),
     path('api/recipes/', include('recipes.urls')),
@@ -0,0 +1,46 @@
+"""
+Work gathered over a transaction and done once it commits.
+
+The model signals fire for every saved row and every changed relation,
+so a single API write sends several of them about the same recipe or
+user. ``defer`` lets their receivers add to one batch per transaction,
+flushed from a single ``transaction.on_commit`` callback, rather than
+each doing the work. Outside of a transaction the batch is flushed at
+once.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class _Batch:
+    """Commit callback flushing the items gathered in a transaction"""
+
+    def __init__(self, flush, using: str):
+        self.flush = flush
+        self.using = using
+        self.items = {}
+
+    def __call__(self):
+        self.flush(self.items, self.using)
+
+
+def defer(flush, gather, using: str = DEFAULT_DB_ALIAS):
+    """
+    Have gather(items) add to the dict of items that flush(items, using)
+    processes once the current transaction commits.
+
+    Each savepoint gets its own batch, so that rolling it back drops the
+    items gathered in it along with its commit callbacks. The atomic
+    blocks without savepoint, which Django opens around most writes,
+    are marked with None and cannot be rolled back on their own.
+    """
+    connection = transaction.get_connection(using)
+    savepoints = set(connection.savepoint_ids) - {None}
+    for sids, callback in connection.run_on_commit:
+        if isinstance(callback, _Batch) and callback.flush is flush and \
+                sids - {None} == savepoints:
+            gather(callback.items)
+            return
+
+    batch = _Batch(flush, using)
+    gather(batch.items)
+    transaction.on_commit(batch, using=using)
@@ -0,0 +1,286 @@
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+
+from django.contrib import auth
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, user_version_key
+from core.profiling import QueryRecorder, percentile
+from recipes.cache import invalidate_attr_lists
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'benchmarks',
+    'api.json'
+)
+PASSWORD = 'benchmark'
+# Absolute growth tolerated on top of --tolerance, absorbing the noise of
+# the endpoints that answer in well under a millisecond
+SLACK = {'p95': 1.0, 'peak_kb': 64}
+# Lists also timed with the user's version and cached lists dropped
+COLD_LISTS = ('tags', 'tags assigned_only', 'ingredients',
+              'ingredients assigned_only', 'recipes filtered')
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API endpoints in process"""
+    help = 'Time the API against a seeded database and compare the ' \
+           'results with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Store the results as the new baseline'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Relative growth of latency and memory deemed a regression'
+        )
+
+    def handle(self, *args, **options):
+        # The writes commit, so that their commit callbacks are measured,
+        # and the seeded users are deleted with their data afterwards
+        user_ids = self.seed(options)
+        try:
+            # The requests are made in process, as the test client host
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                results = self.run(options)
+        finally:
+            self.clean_up(user_ids)
+
+        self.report(results)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as file:
+                json.dump(
+                    {'vendor': connection.vendor, 'endpoints': results},
+                    file,
+                    indent=2,
+                    sort_keys=True
+                )
+                file.write('\n')
+            self.stdout.write(f'Saved baseline to {options["baseline"]}')
+        elif os.path.exists(options['baseline']):
+            with open(options['baseline']) as file:
+                self.compare(results, json.load(file), options)
+        else:
+            self.stdout.write(f'No baseline at {options["baseline"]}')
+
+    def seed(self, options) -> list:
+        """Seed the throwaway dataset and return the ids of its users"""
+        call_command(
+            'seed_recipes',
+            users=options['users'],
+            recipes=options['recipes'],
+            seed=options['seed'],
+            password=PASSWORD,
+            stdout=StringIO()
+        )
+        return list(
+            auth.get_user_model().objects
+            .filter(email__startswith=f'seed{options["seed"]}-')
+            .values_list('id', flat=True)
+        )
+
+    def clean_up(self, user_ids: list):
+        """Delete the seeded users, their data and their cached versions"""
+        with transaction.atomic():
+            auth.get_user_model().objects.filter(id__in=user_ids).delete()
+        cache.delete_many([user_version_key(pk) for pk in user_ids])
+
+    def cool(self, user_id: int):
+        """Drop the cached lists and version of the user"""
+        for model in (Tag, Ingredient):
+            invalidate_attr_lists(model, user_id)
+        cache.delete(user_version_key(user_id))
+
+    def heaviest_user(self, options):
+        """Return the seeded user owning the most recipes"""
+        return auth.get_user_model().objects \
+            .filter(email__startswith=f'seed{options["seed"]}-') \
+            .annotate(recipes=Count('recipe')) \
+            .order_by('-recipes', 'id') \
+            .first()
+
+    def endpoints(self, user) -> dict:
+        """Return the requests to time, made as the given user"""
+        tag = Tag.objects.filter(user=user) \
+            .annotate(recipes=Count('recipe')) \
+            .order_by('-recipes', 'id') \
+            .first()
+        recipe = Recipe.objects.filter(user=user).order_by('id').first()
+
+        anonymous = APIClient()
+        credentials = {'email': user.email, 'password': PASSWORD}
+        token = anonymous.post(reverse('users:login'), credentials)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.data["token"]}')
+
+        tags_url = reverse('recipes:tag-list')
+        autocomplete_url = reverse('recipes:tag-autocomplete')
+        ingredients_url = reverse('recipes:ingredient-list')
+        recipes_url = reverse('recipes:recipe-list')
+        detail_url = reverse('recipes:recipe-detail', args=[recipe.id])
+        payload = {
+            'title': 'Benchmark recipe',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': [tag.id],
+            'ingredients': [],
+        }
+        return {
+            'tags': lambda: client.get(tags_url),
+            'tags assigned_only':
+                lambda: client.get(tags_url, {'assigned_only': 1}),
+            'tags autocomplete':
+                lambda: client.get(autocomplete_url, {'prefix': tag.name[:2]}),
+            'ingredients': lambda: client.get(ingredients_url),
+            'ingredients assigned_only':
+                lambda: client.get(ingredients_url, {'assigned_only': 1}),
+            'recipes filtered':
+                lambda: client.get(recipes_url, {'tags': tag.id}),
+            'recipe detail': lambda: client.get(detail_url),
+            'recipe create':
+                lambda: client.post(recipes_url, payload, format='json'),
+            'recipe update': lambda: client.patch(
+                detail_url,
+                {'title': 'Benchmark update'},
+                format='json'
+            ),
+            'login':
+                lambda: anonymous.post(reverse('users:login'), credentials),
+        }
+
+    def run(self, options) -> dict:
+        """Time each endpoint, then the lists without their cached data"""
+        user = self.heaviest_user(options)
+        endpoints = self.endpoints(user)
+        results = {
+            name: self.measure(name, request, options)
+            for name, request in endpoints.items()
+        }
+        for name in COLD_LISTS:
+            results[f'{name} cold'] = self.measure(
+                name,
+                endpoints[name],
+                options,
+                prepare=lambda: self.cool(user.id)
+            )
+        return results
+
+    def measure(self, name: str, request, options, prepare=None) -> dict:
+        """
+        Return the latency, query and memory figures of a request, run
+        after prepare() each time when given
+        """
+        prepare = prepare or (lambda: None)
+        for _ in range(options['warmup']):
+            prepare()
+            self.check_response(name, request())
+
+        timings, counts, sql_times = [], [], []
+        for _ in range(options['runs']):
+            prepare()
+            with QueryRecorder() as recorder:
+                start = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - start) * 1000)
+            self.check_response(name, response)
+            counts.append(recorder.count)
+            sql_times.append(recorder.time)
+
+        # Tracing allocations slows the request down, so it is timed apart
+        prepare()
+        tracemalloc.start()
+        try:
+            self.check_response(name, request())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50': round(percentile(timings, 50), 3),
+            'p95': round(percentile(timings, 95), 3),
+            'p99': round(percentile(timings, 99), 3),
+            'queries': max(counts, default=0),
+            'sql_ms': round(statistics.median(sql_times or [0]), 3),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def check_response(self, name: str, response):
+        """Fail when a benchmarked request is not successful"""
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{name} answered {response.status_code}: '
+                f'{getattr(response, "data", response.content)}'
+            )
+
+    def report(self, results: dict):
+        """Print the figures of each endpoint"""
+        self.stdout.write(
+            f'{"endpoint":<32}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"queries":>9}{"sql ms":>9}{"peak kb":>10}'
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<32}{metrics["p50"]:>9.2f}{metrics["p95"]:>9.2f}'
+                f'{metrics["p99"]:>9.2f}{metrics["queries"]:>9}'
+                f'{metrics["sql_ms"]:>9.2f}{metrics["peak_kb"]:>10.1f}'
+            )
+
+    def compare(self, results: dict, baseline: dict, options):
+        """Fail when an endpoint regressed from the baseline"""
+        same_backend = baseline.get('vendor') == connection.vendor
+        if not same_backend:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline recorded on {baseline.get("vendor")}, only '
+                f'comparing query counts'
+            ))
+
+        regressions = []
+        for name, metrics in results.items():
+            expected = baseline['endpoints'].get(name)
+            if expected is None:
+                continue
+            if metrics['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: {metrics["queries"]} queries, '
+                    f'baseline {expected["queries"]}'
+                )
+            if not same_backend:
+                continue
+            for metric, slack in SLACK.items():
+                limit = expected[metric] * (1 + options['tolerance']) + slack
+                if metrics[metric] > limit:
+                    regressions.append(
+                        f'{name}: {metric} {metrics[metric]}, '
+                        f'baseline {expected[metric]}'
+                    )
+
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(self.style.ERROR(regression))
+            raise CommandError(
+                f'{len(regressions)} regressions against {options["baseline"]}'
+            )
+        self.stdout.write(self.style.SUCCESS('No regression'))
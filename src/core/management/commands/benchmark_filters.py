@@ -0,0 +1,110 @@
+import random
+import statistics
+import time
+
+from django.contrib import auth
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe, Tag
+
+
+class Command(BaseCommand):
+    """Django command to compare the query plans of the recipe tag filters"""
+    help = 'Seed a throwaway dataset and time each recipe filter strategy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-size', type=int, default=3)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print the query plan of each strategy'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user, tag_ids = self.seed(rng, options)
+            ids = tag_ids[:options['filter_size']]
+            recipes = Recipe.objects.filter(user=user)
+
+            self.stdout.write('Match all:')
+            self.compare(options, {
+                'join per id': self.join_per_id(recipes, ids),
+                'grouped having count': recipes.with_all('tags', ids),
+            })
+            self.stdout.write('Match any:')
+            self.compare(options, {
+                'join with distinct':
+                    recipes.filter(tags__id__in=ids).distinct(),
+                'subquery': recipes.with_any('tags', ids),
+            })
+
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        """Create a user with recipes linked to Zipf distributed tags"""
+        user = auth.get_user_model().objects.create_user(
+            f'benchmark-{rng.random()}@example.com'
+        )
+        Tag.objects.bulk_create([
+            Tag(user=user, name=f'Tag {i}') for i in range(options['tags'])
+        ])
+        tag_ids = list(
+            Tag.objects.filter(user=user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        weights = [1 / rank for rank in range(1, len(tag_ids) + 1)]
+
+        recipes = [
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=10, price=5)
+            for i in range(options['recipes'])
+        ]
+        tags = [
+            rng.choices(tag_ids, weights, k=options['tags_per_recipe'])
+            for _ in recipes
+        ]
+        Recipe.objects.bulk_create_with_relations(
+            recipes,
+            tags,
+            [[] for _ in recipes],
+            batch_size=1000
+        )
+        self.stdout.write(
+            f'Seeded {len(recipes)} recipes over {len(tag_ids)} tags'
+        )
+        return user, tag_ids
+
+    def join_per_id(self, queryset, ids):
+        """Match all ids by joining the through table once per id"""
+        for pk in ids:
+            queryset = queryset.filter(tags__id=pk)
+        return queryset
+
+    def compare(self, options, strategies: dict):
+        """Time each strategy and check they all return the same rows"""
+        results = {}
+        for name, queryset in strategies.items():
+            queryset = queryset.values_list('id', flat=True)
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                rows = list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = sorted(rows)
+
+            self.stdout.write(
+                f'  {name}: {len(rows)} rows, '
+                f'median {statistics.median(timings):.2f}ms, '
+                f'min {min(timings):.2f}ms'
+            )
+            if options['explain']:
+                self.stdout.write(queryset.explain())
+
+        if len({tuple(rows) for rows in results.values()}) != 1:
+            self.stderr.write(self.style.ERROR('  Strategies disagree!'))
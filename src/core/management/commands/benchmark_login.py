@@ -0,0 +1,116 @@
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.profiling import percentile
+from users.login import pool
+from users.throttling import login_throttle
+
+PASSWORD = 'benchmark'
+
+
+class Command(BaseCommand):
+    """Django command to measure the login throughput"""
+    help = 'Log in from concurrent clients and report the logins per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--logins', type=int, default=20,
+                            help='Logins made by each client')
+        parser.add_argument('--workers', type=int,
+                            default=settings.LOGIN_HASH_WORKERS)
+        parser.add_argument('--queue-size', type=int,
+                            default=settings.LOGIN_HASH_QUEUE_SIZE)
+
+    def handle(self, *args, **options):
+        # The clients log in from their own threads and connections, so
+        # the users are committed, and deleted afterwards
+        user_model = auth.get_user_model()
+        users = [
+            user_model.objects.create_user(
+                f'benchmark-login-{index}@example.com',
+                PASSWORD
+            )
+            for index in range(options['clients'])
+        ]
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                LOGIN_HASH_WORKERS=options['workers'],
+                LOGIN_HASH_QUEUE_SIZE=options['queue_size'],
+                REQUEST_SLOW_THRESHOLD=float('inf')
+            ):
+                pool.shutdown()
+                login_throttle.clear()
+                results = {
+                    'valid credentials': self.run(users, PASSWORD, options),
+                    'bad credentials': self.run(users, 'wrong', options),
+                }
+        finally:
+            pool.shutdown()
+            login_throttle.clear()
+            user_model.objects.filter(id__in=[u.id for u in users]).delete()
+
+        self.stdout.write(
+            f'{"scenario":<20}{"logins/s":>10}{"p50 ms":>9}{"p95 ms":>9}'
+            f'  statuses'
+        )
+        for name, result in results.items():
+            statuses = ', '.join(
+                f'{code}: {count}'
+                for code, count in sorted(result['statuses'].items())
+            )
+            self.stdout.write(
+                f'{name:<20}{result["rate"]:>10.1f}{result["p50"]:>9.2f}'
+                f'{result["p95"]:>9.2f}  {statuses}'
+            )
+
+    def run(self, users: list, password: str, options) -> dict:
+        """Log every user in from its own thread, and time the logins"""
+        timings, statuses = [], Counter()
+        lock = threading.Lock()
+        start = threading.Barrier(len(users) + 1)
+
+        def login(user):
+            client = APIClient()
+            credentials = {'email': user.email, 'password': password}
+            start.wait()
+            try:
+                for _ in range(options['logins']):
+                    begin = time.perf_counter()
+                    response = client.post(reverse('users:login'),
+                                           credentials)
+                    elapsed = (time.perf_counter() - begin) * 1000
+                    with lock:
+                        timings.append(elapsed)
+                        statuses[response.status_code] += 1
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=login, args=(user,)) for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        begin = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - begin
+
+        return {
+            'rate': len(timings) / duration,
+            'p50': statistics.median(timings),
+            'p95': percentile(timings, 95),
+            'statuses': statuses,
+        }
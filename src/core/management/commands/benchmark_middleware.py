@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from users.authentication import invalidate_user_tokens
+
+
+class Command(BaseCommand):
+    """Django command to measure the overhead of the middleware stacks"""
+    help = 'Time an API request through the full and the lean middleware ' \
+           'stacks, and without middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=2000)
+        parser.add_argument('--warmup', type=int, default=100)
+
+    def stacks(self) -> dict:
+        """Return the middleware stacks to compare"""
+        lean = list(settings.LEAN_MIDDLEWARE)
+        browser = 'core.middleware.BrowserMiddleware'
+        full = [path for path in lean if path != browser] + \
+            list(settings.BROWSER_MIDDLEWARE)
+        return {'none': [], 'lean': lean, 'full': full}
+
+    def handle(self, *args, **options):
+        # The requests are made in process, as the test client host
+        with transaction.atomic(), override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            DEBUG=False,
+            SERVER_TIMING_HEADER=True
+        ):
+            user = auth.get_user_model().objects.create_user(
+                'benchmark-middleware@example.com',
+                'benchmark'
+            )
+            token = Token.objects.create(user=user)
+            results = {
+                name: self.measure(middleware, token, options)
+                for name, middleware in self.stacks().items()
+            }
+            transaction.set_rollback(True)
+        invalidate_user_tokens(user.id)
+
+        floor = results['none']
+        self.stdout.write(f'{"stack":<8}{"median us":>12}{"overhead us":>14}')
+        for name, median in results.items():
+            self.stdout.write(
+                f'{name:<8}{median:>12.1f}{median - floor:>14.1f}'
+            )
+        self.stdout.write(
+            f'The lean stack saves {results["full"] - results["lean"]:.1f} '
+            f'us per API request'
+        )
+
+    def measure(self, middleware: list, token, options) -> float:
+        """Return the median latency of a request, in microseconds"""
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+
+        factory = RequestFactory()
+        url = reverse('recipes:tag-list')
+        auth_header = f'Token {token.key}'
+        timings = []
+        for run in range(options['warmup'] + options['runs']):
+            request = factory.get(url, HTTP_AUTHORIZATION=auth_header)
+            start = time.perf_counter()
+            response = handler.get_response(request)
+            elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                raise CommandError(
+                    f'{url} answered {response.status_code}: '
+                    f'{response.content}'
+                )
+            if run >= options['warmup']:
+                timings.append(elapsed * 1000000)
+        return statistics.median(timings)
@@ -0,0 +1,126 @@
+import statistics
+import time
+from io import StringIO
+
+from django.contrib import auth
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+from recipes.cache import invalidate_attr_lists
+from recipes.cards import refresh_cards
+from recipes.pagination import RecipePagination
+
+
+class Command(BaseCommand):
+    """Django command to compare the serializers with the row lists"""
+    help = 'Time the list endpoints rendered by the serializers and from ' \
+           'plain rows, checking both give the same output'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--tags', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cards', action='store_true',
+                            help='Render the recipe lists from their cards '
+                                 'instead of plain rows')
+
+    def handle(self, *args, **options):
+        # The requests are made in process, as the test client host
+        with transaction.atomic(), \
+                override_settings(ALLOWED_HOSTS=['testserver']):
+            call_command(
+                'seed_recipes',
+                users=options['users'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                seed=options['seed'],
+                stdout=StringIO()
+            )
+            user = auth.get_user_model().objects \
+                .filter(email__startswith=f'seed{options["seed"]}-') \
+                .annotate(recipes=Count('recipe')) \
+                .order_by('-recipes', 'id') \
+                .first()
+            if options['cards']:
+                # The cards of the seeded recipes are built on commit
+                refresh_cards(
+                    Recipe.objects.filter(user=user)
+                    .values_list('id', flat=True)
+                )
+            results = self.run(user, options)
+            transaction.set_rollback(True)
+        for model in (Tag, Ingredient):
+            invalidate_attr_lists(model, user.id)
+
+        self.stdout.write(
+            f'{"endpoint":<24}{"serializer ms":>15}'
+            f'{"cards ms" if options["cards"] else "rows ms":>10}'
+            f'{"speedup":>10}'
+        )
+        for name, (slow, fast) in results.items():
+            self.stdout.write(
+                f'{name:<24}{slow:>15.2f}{fast:>10.2f}{slow / fast:>9.1f}x'
+            )
+
+    def run(self, user, options) -> dict:
+        """Return the median latencies of each endpoint, per path"""
+        client = APIClient()
+        client.force_authenticate(user)
+        page = {'page_size': RecipePagination.max_page_size}
+        endpoints = {
+            'recipes': (reverse('recipes:recipe-list'), page),
+            'recipes expanded': (
+                reverse('recipes:recipe-list'),
+                dict(page, expand='tags,ingredients')
+            ),
+            'recipe titles': (
+                reverse('recipes:recipe-list'),
+                dict(page, fields='id,title')
+            ),
+            'tags': (reverse('recipes:tag-list'), {}),
+            'ingredients': (reverse('recipes:ingredient-list'), {}),
+        }
+
+        results = {}
+        for name, (url, params) in endpoints.items():
+            timings, contents = [], []
+            for fast in (False, True):
+                with override_settings(
+                    RECIPE_FAST_LISTS=fast,
+                    RECIPE_CARD_LISTS=fast and options['cards']
+                ):
+                    timing, content = self.measure(client, user, url,
+                                                   params, options)
+                timings.append(timing)
+                contents.append(content)
+            if contents[0] != contents[1]:
+                raise CommandError(f'{name}: the outputs differ')
+            results[name] = timings
+        return results
+
+    def measure(self, client, user, url: str, params: dict, options):
+        """Return the median latency and the content of a request"""
+        timings = []
+        for _ in range(options['runs']):
+            # Time the rendering of the lists, not the attr list cache
+            for model in (Tag, Ingredient):
+                invalidate_attr_lists(model, user.id)
+            start = time.perf_counter()
+            response = client.get(url, params)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{url} answered {response.status_code}: {response.data}'
+                )
+        return statistics.median(timings), response.content
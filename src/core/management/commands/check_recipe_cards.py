@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Recipe
+from recipes.cards import refresh_cards, stale_cards
+
+
+class Command(BaseCommand):
+    """Django command to compare the recipe cards with their recipes"""
+    help = 'Report the recipe cards that differ from a fresh build'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--fix', action='store_true',
+                            help='Rebuild the stale cards')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        ids = Recipe.objects.using(using).values_list('id', flat=True)
+        stale = stale_cards(ids, using)
+        if not stale:
+            self.stdout.write(self.style.SUCCESS('All recipe cards are fresh'))
+            return
+
+        shown = ', '.join(str(pk) for pk in stale[:20])
+        if len(stale) > 20:
+            shown += ', ...'
+        if not options['fix']:
+            raise CommandError(f'{len(stale)} stale recipe cards: {shown}')
+
+        refresh_cards(stale, using)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(stale)} stale recipe cards: {shown}'
+        ))
@@ -0,0 +1,336 @@
+import csv
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from io import StringIO
+from itertools import islice
+
+from django.contrib import auth
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_changed
+
+# Separates the tag and ingredient names of a CSV cell, as in the exports
+NAME_SEPARATOR = ';'
+# Separates the names in the staging table, it cannot appear in a name
+STAGING_SEPARATOR = '\x1f'
+
+STAGING_TABLE = """
+    CREATE TEMPORARY TABLE import_recipe (
+        id bigint PRIMARY KEY,
+        user_id bigint NOT NULL,
+        title text NOT NULL,
+        time_minutes integer NOT NULL,
+        price numeric(5, 2) NOT NULL,
+        link text,
+        tags text,
+        ingredients text
+    ) ON COMMIT DROP
+"""
+
+POSTGRES_ALLOCATE_IDS = """
+    SELECT nextval(pg_get_serial_sequence('core_recipe', 'id'))
+    FROM generate_series(1, %s)
+"""
+
+# The cards are built once the batch commits (see recipes.cards)
+POSTGRES_INSERT_RECIPES = """
+    INSERT INTO core_recipe
+        (id, user_id, title, time_minutes, price, link, renditions_ready,
+         card)
+    SELECT id, user_id, title, time_minutes, price, coalesce(link, ''), false,
+        ''
+    FROM import_recipe
+"""
+
+# Create the missing names of each user, the first spelling of a name wins
+POSTGRES_INSERT_ATTRS = """
+    INSERT INTO {table} (user_id, name)
+    SELECT DISTINCT ON (s.user_id, lower(n.name)) s.user_id, n.name
+    FROM import_recipe s
+    CROSS JOIN LATERAL unnest(string_to_array(s.{relation}, %s)) AS n(name)
+    ORDER BY s.user_id, lower(n.name), s.id
+    ON CONFLICT (user_id, lower(name)) DO NOTHING
+    RETURNING id, user_id
+"""
+
+POSTGRES_INSERT_LINKS = """
+    INSERT INTO {through} (recipe_id, {column})
+    SELECT DISTINCT s.id, a.id
+    FROM import_recipe s
+    CROSS JOIN LATERAL unnest(string_to_array(s.{relation}, %s)) AS n(name)
+    JOIN {table} a ON a.user_id = s.user_id AND lower(a.name) = lower(n.name)
+"""
+
+RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+class Command(BaseCommand):
+    """Django command to load recipes from a CSV or JSON lines file"""
+    help = 'Import recipes with the names of their tags and ingredients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'jsonl'),
+            help='Format of the file, guessed from its extension by default'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the owner of every recipe, instead of a '
+                 'user column'
+        )
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        self.users = {}
+        self.owner_id = None
+        if options['user']:
+            self.owner_id = self.user_ids([options['user']]).get(
+                options['user']
+            )
+            if self.owner_id is None:
+                raise CommandError(f'Unknown user {options["user"]}')
+
+        file_format = options['format'] or self.guess_format(options['path'])
+        if connection.vendor == 'postgresql':
+            load = self.load_with_copy
+        else:
+            load = self.load_with_bulk_create
+
+        imported = 0
+        self.skipped = 0
+        with open(options['path'], newline='', encoding='utf-8') as file:
+            rows = self.clean_rows(self.read_rows(file, file_format))
+            while True:
+                batch = self.resolve_users(
+                    list(islice(rows, options['batch_size']))
+                )
+                if batch is None:
+                    break
+                if batch:
+                    with transaction.atomic():
+                        load(batch)
+                imported += len(batch)
+                self.stdout.write(f'Imported {imported} recipes...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes, skipped {self.skipped} rows'
+        ))
+
+    def guess_format(self, path: str) -> str:
+        """Return the format matching the extension of the file"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.jsonl', '.ndjson'):
+            return 'jsonl'
+        raise CommandError(f'Cannot guess the format of {path}, use --format')
+
+    def read_rows(self, file, file_format: str):
+        """Yield the line number and the raw fields of each recipe"""
+        if file_format == 'csv':
+            yield from enumerate(csv.DictReader(file), start=2)
+            return
+
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except ValueError as error:
+                yield line, error
+
+    def clean_rows(self, rows):
+        """Yield the valid recipes, reporting the rows that are skipped"""
+        for line, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                yield self.clean(row)
+            except (AttributeError, KeyError, TypeError, ValueError,
+                    InvalidOperation) as error:
+                self.skipped += 1
+                self.stderr.write(f'Line {line}: {error!r}')
+
+    def clean(self, row: dict) -> dict:
+        """Validate a recipe the way the recipe serializer would"""
+        title = row['title'].strip()
+        if not title or len(title) > 255:
+            raise ValueError('title must hold 1 to 255 characters')
+
+        price = Decimal(str(row['price'])).quantize(Decimal('0.01'))
+        if abs(price) >= 1000:
+            raise ValueError('price must have at most 5 digits')
+
+        link = row.get('link') or ''
+        if len(link) > 255:
+            raise ValueError('link must hold at most 255 characters')
+
+        return {
+            'email': row['user'] if self.owner_id is None else None,
+            'title': title,
+            'time_minutes': int(row['time_minutes']),
+            'price': price,
+            'link': link,
+            'tags': self.clean_names(row.get('tags')),
+            'ingredients': self.clean_names(row.get('ingredients')),
+        }
+
+    def clean_names(self, names) -> list:
+        """Return the names of a list or of a separated string"""
+        if not names:
+            return []
+        if isinstance(names, str):
+            names = names.split(NAME_SEPARATOR)
+
+        names = [name.replace(STAGING_SEPARATOR, '').strip() for name in names]
+        if any(len(name) > 255 for name in names):
+            raise ValueError('names must hold at most 255 characters')
+        return [name for name in names if name]
+
+    def user_ids(self, emails) -> dict:
+        """Return the ids of the users with the given emails"""
+        manager = auth.get_user_model().objects
+        normalized = {
+            email: manager.normalize_email(email) for email in emails
+        }
+        ids = dict(
+            manager.filter(email__in=set(normalized.values()))
+            .values_list('email', 'id')
+        )
+        return {
+            email: ids[normal]
+            for email, normal in normalized.items() if normal in ids
+        }
+
+    def resolve_users(self, batch: list):
+        """Set the owner id of each recipe, dropping those of unknown users"""
+        if not batch:
+            return None
+        if self.owner_id:
+            for row in batch:
+                del row['email']
+                row['user_id'] = self.owner_id
+            return batch
+
+        unknown = {row['email'] for row in batch} - self.users.keys()
+        self.users.update(self.user_ids(unknown))
+
+        resolved = []
+        for row in batch:
+            email = row.pop('email')
+            if email in self.users:
+                row['user_id'] = self.users[email]
+                resolved.append(row)
+            else:
+                self.skipped += 1
+                self.stderr.write(f'Unknown user {email}')
+        return resolved
+
+    def load_with_copy(self, batch: list):
+        """Stage the batch with COPY and insert it with set based queries"""
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_ALLOCATE_IDS, [len(batch)])
+            ids = [row[0] for row in cursor.fetchall()]
+
+            buffer = StringIO()
+            writer = csv.writer(buffer)
+            for pk, row in zip(ids, batch):
+                writer.writerow([
+                    pk, row['user_id'], row['title'], row['time_minutes'],
+                    row['price'], row['link'],
+                    STAGING_SEPARATOR.join(row['tags']),
+                    STAGING_SEPARATOR.join(row['ingredients']),
+                ])
+            buffer.seek(0)
+            cursor.execute(STAGING_TABLE)
+            cursor.copy_expert(
+                'COPY import_recipe FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(POSTGRES_INSERT_RECIPES)
+
+            created = {}
+            for relation, model in RELATIONS:
+                field = Recipe._meta.get_field(relation)
+                names = {
+                    'relation': relation,
+                    'table': model._meta.db_table,
+                    'through': field.remote_field.through._meta.db_table,
+                    'column': field.m2m_reverse_name(),
+                }
+                cursor.execute(
+                    POSTGRES_INSERT_ATTRS.format(**names),
+                    [STAGING_SEPARATOR]
+                )
+                created[model] = cursor.fetchall()
+                cursor.execute(
+                    POSTGRES_INSERT_LINKS.format(**names),
+                    [STAGING_SEPARATOR]
+                )
+
+        for model, rows in created.items():
+            if rows:
+                bulk_changed.send(
+                    sender=model,
+                    user_ids={user_id for _, user_id in rows},
+                    pks=[pk for pk, _ in rows]
+                )
+        bulk_changed.send(
+            sender=Recipe,
+            user_ids={row['user_id'] for row in batch},
+            pks=ids
+        )
+
+    def load_with_bulk_create(self, batch: list):
+        """Insert the batch with bulk_create, resolving names per user"""
+        rows_by_user = defaultdict(list)
+        for row in batch:
+            rows_by_user[row['user_id']].append(row)
+
+        created = {}
+        for relation, model in RELATIONS:
+            created[model] = {}
+            for user_id, rows in rows_by_user.items():
+                names = {name for row in rows for name in row[relation]}
+                ids, new_ids = model.objects.get_or_create_by_names(
+                    user_id,
+                    names
+                )
+                if new_ids:
+                    created[model][user_id] = new_ids
+                unknown = names - set(ids)
+                if unknown:
+                    raise CommandError(
+                        f'{relation.capitalize()} deleted during the '
+                        f'import: {", ".join(sorted(unknown))}'
+                    )
+                for row in rows:
+                    row[relation] = [ids[name] for name in row[relation]]
+
+        Recipe.objects.bulk_create_with_relations(
+            [
+                Recipe(
+                    user_id=row['user_id'],
+                    title=row['title'],
+                    time_minutes=row['time_minutes'],
+                    price=row['price'],
+                    link=row['link']
+                ) for row in batch
+            ],
+            [row['tags'] for row in batch],
+            [row['ingredients'] for row in batch]
+        )
+
+        for model, new_ids in created.items():
+            if new_ids:
+                bulk_changed.send(
+                    sender=model,
+                    user_ids=set(new_ids),
+                    pks=[pk for pks in new_ids.values() for pk in pks]
+                )
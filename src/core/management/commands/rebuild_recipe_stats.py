@@ -0,0 +1,32 @@
+from django.contrib import auth
+from django.core.management.base import BaseCommand, CommandError
+
+from core import stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe stats rollups"""
+    help = 'Recompute the per-user recipe stats from the recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'emails',
+            nargs='*',
+            help='Rebuild the stats of these users only'
+        )
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users rebuilt in each transaction')
+
+    def handle(self, *args, **options):
+        users = auth.get_user_model().objects.using(options['database'])
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+        user_ids = list(users.order_by('id').values_list('id', flat=True))
+        if options['emails'] and len(user_ids) != len(options['emails']):
+            raise CommandError('Unknown user email')
+
+        size = options['chunk_size']
+        for start in range(0, len(user_ids), size):
+            stats.rebuild(user_ids[start:start + size], options['database'])
+        self.stdout.write(f'Rebuilt the recipe stats of {len(user_ids)} users')
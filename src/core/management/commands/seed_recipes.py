@@ -0,0 +1,205 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.contrib import auth
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe, capped_batch_size
+from core.signals import bulk_changed
+
+DISHES = ('soup', 'salad', 'stew', 'pie', 'curry', 'bowl', 'roast', 'cake')
+USERS_PER_CHUNK = 100
+
+
+class Command(BaseCommand):
+    """Django command to seed a synthetic dataset for scale testing"""
+    help = 'Deterministically create users with skewed recipe collections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=500,
+            help='Size of the tag vocabulary shared by the users'
+        )
+        parser.add_argument(
+            '--ingredients',
+            type=int,
+            default=2000,
+            help='Size of the ingredient vocabulary shared by the users'
+        )
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.email_prefix = f'seed{options["seed"]}-'
+
+        user_model = auth.get_user_model()
+        if user_model.objects.filter(
+                email__startswith=self.email_prefix).exists():
+            raise CommandError(
+                f'Seed {options["seed"]} was already loaded, use another one'
+            )
+
+        user_ids = self.create_users(user_model)
+        counts = self.recipe_counts(len(user_ids))
+        vocabularies = {
+            'tags': self.zipf_cum_weights(options['tags']),
+            'ingredients': self.zipf_cum_weights(options['ingredients']),
+        }
+
+        created = 0
+        for start in range(0, len(user_ids), USERS_PER_CHUNK):
+            chunk = user_ids[start:start + USERS_PER_CHUNK]
+            with transaction.atomic():
+                names = {
+                    relation: self.create_vocabularies(model, relation, chunk)
+                    for relation, model in (('tags', Tag),
+                                            ('ingredients', Ingredient))
+                }
+                recipes = self.generate_recipes(
+                    chunk,
+                    counts[start:start + USERS_PER_CHUNK],
+                    names,
+                    vocabularies
+                )
+                while True:
+                    batch = list(
+                        itertools.islice(recipes, options['batch_size'])
+                    )
+                    if not batch:
+                        break
+                    Recipe.objects.bulk_create_with_relations(*zip(*batch))
+                    created += len(batch)
+            self.stdout.write(f'Created {created} recipes...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(user_ids)} users and {created} recipes'
+        ))
+
+    def create_users(self, user_model) -> list:
+        """Create the users sharing a single password hash"""
+        salt = f'{self.rng.getrandbits(64):016x}'
+        password = make_password(self.options['password'], salt)
+        self.bulk_create(user_model, [
+            user_model(
+                email=f'{self.email_prefix}{i}@example.com',
+                name=f'Seed user {i}',
+                password=password
+            ) for i in range(self.options['users'])
+        ])
+        return list(
+            user_model.objects.filter(email__startswith=self.email_prefix)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+    def bulk_create(self, model, objs: list):
+        """Insert the rows in batches the backend accepts"""
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        model.objects.bulk_create(
+            objs,
+            batch_size=capped_batch_size(
+                connection,
+                fields,
+                objs,
+                self.options['batch_size']
+            )
+        )
+
+    def recipe_counts(self, users: int) -> list:
+        """Split the recipes between the users along a Pareto tail"""
+        weights = [self.rng.paretovariate(1.16) for _ in range(users)]
+        total = sum(weights)
+        counts = [
+            int(self.options['recipes'] * weight / total) for weight in weights
+        ]
+        remainder = self.options['recipes'] - sum(counts)
+        ranked = sorted(range(users), key=weights.__getitem__, reverse=True)
+        for i in ranked[:remainder]:
+            counts[i] += 1
+        return counts
+
+    def zipf_cum_weights(self, size: int) -> list:
+        """Return the cumulative Zipf weights of the vocabulary ranks"""
+        return list(itertools.accumulate(
+            1 / rank for rank in range(1, size + 1)
+        ))
+
+    def vocabulary_size(self, size: int) -> int:
+        """Draw how many of the most common names a user knows"""
+        base = max(1, size // 20)
+        return min(size, int(base * self.rng.paretovariate(1.5)))
+
+    def create_vocabularies(self, model, relation: str, user_ids) -> dict:
+        """Create the most common names of each user, by rank"""
+        size = self.options[relation]
+        self.bulk_create(model, [
+            model(user_id=user_id, name=f'{relation[:-1]} {rank}')
+            for user_id in user_ids
+            for rank in range(1, self.vocabulary_size(size) + 1)
+        ])
+
+        names = {user_id: [] for user_id in user_ids}
+        rows = model.objects.filter(user_id__in=user_ids) \
+            .order_by('id') \
+            .values_list('user_id', 'id', 'name')
+        for user_id, pk, name in rows:
+            names[user_id].append((pk, name))
+
+        bulk_changed.send(
+            sender=model,
+            user_ids=set(user_ids),
+            pks=[pk for pairs in names.values() for pk, _ in pairs]
+        )
+        return names
+
+    def pick(self, names: list, cum_weights: list, average: int) -> list:
+        """Pick names of a user, favouring the most common ones"""
+        if not names:
+            return []
+        k = self.rng.randint(0, 2 * average)
+        return self.rng.choices(names, cum_weights=cum_weights[:len(names)],
+                                k=k)
+
+    def generate_recipes(self, user_ids, counts, names, vocabularies):
+        """Yield the recipes of the users with their tag and ingredient ids"""
+        for user_id, count in zip(user_ids, counts):
+            for _ in range(count):
+                tags = self.pick(
+                    names['tags'][user_id],
+                    vocabularies['tags'],
+                    self.options['tags_per_recipe']
+                )
+                ingredients = self.pick(
+                    names['ingredients'][user_id],
+                    vocabularies['ingredients'],
+                    self.options['ingredients_per_recipe']
+                )
+                main = ingredients[0][1] if ingredients else 'water'
+                recipe = Recipe(
+                    user_id=user_id,
+                    title=f'{main} {self.rng.choice(DISHES)}'.capitalize(),
+                    time_minutes=int(self.rng.lognormvariate(3.3, 0.6)) + 1,
+                    price=Decimal(
+                        f'{min(self.rng.lognormvariate(2, 0.6), 999):.2f}'
+                    )
+                )
+                yield (
+                    recipe,
+                    [pk for pk, _ in tags],
+                    [pk for pk, _ in ingredients]
+                )
@@ -1,20 +1,81 @@
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Seconds to wait before giving up'
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.1,
+            help='Seconds to wait after the first failed attempt, doubled '
+                 'after each further one'
+        )
+        parser.add_argument('--max-delay', type=float, default=5)
+        parser.add_argument(
+            '--migrated',
+            action='store_true',
+            help='Also wait until no migration is left to apply'
+        )
+
     def handle(self, *args, **options):
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        self.retry(lambda: self.connect(connection), deadline, options)
+        self.stdout.write(self.style.SUCCESS('Database available!'))
+
+        if options['migrated']:
+            self.stdout.write('Waiting for migrations...')
+            self.retry(lambda: self.pending(connection), deadline, options)
+            self.stdout.write(self.style.SUCCESS('Database migrated!'))
+
+    def retry(self, attempt, deadline: float, options):
+        """
+        Call the attempt, which returns the reason it failed if any, with
+        an exponential backoff until it succeeds or the deadline passes.
+        """
+        delay = options['delay']
+        while True:
             try:
-                db_conn = connections['default']
+                reason = attempt()
             except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+                reason = 'Database unavailable'
+            if not reason:
+                return
+
+            if time.monotonic() + delay > deadline:
+                raise CommandError(
+                    f'{reason}, gave up after {options["timeout"]} seconds'
+                )
+            self.stdout.write(f'{reason}, waiting {delay:g} seconds...')
+            time.sleep(delay)
+            delay = min(delay * 2, options['max_delay'])
+
+    def connect(self, connection):
+        """Open a connection and make a round trip to the database"""
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return None
+
+    def pending(self, connection):
+        """Return how many migrations are left to apply, if any"""
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if plan:
+            return f'{len(plan)} migrations pending'
+        return None
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+from core.profiling import QueryRecorder
+from core.routers import reading_from, replica_reads
+
+logger = logging.getLogger('core.requests')
+
+
+class RequestTimingMiddleware:
+    """
+    Time each request and the SQL it runs, without relying on DEBUG.
+
+    The time spent in queries, in the view (queries included), in the
+    serializers building the representation of the response and in
+    rendering it to bytes is sent back in a Server-Timing header and
+    logged as a JSON line. Requests slower than REQUEST_SLOW_THRESHOLD
+    milliseconds are logged as warnings along with their queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._timing = {}
+        start = time.perf_counter()
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        timings = {'db': recorder.time}
+        marks = request._timing
+        if 'view' in marks:
+            timings['view'] = (
+                marks.get('render', end) - marks['view'] -
+                marks.get('serialize', 0.0)
+            ) * 1000
+        if 'serialize' in marks:
+            timings['serialize'] = marks['serialize'] * 1000
+        if 'render' in marks:
+            timings['render'] = (end - marks['render']) * 1000
+        timings['total'] = (end - start) * 1000
+
+        if settings.SERVER_TIMING_HEADER:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={value:.2f}' for name, value in timings.items()
+            )
+        self.log(request, response, timings, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing['view'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called last, just before the response is rendered
+        request._timing['render'] = time.perf_counter()
+        return response
+
+    def log(self, request, response, timings: dict, recorder: QueryRecorder):
+        """Log the timings of the request, and the queries of slow ones"""
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+        }
+        record.update(
+            (f'{name}_ms', round(value, 2)) for name, value in timings.items()
+        )
+
+        if timings['total'] > settings.REQUEST_SLOW_THRESHOLD:
+            record['sql'] = [
+                {
+                    'alias': query['alias'],
+                    'sql': query['sql'],
+                    'ms': round(query['time'], 2),
+                } for query in recorder.queries
+            ]
+            logger.warning(json.dumps(record))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let the safe requests read from the database replicas.
+
+    A client that sent a write request, identified by its Authorization
+    header or session cookie, is pinned to the primary for
+    REPLICA_PIN_SECONDS so that it reads its own writes.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = self.pin_key(request)
+        if request.method in self.safe_methods:
+            allowed = not (key and cache.get(key))
+        else:
+            allowed = False
+
+        with replica_reads(allowed) as replica:
+            response = self.get_response(request)
+
+        if request.method not in self.safe_methods and key:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content,
+                replica
+            )
+        return response
+
+    def pin_key(self, request):
+        """Return the cache key pinning the client to the primary"""
+        credentials = request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f'replica-pin:{digest}'
+
+    def stream(self, content, replica):
+        """Keep the replica of the request while its content is streamed"""
+        iterator = iter(content)
+        while True:
+            with reading_from(replica):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            yield chunk
+
+
+class BrowserMiddleware:
+    """
+    Run the middleware of browser sessions outside of the API.
+
+    The BROWSER_MIDDLEWARE (sessions, CSRF, authentication, messages and
+    clickjacking protection) only serve the admin; the token authenticated
+    requests under API_PATH_PREFIXES skip them. Of their hooks, only
+    process_view is supported.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.API_PATH_PREFIXES)
+        self.view_middleware = []
+
+        handler = get_response
+        for path in reversed(settings.BROWSER_MIDDLEWARE):
+            middleware = import_string(path)(handler)
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            handler = convert_exception_to_response(middleware)
+        self.browser_response = handler
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefixes):
+            return self.get_response(request)
+        return self.browser_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.path_info.startswith(self.prefixes):
+            return None
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+        return None
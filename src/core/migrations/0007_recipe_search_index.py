@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import migrations
+
+# The text of the existing recipes, as core.search indexes it
+POSTGRES_INDEX = """
+    UPDATE core_recipe AS r SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')), 'B')
+"""
+
+SQLITE_INDEX = """
+    INSERT INTO core_recipe_fts (rowid, title, tags, ingredients)
+    SELECT r.id, r.title, (
+        SELECT group_concat(t.name, ' ')
+        FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), (
+        SELECT group_concat(i.name, ' ')
+        FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    )
+    FROM core_recipe r
+"""
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE core_recipe ADD COLUMN search_vector tsvector'
+        )
+        schema_editor.execute(
+            'CREATE INDEX core_recipe_search_vector_idx '
+            'ON core_recipe USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            POSTGRES_INDEX,
+            {'config': settings.RECIPE_SEARCH_CONFIG}
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE core_recipe_fts '
+            'USING fts5(title, tags, ingredients, '
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(SQLITE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE core_recipe DROP COLUMN search_vector'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE core_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 3.0.6 on 2026-10-17 00:52
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+ATTRS = (
+    ('Tag', 'tags', 'tag_id'),
+    ('Ingredient', 'ingredients', 'ingredient_id'),
+)
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge attrs a user has under the same name, ignoring case"""
+    db = schema_editor.connection.alias
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, relation, column in ATTRS:
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(relation).remote_field.through
+        names = model.objects.using(db).annotate(name_lower=Lower('name'))
+        groups = names.values('user_id', 'name_lower') \
+            .annotate(count=models.Count('id'), keep=models.Min('id')) \
+            .filter(count__gt=1)
+
+        for group in groups.iterator():
+            duplicates = names.filter(
+                user_id=group['user_id'],
+                name_lower=group['name_lower']
+            ).exclude(id=group['keep']).values_list('id', flat=True)
+            linked = through.objects.using(db) \
+                .filter(**{column: group['keep']}) \
+                .values('recipe_id')
+            for duplicate in list(duplicates):
+                through.objects.using(db) \
+                    .filter(**{column: duplicate}) \
+                    .exclude(recipe_id__in=linked) \
+                    .update(**{column: group['keep']})
+                model.objects.using(db).filter(id=duplicate).delete()
+
+
+def create_unique_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for model_name, _, _ in ATTRS:
+        table = f'core_{model_name.lower()}'
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {table}_user_lower_name_uniq '
+            f'ON {table} (user_id, LOWER(name))'
+        )
+
+
+def drop_unique_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('postgresql', 'sqlite'):
+        return
+    for model_name, _, _ in ATTRS:
+        table = f'core_{model_name.lower()}'
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_user_lower_name_uniq'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.RunPython(create_unique_indexes, drop_unique_indexes),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'name'], name='ingredient_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ),
+    ]
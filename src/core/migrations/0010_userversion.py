@@ -0,0 +1,34 @@
+# Generated by Django 3.0.6 on 2026-10-17 01:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_versions(apps, schema_editor):
+    """Give every existing user a counter, deletions only increment them"""
+    User = apps.get_model('core', 'User')
+    UserVersion = apps.get_model('core', 'UserVersion')
+    db_alias = schema_editor.connection.alias
+    UserVersion.objects.using(db_alias).bulk_create([
+        UserVersion(user_id=pk) for pk in
+        User.objects.using(db_alias).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_renditions_ready'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.0.6 on 2026-10-17 03:12
+
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # LIKE 'prefix%' only uses an index with the pattern operator class
+    # unless the database uses the C collation
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_lower_name_prefix '
+            f'ON {table} (user_id, LOWER(name) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {table}_user_lower_name_prefix'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_userversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.6 on 2026-10-17 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_attr_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('data', models.TextField(default='{}')),
+            ],
+            options={
+                'verbose_name_plural': 'recipe stats',
+            },
+        ),
+    ]
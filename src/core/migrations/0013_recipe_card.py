@@ -0,0 +1,54 @@
+# Generated by Django 3.0.6 on 2026-10-17 01:38
+
+import json
+
+from django.db import migrations, models
+
+
+def _card(recipe) -> str:
+    return json.dumps({
+        'id': recipe.id,
+        'title': recipe.title,
+        'time_minutes': recipe.time_minutes,
+        'ingredients': sorted(
+            ({'id': i.id, 'name': i.name} for i in recipe.ingredients.all()),
+            key=lambda item: item['id']
+        ),
+        'tags': sorted(
+            ({'id': t.id, 'name': t.name} for t in recipe.tags.all()),
+            key=lambda item: item['id']
+        ),
+        'price': f'{recipe.price:.2f}',
+        'link': recipe.link,
+    }, separators=(',', ':'))
+
+
+def fill_cards(apps, schema_editor):
+    """Build the card of every recipe, as recipes.cards does"""
+    Recipe = apps.get_model('core', 'Recipe')
+    recipes = Recipe.objects.using(schema_editor.connection.alias)
+    ids = list(recipes.order_by('id').values_list('id', flat=True))
+    for i in range(0, len(ids), 500):
+        batch = list(
+            recipes.filter(id__in=ids[i:i + 500])
+            .prefetch_related('tags', 'ingredients')
+        )
+        for recipe in batch:
+            recipe.card = _card(recipe)
+        recipes.bulk_update(batch, ['card'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='card',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_cards, migrations.RunPython.noop),
+    ]
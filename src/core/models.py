@@ -1,10 +1,31 @@
 import uuid
 import os
-from django.db import models
+from django.db import models, connections, transaction, IntegrityError
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django.contrib.auth.models import (
     BaseUserManager, AbstractBaseUser, PermissionsMixin
 )
 from django.conf import settings
+from django.core.cache import cache
+
+from core import batching
+from core.signals import bulk_changed
+
+# Names lowered per query, within the 999 variables of SQLite
+LOWERED_BATCH_SIZE = 500
+
+
+def capped_batch_size(connection, fields, objs, batch_size=None):
+    """
+    Return the batch size to bulk insert the objects with, at most the
+    given one.
+
+    Django 3.0 does not cap an explicit batch size to the backend limit
+    (e.g. 999 variables or 500 compound selects on SQLite).
+    """
+    max_batch_size = connection.ops.bulk_batch_size(fields, objs)
+    return min(batch_size or max_batch_size, max_batch_size) or None
 
 
 def recipe_image_file_path(instance, filename: str):
@@ -46,6 +67,96 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeAttrQuerySet(models.QuerySet):
+
+    def by_names(self, user, names):
+        """
+        Filter the user's attrs by name, ignoring case.
+
+        The comparison is done on LOWER(name), which is what the
+        (user_id, LOWER(name)) unique index covers, the names being
+        lowered by the database as well.
+        """
+        return self.annotate(name_lower=Lower('name')).filter(
+            user=user,
+            name_lower__in=[Lower(Value(name)) for name in set(names)]
+        )
+
+    def lowered(self, names) -> dict:
+        """
+        Return the names as the database lowers them, by name.
+
+        LOWER() differs from str.lower() outside of ASCII, SQLite only
+        lowering the ASCII letters for instance.
+        """
+        names = list(set(names))
+        lowered = {}
+        with connections[self.db].cursor() as cursor:
+            for start in range(0, len(names), LOWERED_BATCH_SIZE):
+                batch = names[start:start + LOWERED_BATCH_SIZE]
+                cursor.execute(
+                    'SELECT ' + ', '.join(['LOWER(%s)'] * len(batch)),
+                    batch
+                )
+                lowered.update(zip(batch, cursor.fetchone()))
+        return lowered
+
+    def get_or_create_by_name(self, user, name: str):
+        """Return the user's attr with this name, creating it if missing"""
+        try:
+            return self.by_names(user, [name]).get(), False
+        except self.model.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic(using=self.db):
+                return self.create(user=user, name=name), True
+        except IntegrityError:
+            return self.by_names(user, [name]).get(), False
+
+    def get_or_create_by_names(self, user_id: int, names):
+        """
+        Return the ids of the user's attrs by the given names, creating
+        the missing ones, and the ids of those.
+
+        The names are looked up with one query and the missing ones
+        inserted with one bulk insert, ignoring the conflicts with attrs
+        created concurrently, which the second lookup returns. A name
+        whose attr is deleted meanwhile is left out. The caller sends
+        bulk_changed for the new ids.
+        """
+        if not names:
+            return {}, []
+        lowered = self.lowered(names)
+        ids = dict(
+            self.by_names(user_id, names).values_list('name_lower', 'id')
+        )
+        missing = {}
+        for name in names:
+            if lowered[name] not in ids:
+                missing.setdefault(lowered[name], name)
+
+        created = {}
+        if missing:
+            self.bulk_create(
+                [self.model(user_id=user_id, name=name)
+                 for name in missing.values()],
+                ignore_conflicts=True
+            )
+            created = dict(
+                self.by_names(user_id, missing.values())
+                .values_list('name_lower', 'id')
+            )
+            ids.update(created)
+        return (
+            {
+                name: ids[lowered[name]] for name in names
+                if lowered[name] in ids
+            },
+            list(created.values())
+        )
+
+
 class Tag(models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
@@ -54,6 +165,13 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name'], name='tag_user_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -66,10 +184,94 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'name'],
+                name='ingredient_user_name_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def _link(self, relation: str):
+        """Return the through model and target column of a relation"""
+        field = self.model._meta.get_field(relation)
+        return field.remote_field.through, field.m2m_reverse_name()
+
+    def with_any(self, relation: str, ids):
+        """Filter the recipes linked to any of the given ids"""
+        through, column = self._link(relation)
+        links = through.objects.filter(**{f'{column}__in': ids})
+        return self.filter(id__in=links.values('recipe_id'))
+
+    def with_all(self, relation: str, ids):
+        """
+        Filter the recipes linked to all of the given ids.
+
+        The links are grouped per recipe and counted in a single subquery,
+        so the plan stays one scan of the through table however many ids
+        are given, instead of one join per id.
+        """
+        ids = set(ids)
+        through, column = self._link(relation)
+        links = through.objects.filter(**{f'{column}__in': ids}) \
+            .values('recipe_id') \
+            .annotate(matched=models.Count(column)) \
+            .filter(matched=len(ids))
+        return self.filter(id__in=links.values('recipe_id'))
+
+    def bulk_create_with_relations(self, recipes, tags, ingredients,
+                                   batch_size=None):
+        """
+        Insert recipes and their tag and ingredient links in bulk.
+
+        ``tags`` and ``ingredients`` hold one iterable of ids per recipe.
+        Backends that cannot return the ids of bulk inserted rows fall back
+        to saving the recipes one by one; the links are always inserted
+        with one bulk insert per relation.
+        """
+        self._for_write = True
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db, savepoint=False):
+            if connection.features.can_return_rows_from_bulk_insert:
+                recipes = self.bulk_create(recipes, batch_size=batch_size)
+            else:
+                for recipe in recipes:
+                    recipe.save(force_insert=True, using=self.db)
+
+            links = (('tags', tags), ('ingredients', ingredients))
+            for relation, ids in links:
+                through, column = self._link(relation)
+                rows = [
+                    through(recipe_id=recipe.id, **{column: pk})
+                    for recipe, pks in zip(recipes, ids)
+                    for pk in set(pks)
+                ]
+                through.objects.using(self.db).bulk_create(
+                    rows,
+                    batch_size=capped_batch_size(
+                        connection,
+                        ['recipe_id', column],
+                        rows,
+                        batch_size
+                    )
+                )
+
+        bulk_changed.send(
+            sender=self.model,
+            user_ids={recipe.user_id for recipe in recipes},
+            pks=[recipe.id for recipe in recipes]
+        )
+        return recipes
+
+
 class Recipe(models.Model):
     """Recipe object"""
     title = models.CharField(max_length=255)
@@ -83,6 +285,170 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(Ingredient)
     tags = models.ManyToManyField(Tag)
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    renditions_ready = models.BooleanField(default=False)
+    # List representation kept up to date by recipes.cards
+    card = models.TextField(blank=True, default='', editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='recipe_user_price_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='recipe_user_time_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='recipe_user_title_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the price and time loaded, for core.stats to count"""
+        instance = super().from_db(db, field_names, values)
+        if 'price' in field_names and 'time_minutes' in field_names:
+            instance._stats_figures = (
+                instance.price,
+                instance.time_minutes
+            )
+        return instance
+
+
+def user_version_key(user_id: int) -> str:
+    """Return the cache key of the version of a user's recipe data"""
+    return f'core:user-version:{user_id}'
+
+
+class UserVersionQuerySet(models.QuerySet):
+
+    def current(self, user_id: int) -> int:
+        """
+        Return the version of the user's recipe data.
+
+        The cache holds the versions the primary committed. The reads
+        routed to a replica query the version there instead, ahead of
+        the data, so that it is never newer than the data it tags.
+        """
+        if self.db in settings.DATABASE_REPLICAS:
+            return self._stored(user_id)
+
+        key = user_version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            version = self._stored(user_id)
+            # Never overwrite the version a committed bump just cached
+            cache.add(key, version, settings.USER_VERSION_CACHE_TIMEOUT)
+        return version
+
+    def _stored(self, user_id: int) -> int:
+        return self.filter(user_id=user_id) \
+            .values_list('version', flat=True) \
+            .first() or 0
+
+    def bump(self, user_ids, create=True):
+        """
+        Increment the version of the users' recipe data.
+
+        Missing counters are inserted at 0 before the increment, so two
+        concurrent first bumps still leave the counter at 2. Deletions
+        pass ``create=False``: a user owning data always has a counter,
+        and the user being deleted must not get a new one.
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            self._increment(user_ids, create)
+            cache.delete_many([user_version_key(pk) for pk in user_ids])
+            transaction.on_commit(
+                lambda: self._cache_versions(user_ids),
+                using=self.db
+            )
+
+    def bump_on_commit(self, user_ids, create=True):
+        """
+        Bump the versions of the users once the transaction commits.
+
+        The bumps of a transaction are gathered so that each user is
+        bumped once; a user only gets a new counter when none of them
+        came from a deletion.
+        """
+        def gather(pending):
+            for user_id in user_ids:
+                pending[user_id] = pending.get(user_id, True) and create
+
+        self._for_write = True
+        batching.defer(_flush_bumps, gather, using=self.db)
+
+    def _increment(self, user_ids: set, create: bool):
+        updated = self.filter(user_id__in=user_ids) \
+            .update(version=models.F('version') + 1)
+        if not create or updated == len(user_ids):
+            return
+
+        existing = set(
+            self.filter(user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+        missing = user_ids - existing
+        self.bulk_create(
+            [self.model(user_id=pk, version=0) for pk in missing],
+            ignore_conflicts=True
+        )
+        self.filter(user_id__in=missing) \
+            .update(version=models.F('version') + 1)
+
+    def _cache_versions(self, user_ids: set):
+        versions = self.filter(user_id__in=user_ids) \
+            .values_list('user_id', 'version')
+        cache.set_many(
+            {user_version_key(pk): version for pk, version in versions},
+            settings.USER_VERSION_CACHE_TIMEOUT
+        )
+
+
+def _flush_bumps(pending: dict, using: str):
+    """Bump the versions gathered by ``bump_on_commit``"""
+    for create in (True, False):
+        UserVersion.objects.using(using).bump(
+            [pk for pk, creates in pending.items() if creates is create],
+            create=create
+        )
+
+
+class UserVersion(models.Model):
+    """Counter bumped on every change to a user's recipe data"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    version = models.BigIntegerField(default=0)
+
+    objects = UserVersionQuerySet.as_manager()
+
+
+class RecipeStats(models.Model):
+    """Rollup of the statistics of a user's recipes, see ``core.stats``"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    data = models.TextField(default='{}')
+
+    class Meta:
+        verbose_name_plural = 'recipe stats'
@@ -0,0 +1,86 @@
+"""
+Lightweight SQL profiling that does not depend on ``DEBUG``.
+
+``QueryRecorder`` installs an execute wrapper on the database connections
+of the current thread and records every query with its duration; it is
+used by the benchmark commands and the request timing middleware.
+``serialization`` adds the time spent building the representation of a
+response to the timings of its request.
+"""
+import math
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryRecorder:
+    """Record the SQL run on the connections of the current thread"""
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'time': (time.perf_counter() - start) * 1000,
+            })
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in self.aliases:
+            self._stack.enter_context(
+                connections[alias].execute_wrapper(self)
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    @property
+    def count(self) -> int:
+        """Number of queries recorded"""
+        return len(self.queries)
+
+    @property
+    def time(self) -> float:
+        """Total duration of the recorded queries, in milliseconds"""
+        return sum(query['time'] for query in self.queries)
+
+
+@contextmanager
+def serialization(request):
+    """
+    Count the time spent in the block as serialization in the timings the
+    request timing middleware gives the request, nested blocks included
+    in the outermost one
+    """
+    marks = getattr(request, '_timing', None)
+    if marks is None or marks.get('serializing'):
+        yield
+        return
+
+    marks['serializing'] = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        marks['serializing'] = False
+        marks['serialize'] = marks.get('serialize', 0.0) + \
+            time.perf_counter() - start
+
+
+def percentile(values, percent: float) -> float:
+    """Return the nearest rank percentile of the values"""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
@@ -0,0 +1,338 @@
+import time
+import weakref
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.models import Count
+from django.db.models.signals import (
+    pre_save, post_save, pre_delete, post_delete, m2m_changed
+)
+from django.dispatch import receiver
+
+from core import stats
+from core.models import Tag, Ingredient, Recipe, UserVersion
+from core.search import index_on_commit, delete_from_search_index
+from core.signals import bulk_changed
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, using, **kwargs):
+    """Index the title of a saved recipe"""
+    index_on_commit([instance.id], using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, using, **kwargs):
+    """Remove a deleted recipe from the search index"""
+    delete_from_search_index([instance.id], using=using)
+
+
+@receiver(bulk_changed, sender=Recipe)
+def index_bulk_recipes(sender, pks, **kwargs):
+    """Index recipes created in bulk"""
+    if pks:
+        index_on_commit(pks)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_linked_recipes(sender, instance, action, reverse, pk_set, using,
+                         **kwargs):
+    """Reindex the recipes whose tags or ingredients changed"""
+    if action == 'pre_clear' and reverse:
+        instance._indexed_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    elif not reverse:
+        index_on_commit([instance.id], using=using)
+    elif action == 'post_clear':
+        index_on_commit(
+            instance.__dict__.pop('_indexed_recipe_ids', []),
+            using=using
+        )
+    else:
+        index_on_commit(pk_set, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_attr(sender, instance, created, using, **kwargs):
+    """Reindex the recipes linked to a renamed tag or ingredient"""
+    if not created:
+        index_on_commit(
+            instance.recipe_set.values_list('id', flat=True),
+            using=using
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_recipes(sender, instance, **kwargs):
+    """Remember the recipes linked to a tag or ingredient being deleted"""
+    instance._indexed_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_attr_recipes(sender, instance, using, **kwargs):
+    """Reindex the recipes that were linked to a deleted tag or ingredient"""
+    index_on_commit(
+        instance.__dict__.pop('_indexed_recipe_ids', []),
+        using=using
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def bump_saved_version(sender, instance, using, **kwargs):
+    """Bump the version of the owner of a saved recipe, tag or ingredient"""
+    UserVersion.objects.using(using).bump_on_commit([instance.user_id])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_deleted_version(sender, instance, using, **kwargs):
+    """Bump the version of the owner of a deleted recipe, tag or ingredient"""
+    UserVersion.objects.using(using).bump_on_commit(
+        [instance.user_id],
+        create=False
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_linked_version(sender, instance, action, using, **kwargs):
+    """Bump the version of the owner of (un)linked recipes"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        UserVersion.objects.using(using).bump_on_commit([instance.user_id])
+
+
+@receiver(bulk_changed, sender=Recipe)
+@receiver(bulk_changed, sender=Tag)
+@receiver(bulk_changed, sender=Ingredient)
+def bump_bulk_versions(sender, user_ids, **kwargs):
+    """Bump the versions of the owners of rows written in bulk"""
+    UserVersion.objects.bump_on_commit(user_ids)
+
+
+@receiver(pre_save, sender=Recipe)
+def collect_saved_recipe_figures(sender, instance, using, update_fields,
+                                 **kwargs):
+    """
+    Look up the price and time of a recipe being updated, unless loaded
+    along with it
+    """
+    if instance._state.adding or not _changes_figures(update_fields):
+        return
+    if instance._state.db != using or \
+            not hasattr(instance, '_stats_figures'):
+        instance._stats_figures = Recipe.objects.using(using) \
+            .filter(pk=instance.pk) \
+            .values_list('price', 'time_minutes') \
+            .first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_stats(sender, instance, created, using, update_fields,
+                              **kwargs):
+    """Count a saved recipe in the stats of its owner"""
+    if not created and not _changes_figures(update_fields):
+        return
+    previous = None
+    if not created and getattr(instance, '_stats_figures', None):
+        price, minutes = instance._stats_figures
+        previous = (stats.to_price(price), minutes)
+    current = (stats.to_price(instance.price), instance.time_minutes)
+    instance._stats_figures = current
+    if previous == current:
+        return
+
+    def change(data):
+        if previous is not None:
+            stats.add_recipe(data, *previous, sign=-1)
+        stats.add_recipe(data, *current)
+
+    stats.update_on_commit(instance.user_id, change, using=using)
+
+
+def _changes_figures(update_fields) -> bool:
+    """Return whether a save may change the price or time of a recipe"""
+    return update_fields is None or \
+        bool({'price', 'time_minutes'} & set(update_fields))
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_deleted_recipe_links(sender, instance, **kwargs):
+    """Remember the tags and ingredients of a recipe being deleted"""
+    instance._stats_links = {
+        relation: list(
+            getattr(instance, relation).values_list('id', flat=True)
+        )
+        for relation in stats.RELATIONS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def update_deleted_recipe_stats(sender, instance, using, **kwargs):
+    """Remove a deleted recipe from the stats of its owner"""
+    links = instance.__dict__.pop('_stats_links', {})
+
+    def change(data):
+        stats.add_recipe(data, instance.price, instance.time_minutes, sign=-1)
+        for relation, ids in links.items():
+            for pk in ids:
+                stats.link(data, relation, pk, None, -1)
+
+    stats.update_on_commit(
+        instance.user_id,
+        change,
+        using=using,
+        create=False
+    )
+
+
+def _link_uses(instance, reverse, model, relation, pk_set, using):
+    """
+    Return the current links of the (un)linked instance, restricted to
+    pk_set, as {owner id: {tag or ingredient id: recipes}}, and the names
+    of the tags or ingredients.
+    """
+    if not reverse:
+        attrs = model.objects.using(using).filter(recipe=instance)
+        if pk_set is not None:
+            attrs = attrs.filter(id__in=pk_set)
+        names = dict(attrs.values_list('id', 'name'))
+        return {instance.user_id: dict.fromkeys(names, 1)}, names
+
+    recipes = model.objects.using(using).filter(**{relation: instance})
+    if pk_set is not None:
+        recipes = recipes.filter(id__in=pk_set)
+    counts = recipes.values_list('user_id') \
+        .annotate(n=Count('id')) \
+        .order_by()
+    return (
+        {user_id: {instance.pk: n} for user_id, n in counts},
+        {instance.pk: instance.name}
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_recipe_stats(sender, instance, action, reverse, model,
+                               pk_set, using, **kwargs):
+    """
+    Count the (un)linked tags and ingredients in the stats of the owners
+    of the recipes.
+
+    The links are looked up before a removal, pk_set holding the
+    requested ids rather than the linked ones, and before a clear. After
+    an addition to a recipe pk_set holds the new links only, the names of
+    the tags or ingredients being looked up on commit if needed.
+    """
+    relation = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    if action in ('pre_remove', 'pre_clear'):
+        instance._stats_unlinked = _link_uses(
+            instance, reverse, model, relation,
+            pk_set if action == 'pre_remove' else None,
+            using
+        )
+        return
+    if action == 'post_add' and pk_set and not reverse:
+        uses, names = {instance.user_id: dict.fromkeys(pk_set, 1)}, None
+        sign = 1
+    elif action == 'post_add' and pk_set:
+        uses, names = _link_uses(
+            instance, reverse, model, relation, pk_set, using
+        )
+        sign = 1
+    elif action in ('post_remove', 'post_clear'):
+        uses, names = instance.__dict__.pop('_stats_unlinked', ({}, {}))
+        sign = -1
+    else:
+        return
+
+    for user_id, counts in uses.items():
+        def change(data, counts=counts):
+            known = names
+            if known is None:
+                new = [pk for pk in counts if str(pk) not in data[relation]]
+                known = dict(
+                    model.objects.using(using)
+                    .filter(id__in=new)
+                    .values_list('id', 'name')
+                ) if new else {}
+            for pk, n in counts.items():
+                stats.link(data, relation, pk, known.get(pk), sign * n)
+
+        stats.update_on_commit(user_id, change, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def rename_attr_stats(sender, instance, created, using, **kwargs):
+    """Rename a tag or ingredient in the stats of its owner"""
+    if not created:
+        relation = 'tags' if sender is Tag else 'ingredients'
+        stats.update_on_commit(
+            instance.user_id,
+            lambda data: stats.rename(
+                data, relation, instance.pk, instance.name
+            ),
+            using=using,
+            create=False
+        )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def forget_attr_stats(sender, instance, using, **kwargs):
+    """Remove a deleted tag or ingredient from the stats of its owner"""
+    relation = 'tags' if sender is Tag else 'ingredients'
+    stats.update_on_commit(
+        instance.user_id,
+        lambda data: stats.forget(data, relation, instance.pk),
+        using=using,
+        create=False
+    )
+
+
+@receiver(bulk_changed, sender=Recipe)
+def rebuild_bulk_recipe_stats(sender, user_ids, **kwargs):
+    """Recompute the stats of the owners of recipes written in bulk"""
+    if user_ids:
+        stats.rebuild_on_commit(user_ids)
+
+
+# When each open connection of this process was last checked
+_health_checked_at = weakref.WeakKeyDictionary()
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """
+    Close the persistent connections the database server dropped, so that
+    the request reconnects instead of failing on its first query. An open
+    connection is checked at most once every
+    RECIPE_DB_HEALTH_CHECK_INTERVAL seconds, None turning the checks off.
+    """
+    interval = settings.RECIPE_DB_HEALTH_CHECK_INTERVAL
+    if interval is None:
+        return
+
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked_at = _health_checked_at.get(connection)
+        if checked_at is not None and now - checked_at < interval:
+            continue
+        _health_checked_at[connection] = now
+        if not connection.is_usable():
+            connection.close()
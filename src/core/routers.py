@@ -0,0 +1,66 @@
+"""
+Routing of the recipe reads to the database replicas.
+
+Reads only go to a replica while ``replica_reads`` allows it, which
+``ReplicaRoutingMiddleware`` does for the safe requests of clients that
+did not write recently; everything else, including the requests that
+write and management commands, uses the primary. A request reads from a
+single replica, picked when it starts, so that all its reads see the
+data as of the same point of the replication.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+@contextmanager
+def replica_reads(allowed: bool = True):
+    """
+    Allow or forbid reading from the replicas within the block, yielding
+    the replica picked for its reads, None for the primary
+    """
+    replicas = settings.DATABASE_REPLICAS
+    replica = random.choice(replicas) if allowed and replicas else None
+    with reading_from(replica):
+        yield replica
+
+
+@contextmanager
+def reading_from(replica):
+    """Read from the given replica within the block, None for the primary"""
+    token = _replica.set(replica)
+    try:
+        yield replica
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    """Send the reads of the recipe models to the replica of the request"""
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None:
+            return None
+        if model._meta.label_lower not in settings.REPLICA_MODELS:
+            return None
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,180 @@
+"""
+Full text index over recipe titles and the names of their tags and
+ingredients.
+
+On Postgres the index is a ``search_vector`` tsvector column of
+``core_recipe`` with a GIN index, on SQLite an FTS5 table keyed by the
+recipe id. Both are created by migration 0007 and kept up to date from
+the model signals in ``core.receivers``; other backends fall back to
+case-insensitive LIKE matching.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, BooleanField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from core import batching
+
+CHUNK_SIZE = 500
+
+POSTGRES_UPDATE = """
+    UPDATE core_recipe AS r SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, r.title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')), 'B')
+    WHERE r.id = ANY(%(ids)s)
+"""
+
+SQLITE_INSERT = """
+    INSERT INTO core_recipe_fts (rowid, title, tags, ingredients)
+    SELECT r.id, r.title, (
+        SELECT group_concat(t.name, ' ')
+        FROM core_tag t
+        JOIN core_recipe_tags rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), (
+        SELECT group_concat(i.name, ' ')
+        FROM core_ingredient i
+        JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = r.id
+    )
+    FROM core_recipe r
+    WHERE r.id IN ({placeholders})
+"""
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def update_search_index(recipe_ids, using='default'):
+    """Recompute the indexed text of the given recipes"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for ids in _chunks(recipe_ids):
+            if connection.vendor == 'postgresql':
+                cursor.execute(POSTGRES_UPDATE, {
+                    'config': settings.RECIPE_SEARCH_CONFIG,
+                    'ids': ids,
+                })
+            elif connection.vendor == 'sqlite':
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(
+                    f'DELETE FROM core_recipe_fts '
+                    f'WHERE rowid IN ({placeholders})',
+                    ids
+                )
+                cursor.execute(
+                    SQLITE_INSERT.format(placeholders=placeholders),
+                    ids
+                )
+
+
+def _flush_index(pending: dict, using: str):
+    update_search_index(pending, using)
+
+
+def index_on_commit(recipe_ids, using='default'):
+    """Reindex the recipes once the current transaction commits"""
+    batching.defer(
+        _flush_index,
+        lambda pending: pending.update(dict.fromkeys(recipe_ids)),
+        using
+    )
+
+
+def delete_from_search_index(recipe_ids, using='default'):
+    """Remove deleted recipes from the index, where it is a separate table"""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for ids in _chunks(recipe_ids):
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f'DELETE FROM core_recipe_fts WHERE rowid IN ({placeholders})',
+                ids
+            )
+
+
+def rebuild_search_index(using='default'):
+    """Recompute the indexed text of every recipe"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT id FROM core_recipe')
+        ids = [row[0] for row in cursor.fetchall()]
+    update_search_index(ids, using=using)
+
+
+def search_recipes(queryset, query: str):
+    """
+    Filter the recipes matching every word of the query.
+
+    The matches are annotated with a ``search_rank``, higher being more
+    relevant: title matches weigh more than tag and ingredient ones.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        tsquery = 'plainto_tsquery(%s::regconfig, %s)'
+        params = (settings.RECIPE_SEARCH_CONFIG, ' '.join(words))
+        return queryset.annotate(
+            search_match=RawSQL(
+                f'core_recipe.search_vector @@ {tsquery}',
+                params,
+                output_field=BooleanField()
+            ),
+            search_rank=RawSQL(
+                f'ts_rank(core_recipe.search_vector, {tsquery})',
+                params,
+                output_field=FloatField()
+            )
+        ).filter(search_match=True)
+
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{word}"' for word in words)
+        return queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM core_recipe_fts WHERE core_recipe_fts MATCH %s',
+            (match,)
+        )).annotate(search_rank=RawSQL(
+            'SELECT -bm25(core_recipe_fts, 4.0, 1.0, 1.0) '
+            'FROM core_recipe_fts '
+            'WHERE core_recipe_fts MATCH %s AND rowid = core_recipe.id',
+            (match,),
+            output_field=FloatField()
+        ))
+
+    for word in words:
+        queryset = queryset.filter(
+            Q(title__icontains=word) |
+            Q(id__in=_linked_recipes('tags', word)) |
+            Q(id__in=_linked_recipes('ingredients', word))
+        )
+    return queryset.annotate(search_rank=Value(0.0, FloatField()))
+
+
+def _linked_recipes(relation: str, word: str):
+    """Return the ids of the recipes linked to names containing the word"""
+    from core.models import Recipe
+
+    field = Recipe._meta.get_field(relation)
+    links = field.remote_field.through.objects.filter(**{
+        f'{field.m2m_reverse_field_name()}__name__icontains': word
+    })
+    return links.values('recipe_id')
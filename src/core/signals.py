@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after rows were written in bulk, bypassing the per-instance model
+# signals. ``user_ids`` holds the owners of the rows and ``pks`` their
+# primary keys, or None when they are not known.
+bulk_changed = Signal(providing_args=['user_ids', 'pks'])
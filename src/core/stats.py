@@ -0,0 +1,313 @@
+"""
+Per-user rollup of the recipe statistics shown on the dashboards.
+
+Each user has one ``RecipeStats`` row holding, as JSON, the number of
+recipes, the sum and distribution of their prices, a histogram of their
+``time_minutes`` and the number of recipes using each tag and ingredient:
+
+    {
+        "recipes": 3,
+        "price_total": "15.50",
+        "prices": {"5.00": 2, "5.50": 1},
+        "times": {"0": 1, "15": 2},
+        "tags": {"12": ["Vegan", 2]},
+        "ingredients": {"7": ["Salt", 3]}
+    }
+
+The changes a transaction makes to a user's recipes are gathered from
+the model signals in ``core.receivers`` and applied to the row at once
+when it commits, so reading the statistics is one lookup. A missing row
+is computed from the recipes on first use, and the
+``rebuild_recipe_stats`` command recomputes them all.
+"""
+import json
+import math
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count
+
+from core import batching
+from core.models import Recipe, RecipeStats, User
+
+# Lower bounds of the time_minutes histogram buckets
+TIME_BUCKETS = (0, 15, 30, 60, 120)
+
+# Number of tags and ingredients listed, the most used first
+TOP_ATTRS = 10
+
+RELATIONS = ('tags', 'ingredients')
+
+CENT = Decimal('0.01')
+
+
+def empty() -> dict:
+    return {
+        'recipes': 0,
+        'price_total': '0.00',
+        'prices': {},
+        'times': {},
+        'tags': {},
+        'ingredients': {},
+    }
+
+
+def to_price(value) -> Decimal:
+    """Return a price as stored, floats being given by some callers"""
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _bucket(minutes: int) -> int:
+    """Return the lower bound of the histogram bucket of a time"""
+    return TIME_BUCKETS[max(bisect_right(TIME_BUCKETS, minutes) - 1, 0)]
+
+
+def _count(counts: dict, key: str, n: int):
+    total = counts.get(key, 0) + n
+    if total > 0:
+        counts[key] = total
+    else:
+        counts.pop(key, None)
+
+
+def add_recipe(data: dict, price, minutes: int, sign: int = 1):
+    """Count a recipe in the rollup, or remove it with ``sign=-1``"""
+    price = to_price(price)
+    data['recipes'] += sign
+    data['price_total'] = str(Decimal(data['price_total']) + sign * price)
+    _count(data['prices'], str(price), sign)
+    _count(data['times'], str(_bucket(minutes)), sign)
+
+
+def link(data: dict, relation: str, pk: int, name, n: int):
+    """Add n recipes to the uses of a tag or ingredient, n may be negative"""
+    entries = data[relation]
+    key = str(pk)
+    old_name, uses = entries.get(key, (name, 0))
+    if uses + n > 0:
+        entries[key] = [name or old_name, uses + n]
+    else:
+        entries.pop(key, None)
+
+
+def rename(data: dict, relation: str, pk: int, name: str):
+    entry = data[relation].get(str(pk))
+    if entry is not None:
+        entry[0] = name
+
+
+def forget(data: dict, relation: str, pk: int):
+    data[relation].pop(str(pk), None)
+
+
+def collect(user_ids, using: str = DEFAULT_DB_ALIAS) -> dict:
+    """Compute the rollups of the users from their recipes"""
+    rollups = {user_id: empty() for user_id in user_ids}
+    recipes = Recipe.objects.using(using) \
+        .filter(user_id__in=rollups) \
+        .values_list('user_id', 'price', 'time_minutes') \
+        .annotate(n=Count('id')) \
+        .order_by()
+    for user_id, price, minutes, n in recipes:
+        data, price = rollups[user_id], to_price(price)
+        data['recipes'] += n
+        data['price_total'] = str(Decimal(data['price_total']) + n * price)
+        _count(data['prices'], str(price), n)
+        _count(data['times'], str(_bucket(minutes)), n)
+
+    for relation in RELATIONS:
+        field = Recipe._meta.get_field(relation)
+        attr = field.m2m_reverse_field_name()
+        links = field.remote_field.through.objects.using(using) \
+            .filter(recipe__user_id__in=rollups) \
+            .values_list('recipe__user_id', f'{attr}_id', f'{attr}__name') \
+            .annotate(n=Count('recipe_id')) \
+            .order_by()
+        for user_id, pk, name, n in links:
+            link(rollups[user_id], relation, pk, name, n)
+    return rollups
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _create(user_id: int, using: str) -> bool:
+    """Store the rollup computed from the recipes, if the user has none"""
+    try:
+        with transaction.atomic(using=using):
+            RecipeStats.objects.using(using).create(
+                user_id=user_id,
+                data=_dumps(collect([user_id], using)[user_id])
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def update(user_id: int, change, using: str = DEFAULT_DB_ALIAS,
+           create: bool = True):
+    """
+    Apply change(data) to the user's rollup, under a row lock.
+
+    A missing rollup is computed from the recipes instead, which already
+    include the change; deletions pass ``create=False``, the rollup of a
+    user being deleted having gone already.
+    """
+    stats = RecipeStats.objects.using(using)
+    with transaction.atomic(using=using):
+        row = stats.select_for_update().filter(user_id=user_id).first()
+        if row is None:
+            if not create or _create(user_id, using):
+                return
+            # Created meanwhile by another transaction, without the change
+            row = stats.select_for_update().get(user_id=user_id)
+        data = json.loads(row.data)
+        change(data)
+        row.data = _dumps(data)
+        row.save(update_fields=['data'])
+
+
+def _flush_updates(pending: dict, using: str):
+    rebuilt = [
+        user_id for user_id, (changes, _) in pending.items()
+        if changes is None
+    ]
+    if rebuilt:
+        rebuild(rebuilt, using)
+    for user_id, (changes, create) in pending.items():
+        if changes is None:
+            continue
+
+        def change(data, changes=changes):
+            for apply in changes:
+                apply(data)
+
+        update(user_id, change, using=using, create=create)
+
+
+def update_on_commit(user_id: int, change, using: str = DEFAULT_DB_ALIAS,
+                     create: bool = True):
+    """
+    Apply change(data) to the user's rollup once the transaction commits,
+    along with the other changes the transaction makes to it, in a
+    single ``update``
+    """
+    def gather(pending):
+        changes, creates = pending.get(user_id, ([], True))
+        if changes is not None:
+            changes.append(change)
+        pending[user_id] = (changes, creates and create)
+
+    batching.defer(_flush_updates, gather, using)
+
+
+def rebuild_on_commit(user_ids, using: str = DEFAULT_DB_ALIAS):
+    """
+    Recompute the rollups of the users once the transaction commits,
+    instead of applying the other changes it makes to them
+    """
+    def gather(pending):
+        for user_id in user_ids:
+            pending[user_id] = (None, True)
+
+    batching.defer(_flush_updates, gather, using)
+
+
+def rebuild(user_ids, using: str = DEFAULT_DB_ALIAS):
+    """
+    Recompute the rollups of the users from their recipes.
+
+    The users and their rollups are locked first, so that the rollups
+    being updated or created meanwhile are written before they are
+    collected, and the ones updated afterwards are not overwritten.
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic(using=using):
+        stats = RecipeStats.objects.using(using)
+        list(
+            User.objects.using(using)
+            .select_for_update()
+            .filter(id__in=user_ids)
+            .values_list('id', flat=True)
+        )
+        list(
+            stats.select_for_update()
+            .filter(user_id__in=user_ids)
+            .values_list('user_id', flat=True)
+        )
+        rollups = collect(user_ids, using)
+        stats.filter(user_id__in=rollups).delete()
+        stats.bulk_create([
+            RecipeStats(user_id=user_id, data=_dumps(data))
+            for user_id, data in rollups.items()
+        ])
+
+
+def read(user_id: int) -> dict:
+    """Return the user's rollup, computing it when missing"""
+    data = RecipeStats.objects.filter(user_id=user_id) \
+        .values_list('data', flat=True) \
+        .first()
+    if data is None:
+        _create(user_id, DEFAULT_DB_ALIAS)
+        data = RecipeStats.objects.using(DEFAULT_DB_ALIAS) \
+            .values_list('data', flat=True) \
+            .get(user_id=user_id)
+    return json.loads(data)
+
+
+def _percentile(prices: list, count: int, percent: float) -> str:
+    """Return the nearest rank percentile of the (price, n) pairs"""
+    rank = max(1, math.ceil(percent / 100 * count))
+    for price, n in prices:
+        rank -= n
+        if rank <= 0:
+            return str(price)
+
+
+def _top(entries: dict, limit: int) -> list:
+    ranked = sorted(
+        (-uses, name, int(pk)) for pk, (name, uses) in entries.items()
+    )
+    return [
+        {'id': pk, 'name': name, 'recipes': -uses}
+        for uses, name, pk in ranked[:limit]
+    ]
+
+
+def summary(data: dict, top: int = TOP_ATTRS) -> dict:
+    """Return the statistics of a rollup as served by the API"""
+    count = data['recipes']
+    price = dict.fromkeys(('average', 'min', 'p50', 'p90', 'max'))
+    if count:
+        prices = sorted(
+            (Decimal(key), n) for key, n in data['prices'].items()
+        )
+        price.update({
+            'average': str((Decimal(data['price_total']) / count)
+                           .quantize(CENT)),
+            'min': str(prices[0][0]),
+            'p50': _percentile(prices, count, 50),
+            'p90': _percentile(prices, count, 90),
+            'max': str(prices[-1][0]),
+        })
+
+    times = defaultdict(int, data['times'])
+    bounds = TIME_BUCKETS[1:] + (None,)
+    return {
+        'recipes': count,
+        'price': price,
+        'time_minutes': [
+            {
+                'min': low,
+                'max': None if high is None else high - 1,
+                'recipes': times[str(low)],
+            }
+            for low, high in zip(TIME_BUCKETS, bounds)
+        ],
+        'tags': _top(data['tags'], top),
+        'ingredients': _top(data['ingredients'], top),
+    }
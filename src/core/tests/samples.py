@@ -0,0 +1,12 @@
+from core.models import Recipe
+
+
+def sample_recipe(user, **kwargs) -> Recipe:
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(kwargs)
+    return Recipe.objects.create(user=user, **defaults)
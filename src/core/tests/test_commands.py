@@ -1,22 +1,68 @@
 from unittest import mock
 from django.core import management
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+ENSURE_CONNECTION = \
+    'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection'
+MIGRATION_PLAN = \
+    'django.db.migrations.executor.MigrationExecutor.migration_plan'
+
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
-        with mock.patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with mock.patch(ENSURE_CONNECTION) as ensure_connection:
             management.call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(ensure_connection.call_count, 1)
 
     @mock.patch('time.sleep', return_value=True)
     def test_wait_for_db(self, sleep):
-        """Test waiting for database"""
-        with mock.patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        """Test waiting for database with an exponential backoff"""
+        with mock.patch(ENSURE_CONNECTION) as ensure_connection:
+            ensure_connection.side_effect = [OperationalError] * 5 + [None]
             management.call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(ensure_connection.call_count, 6)
+
+        self.assertEqual(
+            [call.args[0] for call in sleep.call_args_list],
+            [0.1, 0.2, 0.4, 0.8, 1.6]
+        )
+
+    @mock.patch('time.sleep', return_value=True)
+    def test_wait_for_db_max_delay(self, sleep):
+        """Test the delay between attempts is capped"""
+        with mock.patch(ENSURE_CONNECTION) as ensure_connection:
+            ensure_connection.side_effect = [OperationalError] * 4 + [None]
+            management.call_command('wait_for_db', delay=1, max_delay=3)
+
+        self.assertEqual(
+            [call.args[0] for call in sleep.call_args_list],
+            [1, 2, 3, 3]
+        )
+
+    @mock.patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, sleep):
+        """Test waiting for database gives up after the timeout"""
+        with mock.patch(ENSURE_CONNECTION) as ensure_connection:
+            ensure_connection.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                management.call_command('wait_for_db', timeout=1)
+
+        self.assertEqual(sleep.call_count, 4)
+
+    @mock.patch('time.sleep', return_value=True)
+    def test_wait_for_migrations(self, sleep):
+        """Test waiting until no migration is pending"""
+        with mock.patch(MIGRATION_PLAN) as migration_plan:
+            migration_plan.side_effect = [[mock.Mock()], []]
+            management.call_command('wait_for_db', migrated=True)
+
+        self.assertEqual(migration_plan.call_count, 2)
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_wait_for_migrated_db(self):
+        """Test the migrated test database is ready"""
+        management.call_command('wait_for_db', migrated=True)
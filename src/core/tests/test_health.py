@@ -0,0 +1,91 @@
+import importlib
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from app import gunicorn
+from core.warmup import warm_up
+
+HEALTH_URL = reverse('health')
+
+
+class HealthTests(TestCase):
+    """Test the health endpoint"""
+
+    def test_healthy(self):
+        """Test the databases are reported with their latency"""
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['status'], 'ok')
+        database = res.json()['databases']['default']
+        self.assertEqual(database['status'], 'ok')
+        self.assertGreaterEqual(database['latency_ms'], 0)
+
+    def test_database_unavailable(self):
+        """Test an unavailable database is reported with a 503"""
+        with patch.object(connection, 'cursor', side_effect=OperationalError):
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(
+            res.json()['databases']['default'],
+            {'status': 'unavailable'}
+        )
+
+    @override_settings(MIDDLEWARE=settings.LEAN_MIDDLEWARE)
+    def test_browser_middleware_skipped(self):
+        """Test the health checks skip the middleware of browser sessions"""
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('X-Frame-Options', res)
+
+
+class WarmUpTests(TestCase):
+    """Test the warm-up of new processes"""
+
+    def test_warm_up(self):
+        """Test the warm-up keeps the connections already open"""
+        warm_up()
+
+        self.assertIsNotNone(connection.connection)
+
+    @patch.object(connection, 'connection', None)
+    def test_warm_up_closes_connections(self):
+        """Test the connections opened by the warm-up are closed again"""
+        with patch.object(connection, 'ensure_connection') as ensure, \
+                patch.object(connection, 'close') as close:
+            warm_up()
+
+        ensure.assert_called_once_with()
+        close.assert_called_once_with()
+
+    @patch.object(connection, 'connection', None)
+    def test_warm_up_database_unavailable(self):
+        """Test the warm-up does not fail without database"""
+        with patch.object(connection, 'ensure_connection',
+                          side_effect=OperationalError), \
+                patch.object(connection, 'close'), \
+                self.assertLogs('core.warmup', 'WARNING'):
+            warm_up()
+
+    def test_warm_up_on_load(self):
+        """Test the WSGI application only warms up when configured to"""
+        for enabled in (False, True):
+            with override_settings(WARM_UP_ON_LOAD=enabled), \
+                    patch('core.warmup.warm_up') as warm_up_mock:
+                importlib.reload(importlib.import_module('app.wsgi'))
+
+            self.assertEqual(warm_up_mock.called, enabled)
+
+    def test_post_fork_hook(self):
+        """Test the gunicorn workers warm up after the fork"""
+        with patch('core.warmup.warm_up') as warm_up_mock:
+            gunicorn.post_worker_init(worker=None)
+
+        warm_up_mock.assert_called_once_with()
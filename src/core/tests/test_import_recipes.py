@@ -0,0 +1,161 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib import auth
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
+from recipes.cards import build_cards
+
+
+class ImportRecipesTests(TransactionTestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+
+    def import_file(self, content: str, suffix: str, *args) -> tuple:
+        """Run the command on a file holding the content"""
+        with tempfile.NamedTemporaryFile('w', suffix=suffix,
+                                         delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+
+        out, err = StringIO(), StringIO()
+        management.call_command(
+            'import_recipes', file.name, *args, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """Test importing recipes and the names of their tags from CSV"""
+        out, err = self.import_file(
+            'user,title,time_minutes,price,link,tags,ingredients\n'
+            'test@example.com,Thai curry,30,12.50,,Vegan;Spicy,Rice\n'
+            'other@example.com,Pancakes,15,3,,Sweet,Flour;Eggs\n',
+            '.csv'
+        )
+
+        self.assertIn('Imported 2 recipes, skipped 0 rows', out)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Thai curry')
+        self.assertEqual(str(recipe.price), '12.50')
+        self.assertEqual(
+            sorted(recipe.tags.values_list('name', flat=True)),
+            ['Spicy', 'Vegan']
+        )
+        other_recipe = Recipe.objects.get(user=self.other)
+        self.assertEqual(other_recipe.ingredients.count(), 2)
+        self.assertTrue(other_recipe.tags.filter(user=self.other).exists())
+
+    def test_import_jsonl_reuses_names(self):
+        """Test names are matched to the user's attrs ignoring case"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.other, name='Spicy')
+        lines = [
+            {'title': 'Curry', 'time_minutes': 30, 'price': 10,
+             'tags': ['vegan', 'Spicy'], 'ingredients': ['Rice']},
+            {'title': 'Salad', 'time_minutes': 5, 'price': 4.5,
+             'tags': ['VEGAN', 'spicy'], 'ingredients': 'Lettuce;rice'},
+        ]
+
+        out, err = self.import_file(
+            '\n'.join(json.dumps(line) for line in lines),
+            '.jsonl',
+            '--user', 'test@example.com'
+        )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(tag.recipe_set.count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            2
+        )
+
+    def test_import_skips_invalid_rows(self):
+        """Test invalid rows and unknown users are reported and skipped"""
+        out, err = self.import_file(
+            'user,title,time_minutes,price,link,tags,ingredients\n'
+            'test@example.com,,10,5,,,\n'
+            'test@example.com,Curry,ten,5,,,\n'
+            'test@example.com,Curry,10,12345,,,\n'
+            'nobody@example.com,Curry,10,5,,,\n'
+            'test@example.com,Curry,10,5,,,\n',
+            '.csv'
+        )
+
+        self.assertIn('Imported 1 recipes, skipped 4 rows', out)
+        self.assertIn('Line 3:', err)
+        self.assertIn('Unknown user nobody@example.com', err)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_import_in_batches(self):
+        """Test recipes are imported in batches and indexed for search"""
+        lines = [
+            json.dumps({'user': 'test@example.com', 'title': f'Soup {i}',
+                        'time_minutes': 10, 'price': 5, 'tags': ['Hot']})
+            for i in range(5)
+        ]
+
+        out, err = self.import_file(
+            '\n'.join(lines), '.ndjson', '--batch-size', '2'
+        )
+
+        self.assertIn('Imported 4 recipes...', out)
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertEqual(Tag.objects.get().recipe_set.count(), 5)
+        self.assertEqual(
+            search_recipes(Recipe.objects.all(), 'hot soup').count(),
+            5
+        )
+
+    def test_import_unknown_owner(self):
+        """Test importing for an unknown user fails"""
+        with self.assertRaises(CommandError):
+            self.import_file('', '.csv', '--user', 'nobody@example.com')
+
+    def test_import_unknown_format(self):
+        """Test the format is required when the extension is unknown"""
+        with self.assertRaises(CommandError):
+            self.import_file('', '.txt')
+
+
+class ImportRecipeCardsTests(TransactionTestCase):
+    """Test the imported recipes get their card once committed"""
+
+    def test_imported_cards(self):
+        """Test the cards of the imported recipes, COPY'd on PostgreSQL"""
+        auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv',
+                                         delete=False) as file:
+            file.write(
+                'user,title,time_minutes,price,link,tags,ingredients\n'
+                'test@example.com,Thai curry,30,12.50,,Vegan;Spicy,Rice\n'
+                'test@example.com,Pancakes,15,3,,,Flour\n'
+            )
+        self.addCleanup(os.remove, file.name)
+
+        management.call_command('import_recipes', file.name,
+                                '--batch-size', '1', stdout=StringIO())
+
+        cards = dict(Recipe.objects.values_list('id', 'card'))
+        built = build_cards(cards)
+        self.assertEqual(len(cards), 2)
+        for pk, card in cards.items():
+            self.assertEqual(json.loads(card), built[pk])
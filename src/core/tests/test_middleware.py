@@ -0,0 +1,162 @@
+import json
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.receivers import _health_checked_at, check_connections
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    """Test the request timing middleware"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def test_server_timing_header(self):
+        """Test the database, view, serializer and render timings are sent"""
+        res = self.client.get(RECIPES_URL)
+
+        names = [
+            metric.split(';')[0] for metric in res['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(names, ['db', 'view', 'serialize', 'render', 'total'])
+
+    def test_serialization_not_counted_in_view(self):
+        """Test the time spent in the serializers is taken off the view"""
+        res = self.client.get(RECIPES_URL)
+
+        timings = {
+            name: float(value) for name, value in (
+                metric.split(';dur=')
+                for metric in res['Server-Timing'].split(', ')
+            )
+        }
+        self.assertGreater(timings['serialize'], 0)
+        self.assertLessEqual(
+            timings['view'] + timings['serialize'] + timings['render'],
+            timings['total']
+        )
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_server_timing_header_disabled(self):
+        """Test the header can be turned off"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+
+    def test_request_logged(self):
+        """Test each request is logged as a JSON line"""
+        with self.assertLogs('core.requests', 'INFO') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], RECIPES_URL)
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 4)
+        self.assertNotIn('sql', record)
+
+    @override_settings(REQUEST_SLOW_THRESHOLD=0)
+    def test_slow_request_logs_queries(self):
+        """Test slow requests are logged with their queries"""
+        with self.assertLogs('core.requests', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(len(record['sql']), 4)
+        self.assertIn('core_recipe', record['sql'][1]['sql'])
+
+
+@override_settings(MIDDLEWARE=settings.LEAN_MIDDLEWARE)
+class BrowserMiddlewareTests(TestCase):
+    """Test the API requests skip the middleware of browser sessions"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_superuser(
+            'admin@example.com',
+            'pwd123'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_api_skips_browser_middleware(self):
+        """Test API requests get no session, CSRF or clickjacking handling"""
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        payload = {'title': 'Curry', 'time_minutes': 10, 'price': '5.00'}
+
+        res = client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertNotIn('X-Frame-Options', res)
+        self.assertFalse(res.cookies)
+
+    def test_admin_keeps_browser_middleware(self):
+        """Test the admin still has sessions and CSRF protection"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+
+        res = client.get(reverse('admin:index'))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['X-Frame-Options'], 'DENY')
+
+        res = client.post(reverse('admin:logout'))
+        self.assertEqual(res.status_code, 403)
+
+
+class ConnectionHealthCheckTests(TestCase):
+    """Test the persistent connections are checked when requests start"""
+
+    def setUp(self) -> None:
+        _health_checked_at.clear()
+        connection.ensure_connection()
+
+    @override_settings(RECIPE_DB_HEALTH_CHECK_INTERVAL=0)
+    @patch.object(connection, 'in_atomic_block', False)
+    def test_unusable_connection_closed(self):
+        """Test a connection the server dropped is closed"""
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_connections(sender=None)
+
+        close.assert_called_once_with()
+
+    @override_settings(RECIPE_DB_HEALTH_CHECK_INTERVAL=60)
+    @patch.object(connection, 'in_atomic_block', False)
+    def test_checked_once_per_interval(self):
+        """Test a connection is not checked again within the interval"""
+        with patch.object(connection, 'is_usable') as is_usable:
+            check_connections(sender=None)
+            check_connections(sender=None)
+
+        is_usable.assert_called_once_with()
+
+    @patch.object(connection, 'in_atomic_block', False)
+    def test_checks_disabled(self):
+        """Test connections are not checked without an interval"""
+        with patch.object(connection, 'is_usable') as is_usable:
+            check_connections(sender=None)
+
+        is_usable.assert_not_called()
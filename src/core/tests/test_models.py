@@ -1,4 +1,5 @@
 from unittest import mock
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib import auth
 
@@ -52,6 +53,69 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user_ignoring_case(self):
+        """Test a user cannot have two tags differing only in case"""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='vegan')
+
+    def test_get_or_create_by_name(self):
+        """Test getting an ingredient by name ignores case"""
+        user = sample_user()
+        salt, created = models.Ingredient.objects.get_or_create_by_name(
+            user,
+            'Salt'
+        )
+        same, created_again = models.Ingredient.objects \
+            .get_or_create_by_name(user, 'SALT')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(same, salt)
+        self.assertEqual(same.name, 'Salt')
+
+    def test_get_or_create_by_names(self):
+        """Test getting tags by names creates only the missing ones"""
+        user = sample_user()
+        vegan = models.Tag.objects.create(user=user, name='Vegan')
+
+        ids, new_ids = models.Tag.objects.get_or_create_by_names(
+            user.id,
+            ['VEGAN', 'Dessert', 'dessert']
+        )
+
+        dessert = models.Tag.objects.get(user=user, name='Dessert')
+        self.assertEqual(ids, {
+            'VEGAN': vegan.id,
+            'Dessert': dessert.id,
+            'dessert': dessert.id,
+        })
+        self.assertEqual(new_ids, [dessert.id])
+
+    def test_get_or_create_by_names_race(self):
+        """Test a name created concurrently is returned, not duplicated"""
+        user = sample_user()
+        bulk_create = models.RecipeAttrQuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, **kwargs):
+            models.Ingredient.objects.create(user=user, name='salt')
+            return bulk_create(queryset, objs, **kwargs)
+
+        with mock.patch.object(models.RecipeAttrQuerySet, 'bulk_create',
+                               racing_bulk_create):
+            ids, _ = models.Ingredient.objects.get_or_create_by_names(
+                user.id,
+                ['Salt', 'Pepper']
+            )
+
+        self.assertEqual(models.Ingredient.objects.filter(user=user).count(),
+                         2)
+        self.assertEqual(
+            ids['Salt'],
+            models.Ingredient.objects.get(user=user, name='salt').id
+        )
+
     def test_ingredients_str(self):
         """Test the ingredient string representation"""
         ingredient = models.Ingredient.objects.create(
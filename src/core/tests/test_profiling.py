@@ -0,0 +1,105 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib import auth
+from django.core import management
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Tag, Recipe
+from core.profiling import QueryRecorder, percentile
+
+
+class QueryRecorderTests(TestCase):
+    """Test recording the queries run by a block of code"""
+
+    def test_records_queries(self):
+        """Test every query is recorded with its duration"""
+        with QueryRecorder() as recorder:
+            list(Tag.objects.all())
+            Recipe.objects.count()
+
+        self.assertEqual(recorder.count, 2)
+        self.assertIn('core_tag', recorder.queries[0]['sql'])
+        self.assertEqual(recorder.queries[0]['alias'], 'default')
+        self.assertGreaterEqual(recorder.time, 0)
+
+    def test_stops_recording(self):
+        """Test queries run after the block are not recorded"""
+        with QueryRecorder() as recorder:
+            Tag.objects.count()
+        Tag.objects.count()
+
+        self.assertEqual(recorder.count, 1)
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_percentile(self):
+        """Test the nearest rank percentile"""
+        values = list(range(100, 0, -1))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+class BenchmarkApiTests(TransactionTestCase):
+    """Test the benchmark_api command"""
+
+    def benchmark(self, *args) -> str:
+        """Run a small benchmark and return its output"""
+        out = StringIO()
+        management.call_command(
+            'benchmark_api',
+            '--users', '3',
+            '--recipes', '30',
+            '--runs', '2',
+            '--warmup', '0',
+            *args,
+            stdout=out,
+            stderr=StringIO()
+        )
+        return out.getvalue()
+
+    def baseline_path(self) -> str:
+        """Return the path of a temporary baseline file"""
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.remove(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+
+    def test_benchmark_saves_baseline(self):
+        """Test the figures of each endpoint are stored as baseline"""
+        path = self.baseline_path()
+
+        out = self.benchmark('--baseline', path, '--save-baseline')
+
+        self.assertIn('recipes filtered', out)
+        with open(path) as file:
+            baseline = json.load(file)
+        self.assertEqual(baseline['vendor'], connection.vendor)
+        self.assertIn('recipes filtered cold', baseline['endpoints'])
+        self.assertEqual(
+            set(baseline['endpoints']['login']),
+            {'p50', 'p95', 'p99', 'queries', 'sql_ms', 'peak_kb'}
+        )
+        self.assertFalse(auth.get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_fails_on_regression(self):
+        """Test running more queries than the baseline fails"""
+        path = self.baseline_path()
+        self.benchmark('--baseline', path, '--save-baseline')
+        with open(path) as file:
+            baseline = json.load(file)
+        baseline['vendor'] = 'other'
+        baseline['endpoints']['recipe detail']['queries'] = 1
+        with open(path, 'w') as file:
+            json.dump(baseline, file)
+
+        with self.assertRaisesMessage(CommandError, '1 regressions'):
+            self.benchmark('--baseline', path)
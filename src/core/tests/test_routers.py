@@ -0,0 +1,138 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, UserVersion
+from core.profiling import QueryRecorder
+from core.routers import ReplicaRouter, replica_reads
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """Test routing the recipe reads to the replicas"""
+
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads outside of a request use the primary"""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_allowed_reads_use_replica(self):
+        """Test allowed reads of the recipe models use a replica"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica')
+            self.assertEqual(self.router.db_for_read(Tag), 'replica')
+            self.assertEqual(
+                self.router.db_for_read(Recipe.tags.through),
+                'replica'
+            )
+            self.assertIsNone(self.router.db_for_read(Token))
+
+    def test_writes_use_primary(self):
+        """Test writes always go to the primary"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_replicas_not_migrated(self):
+        """Test the replicas are left to replication"""
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+    @override_settings(DATABASE_REPLICAS=[f'replica{i}' for i in range(8)])
+    def test_one_replica_per_block(self):
+        """Test the reads of a block all go to the same replica"""
+        with replica_reads() as replica:
+            aliases = {
+                self.router.db_for_read(model)
+                for model in (Recipe, Tag, UserVersion) * 10
+            }
+
+        self.assertEqual(aliases, {replica})
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replica(self):
+        """Test reads use the primary when there is no replica"""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingMiddlewareTests(TestCase):
+    """Test requests read from a replica unless their client wrote"""
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # A second connection to the test database stands for the replica
+        connections.databases['replica'] = dict(
+            connections['default'].settings_dict
+        )
+        super().setUpClass()
+        if connections['replica'].vendor == 'sqlite':
+            # Do not wait on the tables locked by the test transaction
+            connections['replica'].cursor().execute(
+                'PRAGMA read_uncommitted = 1'
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def aliases(self, method: str, *args, **kwargs) -> set:
+        """Return the databases the request ran its queries on"""
+        with QueryRecorder() as recorder:
+            getattr(self.client, method)(*args, **kwargs)
+        return {query['alias'] for query in recorder.queries}
+
+    def test_reads_use_replica(self):
+        """Test listing recipes reads them from the replica"""
+        self.assertIn('replica', self.aliases('get', RECIPES_URL))
+
+    def test_version_read_from_replica(self):
+        """Test the ETag version is read along with the data it tags"""
+        with QueryRecorder() as recorder:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertIn('ETag', res)
+        versions = [
+            query['alias'] for query in recorder.queries
+            if 'core_userversion' in query['sql']
+        ]
+        self.assertEqual(versions, ['replica'])
+
+    def test_writes_pin_client_to_primary(self):
+        """Test a client reads from the primary after it wrote"""
+        payload = {'title': 'Curry', 'time_minutes': 10, 'price': '5.00'}
+
+        self.assertEqual(
+            self.aliases('post', RECIPES_URL, payload),
+            {'default'}
+        )
+        self.assertEqual(self.aliases('get', RECIPES_URL), {'default'})
+
+        other = APIClient()
+        other.force_authenticate(self.user)
+        with QueryRecorder() as recorder:
+            other.get(RECIPES_URL)
+        self.assertIn('replica', {q['alias'] for q in recorder.queries})
@@ -0,0 +1,94 @@
+from io import StringIO
+
+from django.contrib import auth
+from django.core import management
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import TestCase
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def seed(*args) -> str:
+    """Run the seed command and return its output"""
+    out = StringIO()
+    management.call_command(
+        'seed_recipes',
+        '--users', '5',
+        '--recipes', '40',
+        '--tags', '20',
+        '--ingredients', '40',
+        *args,
+        stdout=out
+    )
+    return out.getvalue()
+
+
+def snapshot() -> list:
+    """Return the seeded recipes with their tag and ingredient names"""
+    return [
+        (
+            recipe.user.email,
+            recipe.title,
+            recipe.time_minutes,
+            recipe.price,
+            sorted(tag.name for tag in recipe.tags.all()),
+            sorted(ingredient.name for ingredient in recipe.ingredients.all())
+        )
+        for recipe in Recipe.objects.select_related('user')
+        .prefetch_related('tags', 'ingredients')
+        .order_by('id')
+    ]
+
+
+class SeedRecipesTests(TestCase):
+    """Test the seed_recipes command"""
+
+    def test_seed_recipes(self):
+        """Test the requested number of users and recipes are created"""
+        out = seed('--batch-size', '7')
+
+        self.assertIn('Seeded 5 users and 40 recipes', out)
+        users = auth.get_user_model().objects.all()
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(Recipe.objects.count(), 40)
+        self.assertTrue(Tag.objects.exists())
+        self.assertTrue(Ingredient.objects.exists())
+
+    def test_seed_users_share_password(self):
+        """Test the seeded users log in with the given password"""
+        seed('--password', 'secret')
+
+        users = auth.get_user_model().objects.all()
+        self.assertEqual(len({user.password for user in users}), 1)
+        self.assertTrue(users[0].check_password('secret'))
+
+    def test_seed_links_owned_attrs(self):
+        """Test recipes only link the tags and ingredients of their owner"""
+        seed()
+
+        for field in ('tag', 'ingredient'):
+            through = getattr(Recipe, f'{field}s').through
+            self.assertTrue(through.objects.exists())
+            self.assertFalse(
+                through.objects.exclude(**{
+                    f'{field}__user': F('recipe__user')
+                }).exists()
+            )
+
+    def test_seed_deterministic(self):
+        """Test seeding twice with the same seed creates the same data"""
+        seed('--seed', '3')
+        first = snapshot()
+        auth.get_user_model().objects.all().delete()
+
+        seed('--seed', '3')
+
+        self.assertEqual(snapshot(), first)
+
+    def test_seed_already_loaded(self):
+        """Test a seed cannot be loaded twice"""
+        seed()
+
+        with self.assertRaises(CommandError):
+            seed()
@@ -0,0 +1,224 @@
+import json
+from io import StringIO
+
+from django.contrib import auth
+from django.core import management
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import stats
+from core.models import Tag, Ingredient, Recipe, RecipeStats
+from core.tests.samples import sample_recipe
+
+
+def stored(user) -> dict:
+    """Return the rollup stored for the user"""
+    return json.loads(RecipeStats.objects.get(user=user).data)
+
+
+class RecipeStatsTests(TransactionTestCase):
+    """Test the rollups are kept equal to the ones computed from scratch"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def assertConsistent(self):
+        """Assert the stored rollup is the computed one"""
+        self.assertEqual(
+            stored(self.user),
+            stats.collect([self.user.id])[self.user.id]
+        )
+
+    def test_created_and_updated_recipes(self):
+        """Test saving recipes updates the rollup"""
+        recipe = sample_recipe(self.user)
+        sample_recipe(self.user, price=7.5, time_minutes=45)
+        recipe.price = 12
+        recipe.time_minutes = 200
+        recipe.save()
+
+        self.assertConsistent()
+        data = stored(self.user)
+        self.assertEqual(data['recipes'], 2)
+        self.assertEqual(data['price_total'], '19.50')
+        self.assertEqual(data['times'], {'30': 1, '120': 1})
+
+    def test_loaded_recipe_updated(self):
+        """Test updating a loaded recipe uncounts the figures it was read"""
+        sample_recipe(self.user, price=4)
+        recipe = Recipe.objects.get(user=self.user)
+        recipe.price = 6
+        recipe.save()
+        recipe.time_minutes = 30
+        recipe.save()
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['price_total'], '6.00')
+        self.assertEqual(stored(self.user)['times'], {'30': 1})
+
+    def test_linked_and_unlinked_attrs(self):
+        """Test adding, removing and clearing links updates the rollup"""
+        first, second = sample_recipe(self.user), sample_recipe(self.user)
+        first.tags.add(self.vegan, self.dessert)
+        second.tags.add(self.vegan)
+        second.ingredients.add(self.salt)
+        self.assertEqual(stored(self.user)['tags'], {
+            str(self.vegan.id): ['Vegan', 2],
+            str(self.dessert.id): ['Dessert', 1],
+        })
+
+        first.tags.remove(self.dessert, self.dessert.id + 100)
+        self.vegan.recipe_set.remove(second)
+        self.salt.recipe_set.add(first)
+        second.ingredients.clear()
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['ingredients'], {
+            str(self.salt.id): ['Salt', 1],
+        })
+
+    def test_deleted_recipes_and_attrs(self):
+        """Test deleting recipes, tags and ingredients updates the rollup"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan, self.dessert)
+        other = sample_recipe(self.user, price=2)
+        other.tags.add(self.vegan)
+        other.ingredients.add(self.salt)
+
+        recipe.delete()
+        self.salt.delete()
+        self.vegan.name = 'Plant based'
+        self.vegan.save()
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['tags'], {
+            str(self.vegan.id): ['Plant based', 1],
+        })
+
+    def test_bulk_created_recipes(self):
+        """Test recipes created in bulk are counted"""
+        sample_recipe(self.user)
+        Recipe.objects.bulk_create_with_relations(
+            [Recipe(user=self.user, title='Bulk', time_minutes=20, price=3)],
+            [[self.vegan.id]],
+            [[]]
+        )
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['recipes'], 2)
+
+    def test_changes_applied_once_on_commit(self):
+        """Test a transaction's changes are applied to the rollup at once"""
+        sample_recipe(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                recipe = sample_recipe(self.user, price=2)
+                recipe.tags.add(self.vegan, self.dessert)
+                recipe.ingredients.add(self.salt)
+                self.assertEqual(stored(self.user)['recipes'], 1)
+
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "core_recipestats"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['recipes'], 2)
+
+    def test_rolled_back_changes_dropped(self):
+        """Test the changes of rolled back savepoints are not applied"""
+        sample_recipe(self.user)
+        with transaction.atomic():
+            sample_recipe(self.user, price=2)
+            try:
+                with transaction.atomic():
+                    sample_recipe(self.user, price=3).tags.add(self.vegan)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['price_total'], '7.00')
+        self.assertEqual(stored(self.user)['tags'], {})
+
+    def test_bulk_and_single_writes_counted_once(self):
+        """Test a transaction writing in bulk rebuilds the rollup instead"""
+        sample_recipe(self.user)
+        with transaction.atomic():
+            sample_recipe(self.user, price=2).tags.add(self.vegan)
+            Recipe.objects.bulk_create_with_relations(
+                [Recipe(user=self.user, title='Bulk', time_minutes=20,
+                        price=3)],
+                [[self.vegan.id]],
+                [[]]
+            )
+            sample_recipe(self.user, price=4)
+
+        self.assertConsistent()
+        self.assertEqual(stored(self.user)['recipes'], 4)
+
+    def test_missing_rollup_computed(self):
+        """Test a user without a rollup gets the one computed on read"""
+        sample_recipe(self.user).tags.add(self.vegan)
+        RecipeStats.objects.all().delete()
+
+        self.assertEqual(stats.read(self.user.id)['recipes'], 1)
+        self.assertConsistent()
+
+    def test_summary(self):
+        """Test the percentiles, histogram and top attrs of a rollup"""
+        for price in (1, 2, 3, 4, 10):
+            sample_recipe(self.user, price=price, time_minutes=price * 10)
+        Recipe.objects.get(price=10).tags.add(self.dessert)
+        Recipe.objects.get(price=1).tags.add(self.vegan)
+        Recipe.objects.get(price=2).tags.add(self.vegan)
+
+        summary = stats.summary(stats.read(self.user.id), top=1)
+
+        self.assertEqual(summary['recipes'], 5)
+        self.assertEqual(summary['price'], {
+            'average': '4.00',
+            'min': '1.00',
+            'p50': '3.00',
+            'p90': '10.00',
+            'max': '10.00',
+        })
+        self.assertEqual(
+            [bucket['recipes'] for bucket in summary['time_minutes']],
+            [1, 1, 2, 1, 0]
+        )
+        self.assertEqual(summary['time_minutes'][-1]['max'], None)
+        self.assertEqual(summary['tags'], [
+            {'id': self.vegan.id, 'name': 'Vegan', 'recipes': 2},
+        ])
+
+
+class RebuildRecipeStatsTests(TransactionTestCase):
+    """Test the command rebuilding the rollups"""
+
+    def test_rebuild_recipe_stats(self):
+        """Test the rollups are recomputed from the recipes"""
+        user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        sample_recipe(user)
+        sample_recipe(user, price=3)
+        RecipeStats.objects.filter(user=user).update(data=json.dumps(
+            stats.empty()
+        ))
+
+        out = StringIO()
+        management.call_command('rebuild_recipe_stats', stdout=out)
+
+        self.assertIn('1 users', out.getvalue())
+
+        self.assertEqual(stored(user)['recipes'], 2)
+        self.assertEqual(stored(user)['price_total'], '8.00')
@@ -0,0 +1,29 @@
+import time
+
+from django.db import connections
+from django.db.utils import DatabaseError
+from django.http import JsonResponse
+
+
+def health(request):
+    """Report whether the databases answer, and their round-trip latency"""
+    databases = {}
+    for connection in connections.all():
+        start = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        except DatabaseError:
+            databases[connection.alias] = {'status': 'unavailable'}
+            continue
+        databases[connection.alias] = {
+            'status': 'ok',
+            'latency_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    healthy = all(db['status'] == 'ok' for db in databases.values())
+    return JsonResponse(
+        {'status': 'ok' if healthy else 'unavailable', 'databases': databases},
+        status=200 if healthy else 503
+    )
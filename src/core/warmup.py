@@ -0,0 +1,53 @@
+"""
+Warm-up of a new server process, run when the WSGI application loads
+with WARM_UP_ON_LOAD set, or after the fork from the server's hooks.
+
+The first requests of a process would otherwise import the URL
+configuration and the views, build the fields of the serializers and
+load the database drivers. The connections are thread-local, so those
+opened to check the databases are closed again rather than left to a
+thread that does not serve the requests, or to a forked worker.
+"""
+import logging
+
+from django.db import connections
+from django.db.utils import OperationalError
+from django.urls import get_resolver
+
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+
+def _subclasses(cls):
+    """Yield the subclasses of a class, recursively"""
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def warm_up():
+    """Check the databases and build the URLs and serializers"""
+    for connection in connections.all():
+        if connection.connection is not None:
+            continue
+        try:
+            connection.ensure_connection()
+        except OperationalError:
+            logger.warning('Could not connect to %s', connection.alias)
+        finally:
+            connection.close()
+
+    # Populating the resolver imports the views, and so the serializers
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.namespace_dict
+
+    for serializer_class in set(_subclasses(serializers.Serializer)):
+        if serializer_class.__module__.startswith('rest_framework.'):
+            continue
+        try:
+            serializer_class().fields
+        except Exception:
+            logger.debug('Could not build %s', serializer_class.__name__,
+                         exc_info=True)
@@ -0,0 +1,140 @@
+"""
+Prefix autocomplete of the tag and ingredient names.
+
+Matches are ranked by the number of recipes using them. They are read
+from the database, where a (user_id, LOWER(name) text_pattern_ops) index
+backs the prefix match on Postgres, or, with RECIPE_ATTR_PREFIX_INDEX
+set, from an in-process index of the user's names. An index is valid for
+the version of the user's recipe data it was built at; the attrs saved
+or deleted by this process are applied to it in place, and any other
+change rebuilds it on the next lookup.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+from core.models import UserVersion
+
+
+def _rank(item) -> tuple:
+    """Sort key of a match: most used first, then by name"""
+    pk, name, uses = item
+    return -uses, name, pk
+
+
+def query_matches(model, user_id: int, prefix: str, limit: int) -> list:
+    """Return the user's most used attrs whose name starts with prefix"""
+    return list(
+        model.objects
+        .annotate(name_lower=Lower('name'))
+        .filter(user_id=user_id, name_lower__startswith=prefix.lower())
+        .annotate(uses=Count('recipe'))
+        .order_by('-uses', 'name', 'id')
+        .values('id', 'name')[:limit]
+    )
+
+
+class UserNames:
+    """Names of a user's attrs, sorted for prefix lookups"""
+
+    def __init__(self, version: int, rows):
+        self.version = version
+        self.items = {pk: (name, uses) for pk, name, uses in rows}
+        self.keys = sorted(
+            (name.lower(), pk) for pk, (name, _) in self.items.items()
+        )
+
+    def matches(self, prefix: str, limit: int) -> list:
+        prefix = prefix.lower()
+        found = []
+        for index in range(bisect_left(self.keys, (prefix,)), len(self.keys)):
+            key, pk = self.keys[index]
+            if not key.startswith(prefix):
+                break
+            found.append((pk, *self.items[pk]))
+        return [
+            {'id': pk, 'name': name}
+            for pk, name, _ in heapq.nsmallest(limit, found, key=_rank)
+        ]
+
+    def save(self, pk: int, name: str):
+        """Add or rename an attr, keeping its uses"""
+        uses = self.delete(pk)
+        self.items[pk] = (name, uses)
+        insort(self.keys, (name.lower(), pk))
+
+    def delete(self, pk: int) -> int:
+        """Remove an attr and return its uses"""
+        name, uses = self.items.pop(pk, (None, 0))
+        if name is not None:
+            self.keys.pop(bisect_left(self.keys, (name.lower(), pk)))
+        return uses
+
+
+class PrefixIndex:
+    """Thread safe LRU of the names of the recently seen users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def matches(self, model, user_id: int, prefix: str, limit: int) -> list:
+        """Return the user's most used attrs whose name starts with prefix"""
+        version = UserVersion.objects.current(user_id)
+        key = (model._meta.label_lower, user_id)
+        with self._lock:
+            names = self._users.get(key)
+            if names is not None and names.version == version:
+                self._users.move_to_end(key)
+                return names.matches(prefix, limit)
+
+        rows = model.objects.filter(user_id=user_id) \
+            .annotate(uses=Count('recipe')) \
+            .values_list('id', 'name', 'uses')
+        names = UserNames(version, rows)
+        with self._lock:
+            self._users[key] = names
+            while len(self._users) > settings.RECIPE_ATTR_PREFIX_INDEX_SIZE:
+                self._users.popitem(last=False)
+            return names.matches(prefix, limit)
+
+    def update(self, instance, deleted: bool = False):
+        """
+        Apply a committed save or deletion to the index of its user.
+
+        Its transaction bumped the user's version once, which the index
+        adopts when it was up to date before; otherwise it is dropped.
+        """
+        key = (instance._meta.label_lower, instance.user_id)
+        version = UserVersion.objects.current(instance.user_id)
+        with self._lock:
+            names = self._users.get(key)
+            if names is None:
+                return
+            if names.version + 1 != version:
+                del self._users[key]
+                return
+            if deleted:
+                names.delete(instance.pk)
+            else:
+                names.save(instance.pk, instance.name)
+            names.version = version
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+prefix_index = PrefixIndex()
+
+
+def autocomplete(model, user_id: int, prefix: str, limit: int) -> list:
+    """Return the user's most used attrs whose name starts with prefix"""
+    if settings.RECIPE_ATTR_PREFIX_INDEX:
+        return prefix_index.matches(model, user_id, prefix, limit)
+    return query_matches(model, user_id, prefix, limit)
@@ -0,0 +1,68 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import UserVersion
+
+ASSIGNED_ONLY_CHOICES = (False, True)
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def attr_list_key(model, user_id: int, version: int,
+                  assigned_only: bool) -> str:
+    """Return the cache key of a user's list of recipe attributes"""
+    name = model._meta.model_name
+    return f'recipes:{name}-list:{user_id}:{version}:{int(assigned_only)}'
+
+
+def get_attr_list(model, user_id: int, assigned_only: bool, build):
+    """
+    Return the cached attr list, building and caching it on a miss.
+
+    The lists are cached at the version of the user's recipe data, which
+    each committed change to them bumps, so that every process stops
+    serving them at once. The version is read before the rows: a list
+    built from the rows a commit is changing is kept under the version
+    that commit bumps past.
+    """
+    version = UserVersion.objects.current(user_id)
+    key = attr_list_key(model, user_id, version, assigned_only)
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+
+    _count('misses')
+    data = list(build())
+    cache.set(key, data, settings.RECIPE_ATTR_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_attr_lists(model, user_id: int,
+                          assigned_only=ASSIGNED_ONLY_CHOICES):
+    """Drop the attr lists cached at the user's current version"""
+    version = UserVersion.objects.current(user_id)
+    cache.delete_many([
+        attr_list_key(model, user_id, version, choice)
+        for choice in assigned_only
+    ])
+
+
+def cache_stats() -> dict:
+    """Return the hit and miss counters of this process"""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_cache_stats():
+    """Reset the hit and miss counters of this process"""
+    with _lock:
+        _stats.update(hits=0, misses=0)
+
+
+def _count(counter: str):
+    with _lock:
+        _stats[counter] += 1
@@ -0,0 +1,113 @@
+"""
+Denormalized list representation of the recipes.
+
+The ``card`` column of a recipe holds, as JSON, the fields of its list
+representation that do not depend on the request, with its tags and
+ingredients nested as ``expand=tags,ingredients`` gives them. With
+RECIPE_CARD_LISTS set the recipe list is rendered from the cards alone,
+without joining the relations or running the serializer.
+
+The signals in ``recipes.signals`` gather the recipes whose card a
+transaction makes stale, through a write to the recipe, its links or the
+names of its tags and ingredients, and their cards are rebuilt once it
+commits; ``check_recipe_cards`` finds and fixes stale ones.
+"""
+import json
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core import batching
+from core.models import Recipe
+from recipes.rows import represent_recipes
+from recipes.serializers import RecipeSerializer
+
+# Serializer fields held by the cards, the renditions depending on the
+# request
+CARD_FIELDS = ('id', 'title', 'time_minutes',
+               'ingredients', 'tags', 'price', 'link')
+
+RELATIONS = ('tags', 'ingredients')
+
+CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    ids = sorted(set(ids))
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+
+def dumps(card: dict) -> str:
+    return json.dumps(card, separators=(',', ':'))
+
+
+def build_cards(recipe_ids, using: str = DEFAULT_DB_ALIAS) -> dict:
+    """Return the cards of the recipes, by recipe id"""
+    serializer = RecipeSerializer(fields=CARD_FIELDS, expand=RELATIONS)
+    rows = list(
+        Recipe.objects.using(using)
+        .filter(id__in=recipe_ids)
+        .values('id', 'title', 'time_minutes', 'price', 'link')
+    )
+    cards = {}
+    for card in represent_recipes(serializer, rows, using=using):
+        # The relations are unordered, the cards sort them for stability
+        for relation in RELATIONS:
+            card[relation].sort(key=lambda item: item['id'])
+        cards[card['id']] = card
+    return cards
+
+
+def refresh_cards(recipe_ids, using: str = DEFAULT_DB_ALIAS):
+    """
+    Rebuild and store the cards of the recipes.
+
+    The recipes are locked while their cards are built, so that a card
+    built from names that a concurrent rename changes is written before
+    the rename rebuilds it again.
+    """
+    recipes = Recipe.objects.using(using)
+    for ids in _chunks(recipe_ids):
+        with transaction.atomic(using=using):
+            ids = list(
+                recipes.select_for_update()
+                .filter(id__in=ids)
+                .values_list('id', flat=True)
+            )
+            recipes.bulk_update(
+                [
+                    Recipe(id=pk, card=dumps(card))
+                    for pk, card in build_cards(ids, using).items()
+                ],
+                ['card']
+            )
+
+
+def _flush_refreshes(pending: dict, using: str):
+    refresh_cards(pending, using)
+
+
+def refresh_cards_on_commit(recipe_ids, using: str = DEFAULT_DB_ALIAS):
+    """
+    Rebuild the cards of the recipes once the transaction commits, along
+    with the other cards it makes stale
+    """
+    batching.defer(
+        _flush_refreshes,
+        lambda pending: pending.update(dict.fromkeys(recipe_ids)),
+        using
+    )
+
+
+def stale_cards(recipe_ids, using: str = DEFAULT_DB_ALIAS) -> list:
+    """Return the ids of the recipes whose card is not the built one"""
+    stale = []
+    for ids in _chunks(recipe_ids):
+        cards = build_cards(ids, using)
+        stored = Recipe.objects.using(using) \
+            .filter(id__in=ids) \
+            .values_list('id', 'card')
+        for pk, card in stored:
+            if not card or json.loads(card) != cards[pk]:
+                stale.append(pk)
+    return stale
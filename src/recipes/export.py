@@ -0,0 +1,101 @@
+"""
+Streaming export of recipes as NDJSON or CSV.
+
+Recipes are read from a server side cursor in chunks and the names of
+their tags and ingredients are fetched with one query per chunk, so the
+memory used by an export does not depend on the size of the collection.
+The CSV text cells a spreadsheet would run as a formula start with a
+quote.
+"""
+import csv
+import json
+from collections import defaultdict
+from io import StringIO
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Recipe
+
+CHUNK_SIZE = 1000
+FIELDS = ('id', 'title', 'time_minutes', 'price', 'link',
+          'tags', 'ingredients')
+NAME_SEPARATOR = ';'
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _names(relation: str, recipe_ids: list) -> dict:
+    """Return the sorted names linked to each recipe through a relation"""
+    field = Recipe._meta.get_field(relation)
+    name = f'{field.m2m_reverse_field_name()}__name'
+    rows = field.remote_field.through.objects \
+        .filter(recipe_id__in=recipe_ids) \
+        .order_by(name) \
+        .values_list('recipe_id', name)
+
+    names = defaultdict(list)
+    for recipe_id, value in rows:
+        names[recipe_id].append(value)
+    return names
+
+
+def _csv_cell(value):
+    """Quote the text a spreadsheet would otherwise run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export_chunks(queryset, chunk_size: int = None):
+    """Yield lists of recipe dicts holding their tag and ingredient names"""
+    chunk_size = chunk_size or CHUNK_SIZE
+    rows = queryset.order_by('id') \
+        .values(*FIELDS[:-2]) \
+        .iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        ids = [row['id'] for row in chunk]
+        tags = _names('tags', ids)
+        ingredients = _names('ingredients', ids)
+        for row in chunk:
+            row['tags'] = tags.get(row['id'], [])
+            row['ingredients'] = ingredients.get(row['id'], [])
+        yield chunk
+
+
+def export_ndjson(queryset, chunk_size: int = None):
+    """Yield the recipes as newline delimited JSON objects"""
+    for chunk in export_chunks(queryset, chunk_size):
+        yield ''.join(
+            json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in chunk
+        )
+
+
+def export_csv(queryset, chunk_size: int = None):
+    """Yield the recipes as CSV, joining the names of tags and ingredients"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+
+    for chunk in export_chunks(queryset, chunk_size):
+        for row in chunk:
+            row['tags'] = NAME_SEPARATOR.join(row['tags'])
+            row['ingredients'] = NAME_SEPARATOR.join(row['ingredients'])
+            writer.writerow([_csv_cell(row[field]) for field in FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', export_ndjson),
+    'csv': ('text/csv', export_csv),
+}
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+
+from core.models import Recipe, UserVersion
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': {'size': (320, 320), 'format': 'JPEG', 'ext': 'jpg'},
+    'medium': {'size': (1024, 1024), 'format': 'JPEG', 'ext': 'jpg'},
+    'webp': {'size': (1024, 1024), 'format': 'WEBP', 'ext': 'webp'},
+}
+
+
+def available_renditions() -> list:
+    """Return the renditions the installed Pillow is able to encode"""
+    return [
+        name for name, spec in RENDITIONS.items()
+        if spec['format'] != 'WEBP' or features.check('webp')
+    ]
+
+
+def rendition_name(image_name: str, rendition: str) -> str:
+    """Return the storage name of a rendition, next to the original"""
+    root, _ = os.path.splitext(image_name)
+    return f'{root}.{rendition}.{RENDITIONS[rendition]["ext"]}'
+
+
+def delete_renditions(storage, image_name: str):
+    """Delete the stored renditions of an image"""
+    for rendition in RENDITIONS:
+        storage.delete(rendition_name(image_name, rendition))
+
+
+def rendition_urls(storage, image_name: str, request=None) -> dict:
+    """Return the URLs of the renditions of an image, absolute if possible"""
+    urls = {}
+    for rendition in available_renditions():
+        url = storage.url(rendition_name(image_name, rendition))
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        urls[rendition] = url
+    return urls
+
+
+def render(original, rendition: str) -> bytes:
+    """Encode a resized copy of the image, without its metadata"""
+    spec = RENDITIONS[rendition]
+    image = original.copy()
+    image.thumbnail(spec['size'], Image.LANCZOS)
+    if spec['format'] == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, format=spec['format'], quality=85)
+    return buffer.getvalue()
+
+
+def generate_renditions(recipe_id: int) -> bool:
+    """Store the renditions of a recipe image and flag them as ready"""
+    recipe = Recipe.objects.only('id', 'user_id', 'image').get(id=recipe_id)
+    if not recipe.image:
+        return False
+
+    storage = recipe.image.storage
+    with recipe.image.open('rb') as image_file:
+        with Image.open(image_file) as original:
+            original = ImageOps.exif_transpose(original)
+            for rendition in available_renditions():
+                name = rendition_name(recipe.image.name, rendition)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(render(original, rendition)))
+
+    # The image may have been replaced while the renditions were rendered,
+    # leaving them to no recipe
+    updated = Recipe.objects.filter(id=recipe.id, image=recipe.image.name) \
+        .update(renditions_ready=True)
+    if updated:
+        UserVersion.objects.bump([recipe.user_id])
+    else:
+        delete_renditions(storage, recipe.image.name)
+    return True
+
+
+class RenditionPool:
+    """
+    Bounded pool rendering recipe images outside the request thread.
+
+    At most RECIPE_IMAGE_QUEUE_SIZE images wait or render at once; further
+    submissions are dropped and left to the backfill_renditions command.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def submit(self, recipe_id: int) -> bool:
+        """Queue the renditions of a recipe, unless the pool is full"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.RECIPE_IMAGE_WORKERS,
+                    thread_name_prefix='renditions'
+                )
+                self._slots = threading.BoundedSemaphore(
+                    settings.RECIPE_IMAGE_QUEUE_SIZE
+                )
+
+        if not self._slots.acquire(blocking=False):
+            logger.warning('Rendition queue full, skipping recipe %s',
+                           recipe_id)
+            return False
+
+        self._executor.submit(self._run, recipe_id)
+        return True
+
+    def _run(self, recipe_id: int):
+        try:
+            generate_renditions(recipe_id)
+        except Exception:
+            logger.exception('Rendering recipe %s image failed', recipe_id)
+        finally:
+            connection.close()
+            self._slots.release()
+
+
+pool = RenditionPool()
+
+
+def schedule_renditions(recipe_id: int) -> bool:
+    """Render the renditions of a recipe image in the background"""
+    return pool.submit(recipe_id)
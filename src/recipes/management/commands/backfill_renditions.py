@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Recipe
+from recipes.images import generate_renditions
+
+
+class Command(BaseCommand):
+    """Django command to render the renditions of existing recipe images"""
+    help = 'Generate the missing renditions of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions that are already marked as ready'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of images rendered in parallel'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            recipes = recipes.filter(renditions_ready=False)
+        ids = list(recipes.order_by('id').values_list('id', flat=True))
+        self.stdout.write(f'Rendering {len(ids)} recipe images...')
+
+        failed = 0
+        for recipe_id, error in zip(ids, self.render_all(ids, options)):
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe_id}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(ids) - failed} images, {failed} failed'
+        ))
+
+    def render_all(self, ids: list, options: dict):
+        """Render the images in this thread or in a pool of workers"""
+        if options['workers'] <= 1:
+            yield from map(self.render, ids)
+            return
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            yield from executor.map(self.render_in_worker, ids)
+
+    def render(self, recipe_id: int):
+        """Render one recipe image, returning the error if any"""
+        try:
+            generate_renditions(recipe_id)
+        except Exception as error:
+            return error
+        return None
+
+    def render_in_worker(self, recipe_id: int):
+        """Render one recipe image from a worker thread"""
+        try:
+            return self.render(recipe_id)
+        finally:
+            connection.close()
@@ -0,0 +1,177 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the (sort key, id) pair of the last row seen.
+
+    Each page is fetched with a range condition on the ordering columns
+    instead of an OFFSET, so deep pages cost the same as the first one as
+    long as an index on (user, sort key, id) backs the ordering.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering_fields = ('id',)
+    default_ordering = '-id'
+    rank_field = None
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.key, self.descending = self.get_ordering(request, queryset)
+        position, self.reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self._order_by(self.reverse))
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self._after(position, self.reverse)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_page_size(self, request) -> int:
+        """Return the page size requested by the client, within limits"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, queryset):
+        """
+        Return the sort key and whether it is descending.
+
+        When the queryset is annotated with the ``rank_field`` it becomes
+        both an allowed ordering and the default, best ranked first.
+        """
+        fields = self.ordering_fields
+        default = self.default_ordering
+        if self.rank_field in queryset.query.annotations:
+            fields += (self.rank_field,)
+            default = f'-{self.rank_field}'
+
+        ordering = request.query_params.get(self.ordering_query_param)
+        if not ordering or ordering.lstrip('-') not in fields:
+            ordering = default
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        """Return the position and direction encoded in the cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            value, pk = cursor['p']
+            return (value, int(pk)), bool(cursor.get('r', False))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse: bool) -> str:
+        """Return the URL of the page adjacent to the given item"""
+        value = self._value(item, self.key)
+        if isinstance(value, Decimal):
+            value = str(value)
+        cursor = {'p': [value, self._value(item, 'id')]}
+        if reverse:
+            cursor['r'] = True
+
+        encoded = b64encode(json.dumps(cursor).encode('utf-8'))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            encoded.decode('ascii')
+        )
+
+    def _value(self, item, field: str):
+        """Return a field value from a model instance or a values() row"""
+        if isinstance(item, dict):
+            return item[field]
+        return getattr(item, field)
+
+    def _order_by(self, reverse: bool) -> list:
+        """Return the ordering for a traversal in the given direction"""
+        prefix = '-' if self.descending != reverse else ''
+        if self.key == 'id':
+            return [f'{prefix}id']
+        return [f'{prefix}{self.key}', f'{prefix}id']
+
+    def _after(self, position, reverse: bool) -> Q:
+        """
+        Return the condition selecting rows past the given position.
+
+        The inclusive bound on the sort key comes first, so the planner
+        can seek the (key, id) index to it instead of scanning up to the
+        position; the disjunction then skips the rows of the position.
+        """
+        value, pk = position
+        backwards = self.descending != reverse
+        lookup = 'lt' if backwards else 'gt'
+        if self.key == 'id':
+            return Q(**{f'id__{lookup}': pk})
+        bound = 'lte' if backwards else 'gte'
+        return Q(**{f'{self.key}__{bound}': value}) & (
+            Q(**{f'{self.key}__{lookup}': value}) |
+            Q(**{f'id__{lookup}': pk})
+        )
+
+
+class RecipePagination(KeysetPagination):
+    """Keyset pagination over the recipe orderings backed by an index"""
+    ordering_fields = ('price', 'time_minutes', 'title', 'id')
+    rank_field = 'search_rank'
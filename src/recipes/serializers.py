@@ -1,9 +1,26 @@
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from core.profiling import serialization
+from core.signals import bulk_changed
+from recipes.images import rendition_urls
+
+
+class TimedRepresentationMixin:
+    """
+    Serializer mixin counting the time spent in its representations as
+    serialization in the request timings
+    """
+
+    def to_representation(self, instance):
+        with serialization(self.context.get('request')):
+            return super().to_representation(instance)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +29,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedRepresentationMixin,
+                           serializers.ModelSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
@@ -21,23 +39,131 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RenditionsField(serializers.Field):
+    """Read only field holding the URLs of the recipe image renditions"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image or not recipe.renditions_ready:
+            return None
+
+        return rendition_urls(
+            recipe.image.storage,
+            recipe.image.name,
+            self.context.get('request')
+        )
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin keeping only the ``fields`` it is given, and nesting
+    the relations named in ``expand`` with the serializer their
+    ``Meta.expandable`` entry gives.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        expandable = getattr(self.Meta, 'expandable', {})
+        for name in expand:
+            if name in self.fields and name in expandable:
+                self.fields[name] = expandable[name](many=True, read_only=True)
+
+
+class RecipeSerializer(TimedRepresentationMixin, DynamicFieldsMixin,
+                       serializers.ModelSerializer):
     """Serializer for recipe objects"""
 
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        required=False
     )
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        required=False
     )
+    ingredient_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
+    )
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        write_only=True,
+        required=False
+    )
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'time_minutes',
-                  'ingredients', 'tags', 'price', 'link')
+                  'ingredients', 'tags', 'price', 'link', 'renditions',
+                  'ingredient_names', 'tag_names')
         read_only_fields = ('id',)
+        expandable = {
+            'tags': TagSerializer,
+            'ingredients': IngredientSerializer,
+        }
+        # Write only fields linking attrs by name, and their relation
+        names = {
+            'ingredient_names': 'ingredients',
+            'tag_names': 'tags',
+        }
+
+    def link_names(self, validated_data, user_id: int):
+        """
+        Add the attrs given by name to their relation, creating the
+        missing ones; a relation only given by name is replaced.
+        """
+        for names_field, relation in self.Meta.names.items():
+            names = validated_data.pop(names_field, None)
+            if names is None:
+                continue
+
+            model = Recipe._meta.get_field(relation).related_model
+            ids, new_ids = model.objects.get_or_create_by_names(
+                user_id,
+                names
+            )
+            if new_ids:
+                bulk_changed.send(
+                    sender=model,
+                    user_ids={user_id},
+                    pks=new_ids
+                )
+            unknown = [name for name in names if name not in ids]
+            if unknown:
+                msg = _('Invalid name(s) {names} - object does not exist')
+                raise serializers.ValidationError({
+                    names_field: msg.format(names=unknown)
+                })
+            validated_data[relation] = [
+                *validated_data.get(relation, ()),
+                *(ids[name] for name in names)
+            ]
+
+    def create(self, validated_data):
+        """Create the recipe, its attrs given by name and links at once"""
+        # A caller's transaction is rolled back along with a failed write,
+        # which needs no savepoint of its own
+        with transaction.atomic(savepoint=False):
+            self.link_names(validated_data, validated_data['user'].id)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """Update the recipe, its attrs given by name and links at once"""
+        with transaction.atomic(savepoint=False):
+            self.link_names(validated_data, instance.user_id)
+            return super().update(instance, validated_data)
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -46,10 +172,76 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+class RecipeImageSerializer(TimedRepresentationMixin,
+                            serializers.ModelSerializer):
     """Serializer for the image related to the recipe"""
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'renditions')
+        read_only_fields = ('id',)
+
+
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """Serializer creating a batch of recipes with bulk inserts"""
+    max_length = 1000
+
+    def validate(self, attrs):
+        """Validate the batch size and that all tags and ingredients exist"""
+        if not attrs:
+            raise serializers.ValidationError(_('Expected a non-empty list'))
+        if len(attrs) > self.max_length:
+            msg = _('Ensure this list has at most {max_length} items')
+            raise serializers.ValidationError(
+                msg.format(max_length=self.max_length)
+            )
+
+        user = self.context['request'].user
+        for field, model in (('tags', Tag), ('ingredients', Ingredient)):
+            ids = {pk for recipe in attrs for pk in recipe[field]}
+            found = set(
+                model.objects.filter(user=user, id__in=ids)
+                .values_list('id', flat=True)
+            )
+            missing = sorted(ids - found)
+            if missing:
+                msg = _('Invalid pk(s) {pks} - object does not exist')
+                raise serializers.ValidationError({
+                    field: msg.format(pks=missing)
+                })
+
+        return attrs
+
+    def create(self, validated_data):
+        """Create the recipes and their links in a single transaction"""
+        tags = [attrs.pop('tags') for attrs in validated_data]
+        ingredients = [attrs.pop('ingredients') for attrs in validated_data]
+        recipes = [Recipe(**attrs) for attrs in validated_data]
+
+        with transaction.atomic():
+            return Recipe.objects.bulk_create_with_relations(
+                recipes,
+                tags,
+                ingredients
+            )
+
+
+class RecipeBulkSerializer(TimedRepresentationMixin,
+                           serializers.ModelSerializer):
+    """Serializer for recipes created in bulk"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'title', 'time_minutes',
+                  'ingredients', 'tags', 'price', 'link')
         read_only_fields = ('id',)
+        list_serializer_class = RecipeBulkListSerializer
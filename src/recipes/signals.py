@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_save, pre_delete, post_delete, m2m_changed
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.signals import bulk_changed
+from recipes.autocomplete import prefix_index
+from recipes.cards import CARD_FIELDS, refresh_cards_on_commit
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def update_prefix_index(sender, instance, using, signal, **kwargs):
+    """Apply a saved or deleted attr to the prefix index once committed"""
+    if not settings.RECIPE_ATTR_PREFIX_INDEX:
+        return
+    deleted = signal is post_delete
+    transaction.on_commit(
+        lambda: prefix_index.update(instance, deleted=deleted),
+        using=using
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_saved_card(sender, instance, using, update_fields, **kwargs):
+    """Rebuild the card of a saved recipe"""
+    if update_fields is None or set(update_fields) & set(CARD_FIELDS):
+        refresh_cards_on_commit([instance.id], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_linked_cards(sender, instance, action, reverse, pk_set, using,
+                         **kwargs):
+    """Rebuild the cards of the recipes whose tags or ingredients changed"""
+    if action == 'pre_clear' and reverse:
+        instance._card_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    elif not reverse:
+        refresh_cards_on_commit([instance.id], using=using)
+    elif action == 'post_clear':
+        refresh_cards_on_commit(
+            instance.__dict__.pop('_card_recipe_ids', []),
+            using=using
+        )
+    else:
+        refresh_cards_on_commit(pk_set, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed_attr_cards(sender, instance, created, using, **kwargs):
+    """Rebuild the cards of the recipes linked to a renamed attr"""
+    if not created:
+        refresh_cards_on_commit(
+            instance.recipe_set.values_list('id', flat=True),
+            using=using
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_cards(sender, instance, **kwargs):
+    """Remember the recipes linked to a tag or ingredient being deleted"""
+    instance._card_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted_attr_cards(sender, instance, using, **kwargs):
+    """Rebuild the cards of the recipes linked to a deleted attr"""
+    refresh_cards_on_commit(
+        instance.__dict__.pop('_card_recipe_ids', []),
+        using=using
+    )
+
+
+@receiver(bulk_changed, sender=Recipe)
+def refresh_bulk_cards(sender, pks, **kwargs):
+    """Build the cards of recipes written in bulk"""
+    refresh_cards_on_commit(pks)
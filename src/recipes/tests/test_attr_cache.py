@@ -0,0 +1,142 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, UserVersion
+from recipes.cache import attr_list_key, cache_stats, reset_cache_stats
+
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+
+
+class AttrListCacheTests(TransactionTestCase):
+    """Test caching of the tag and ingredient lists"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        reset_cache_stats()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=3.00
+        )
+
+    def assertCached(self, url: str, params=None):
+        """Assert the second request is served without queries"""
+        first = self.client.get(url, params)
+        with self.assertNumQueries(0):
+            second = self.client.get(url, params)
+        self.assertEqual(first.data, second.data)
+        return second
+
+    def test_list_cached(self):
+        """Test listing tags twice hits the cache"""
+        self.assertCached(TAGS_URL)
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_assigned_only_cached_separately(self):
+        """Test assigned only lists are cached under their own key"""
+        self.assertCached(TAGS_URL)
+        res = self.assertCached(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data, [])
+
+    def test_cache_per_user(self):
+        """Test a user never sees another user's cached list"""
+        self.assertCached(TAGS_URL)
+        another_user = auth.get_user_model().objects.create_user(
+            'another@example.com',
+            'pwd123'
+        )
+        self.client.force_authenticate(another_user)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_on_create_and_delete(self):
+        """Test creating and deleting a tag refreshes the list"""
+        self.assertCached(TAGS_URL)
+        lunch = Tag.objects.create(user=self.user, name='Lunch')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data), 2)
+
+        lunch.delete()
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.data), 1)
+
+    def test_invalidated_on_rename(self):
+        """Test renaming a tag refreshes the list"""
+        self.assertCached(TAGS_URL)
+        self.tag.name = 'Vegetarian'
+        self.tag.save()
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]['name'], 'Vegetarian')
+
+    def test_invalidated_on_recipe_link(self):
+        """Test linking recipes refreshes the assigned only list"""
+        self.assertCached(TAGS_URL, {'assigned_only': 1})
+        self.recipe.tags.add(self.tag)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data), 1)
+
+        self.recipe.tags.clear()
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_on_reverse_link(self):
+        """Test linking from the ingredient side refreshes the list"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.assertCached(INGREDIENTS_URL, {'assigned_only': 1})
+        salt.recipe_set.add(self.recipe)
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_invalidated_on_recipe_delete(self):
+        """Test deleting a linked recipe refreshes the assigned only list"""
+        self.recipe.tags.add(self.tag)
+        self.assertCached(TAGS_URL, {'assigned_only': 1})
+        self.recipe.delete()
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.data, [])
+
+    def test_invalidated_by_version_bump(self):
+        """Test a version bumped by another process drops the lists"""
+        self.assertCached(TAGS_URL)
+        UserVersion.objects.bump([self.user.id])
+
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 2})
+
+    def test_list_cached_before_commit_not_served(self):
+        """Test a list cached from the rows before a commit is not served"""
+        with transaction.atomic():
+            Tag.objects.create(user=self.user, name='Lunch')
+            # A concurrent read caching the list it saw before the commit
+            version = UserVersion.objects.current(self.user.id)
+            cache.set(attr_list_key(Tag, self.user.id, version, False), [])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ['Vegan', 'Lunch']
+        )
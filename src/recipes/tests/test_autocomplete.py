@@ -0,0 +1,136 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, UserVersion
+from core.tests.samples import sample_recipe
+from recipes.autocomplete import prefix_index
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipes:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipes:ingredient-autocomplete')
+
+
+class AutocompleteTests(TransactionTestCase):
+    """Test the prefix autocomplete of tags and ingredients"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        prefix_index.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Vegetarian', 'Veal', 'Dessert')
+        }
+        for _ in range(2):
+            sample_recipe(self.user).tags.add(self.tags['Vegetarian'])
+        sample_recipe(self.user).tags.add(self.tags['Veal'])
+
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        Tag.objects.create(user=other, name='Venison')
+
+    def names(self, url: str, params: dict) -> list:
+        """Return the names of the attrs completed by the request"""
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_ranked_by_uses(self):
+        """Test the matches are the most used first, then by name"""
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'}),
+            ['Vegetarian', 'Veal', 'Vegan']
+        )
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 'VEG', 'limit': 1}),
+            ['Vegetarian']
+        )
+
+    def test_prefix_required(self):
+        """Test the prefix is required"""
+        res = self.client.get(TAGS_AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ingredients(self):
+        """Test the ingredients are completed too"""
+        Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Sugar')
+
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, {'prefix': 'sa'}),
+            ['Salt']
+        )
+
+    def test_like_wildcards_escaped(self):
+        """Test the prefix is matched literally"""
+        Tag.objects.create(user=self.user, name='50% off')
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': '50%'}),
+            ['50% off']
+        )
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': '_'}),
+            []
+        )
+
+
+@override_settings(RECIPE_ATTR_PREFIX_INDEX=True)
+class PrefixIndexTests(AutocompleteTests):
+    """Test the autocomplete served from the in-process index"""
+
+    def test_index_reused(self):
+        """Test the index answers without rebuilding"""
+        self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+
+        with self.assertNumQueries(0):
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 'de'})
+
+    def test_index_rebuilt_on_change(self):
+        """Test the index is rebuilt when the user's data changed"""
+        self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+        sample_recipe(self.user).tags.add(self.tags['Vegan'])
+        sample_recipe(self.user).tags.add(self.tags['Vegan'])
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'}),
+            ['Vegan', 'Vegetarian', 'Veal']
+        )
+
+    def test_saved_attr_applied(self):
+        """Test a committed save updates the index in place"""
+        self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+        tag = self.tags['Vegetarian']
+        tag.name = 'Veggie'
+        tag.save()
+        Tag.objects.create(user=self.user, name='Velvet')
+
+        with self.assertNumQueries(0):
+            names = self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+        self.assertEqual(names, ['Veggie', 'Veal', 'Vegan', 'Velvet'])
+
+    def test_missed_change_drops_index(self):
+        """Test an index that missed a change is rebuilt"""
+        self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+        # Written by another process, which bumped the version
+        Tag.objects.bulk_create([Tag(user=self.user, name='Venison')])
+        UserVersion.objects.bump([self.user.id])
+        Tag.objects.create(user=self.user, name='Velvet')
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, {'prefix': 'ven'}),
+            ['Venison']
+        )
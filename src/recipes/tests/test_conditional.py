@@ -0,0 +1,183 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, UserVersion
+from core.tests.samples import sample_recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+
+
+class ConditionalListTests(TransactionTestCase):
+    """Test answering unchanged lists with 304 Not Modified"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(self.user)
+
+    def assertNotModified(self, url: str, params=None):
+        """Assert a second request with the ETag is answered with 304"""
+        etag = self.client.get(url, params)['ETag']
+        with self.assertNumQueries(0):
+            res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def assertModified(self, url: str, change):
+        """Assert the ETag of the list no longer matches after a change"""
+        etag = self.client.get(url)['ETag']
+        change()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_unchanged_lists_not_modified(self):
+        """Test the recipe, tag and ingredient lists are not resent"""
+        self.assertNotModified(RECIPES_URL)
+        self.assertNotModified(RECIPES_URL, {'ordering': 'title'})
+        self.assertNotModified(TAGS_URL)
+        self.assertNotModified(INGREDIENTS_URL, {'assigned_only': 1})
+
+    def test_etag_varies_with_query(self):
+        """Test a list filtered differently has another ETag"""
+        first = self.client.get(RECIPES_URL)['ETag']
+        second = self.client.get(RECIPES_URL, {'ordering': 'title'})['ETag']
+
+        self.assertNotEqual(first, second)
+
+    def test_etag_varies_with_user(self):
+        """Test users at the same version get different ETags"""
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        sample_recipe(other)
+        etag = self.client.get(RECIPES_URL)['ETag']
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_modified_by_recipe_changes(self):
+        """Test creating, updating and deleting recipes change the ETag"""
+        self.assertModified(RECIPES_URL, lambda: sample_recipe(self.user))
+        self.assertModified(
+            RECIPES_URL,
+            lambda: Recipe.objects.get(id=self.recipe.id).save()
+        )
+        self.assertModified(RECIPES_URL, self.recipe.delete)
+
+    def test_modified_by_links(self):
+        """Test linking tags and ingredients changes the ETag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        self.assertModified(RECIPES_URL, lambda: self.recipe.tags.add(tag))
+        self.assertModified(
+            RECIPES_URL,
+            lambda: ingredient.recipe_set.add(self.recipe)
+        )
+        self.assertModified(TAGS_URL, lambda: tag.delete())
+
+    def test_modified_by_bulk_create(self):
+        """Test recipes created in bulk change the ETag"""
+        self.assertModified(
+            RECIPES_URL,
+            lambda: Recipe.objects.bulk_create_with_relations(
+                [Recipe(user=self.user, title='Bulk', time_minutes=1,
+                        price=1)],
+                [[]],
+                [[]]
+            )
+        )
+
+    def test_not_modified_by_other_users(self):
+        """Test changes to another user's data keep the ETag"""
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        etag = self.client.get(RECIPES_URL)['ETag']
+        sample_recipe(other)
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class UserVersionTests(TestCase):
+    """Test the per-user version counters"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+
+    def test_bump_creates_counter(self):
+        """Test the first bump of a user creates its counter"""
+        self.assertEqual(UserVersion.objects.current(self.user.id), 0)
+
+        UserVersion.objects.bump([self.user.id])
+        UserVersion.objects.bump([self.user.id])
+
+        self.assertEqual(UserVersion.objects.current(self.user.id), 2)
+
+    def test_bump_without_create(self):
+        """Test deletions do not create counters"""
+        UserVersion.objects.bump([self.user.id], create=False)
+
+        self.assertFalse(UserVersion.objects.exists())
+
+
+class UserVersionBumpTests(TransactionTestCase):
+    """Test the versions are bumped when the changes commit"""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+
+    def test_bumped_once_per_transaction(self):
+        """Test the changes of a transaction bump the version once"""
+        with transaction.atomic():
+            recipe = sample_recipe(self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+            self.assertEqual(UserVersion.objects.current(self.user.id), 0)
+
+        self.assertEqual(UserVersion.objects.current(self.user.id), 1)
+
+    def test_rolled_back_not_bumped(self):
+        """Test a rolled back change leaves the version alone"""
+        sample_recipe(self.user)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            sample_recipe(self.user)
+            raise RuntimeError
+
+        self.assertEqual(UserVersion.objects.current(self.user.id), 1)
+
+    def test_user_deleted_with_recipes(self):
+        """Test deleting a user and their recipes leaves no counter"""
+        with transaction.atomic():
+            sample_recipe(self.user)
+            self.user.delete()
+
+        self.assertFalse(UserVersion.objects.exists())
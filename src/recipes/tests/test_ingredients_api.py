@@ -1,4 +1,5 @@
 from django.contrib import auth
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -27,6 +28,7 @@ class PrivateIngredientsAPITests(TestCase):
     """Tests the private ingredients API"""
 
     def setUp(self) -> None:
+        cache.clear()
         self.user = auth.get_user_model().objects.create_user(
             'test@example.com',
             'pwd123'
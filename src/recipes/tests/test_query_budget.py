@@ -0,0 +1,96 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import stats
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+RECIPE_STATS_URL = reverse('recipes:recipe-stats')
+
+
+def detail_url(recipe_id: int):
+    """Return recipe detail URL"""
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+class QueryBudgetTests(TestCase):
+    """Test that each endpoint runs a fixed number of queries"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = self.seed(1)[0]
+
+    def seed(self, count: int) -> list:
+        """Create recipes linked to a couple of new tags and ingredients"""
+        recipes = []
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            for j in range(2):
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f'Tag {i}-{j}')
+                )
+                recipe.ingredients.add(Ingredient.objects.create(
+                    user=self.user,
+                    name=f'Ingredient {i}-{j}'
+                ))
+            recipes.append(recipe)
+        return recipes
+
+    def assertQueryBudget(self, budget: int, url: str, params=None):
+        """Assert the endpoint query count does not grow with the data"""
+        for count in (0, 5, 20):
+            self.seed(count)
+            # The versions are only bumped on commit, so drop the cached ones
+            cache.clear()
+            with self.assertNumQueries(budget):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes prefetches tags and ingredients"""
+        # The version lookup of the ETag, then the recipes and relations
+        self.assertQueryBudget(4, RECIPES_URL)
+
+    def test_recipe_filtered_list_budget(self):
+        """Test filtering recipes prefetches tags and ingredients"""
+        tag = self.recipe.tags.first()
+        ingredient = self.recipe.ingredients.first()
+        params = {'tags': tag.id, 'ingredients': ingredient.id}
+        self.assertQueryBudget(4, RECIPES_URL, params)
+
+    def test_recipe_detail_budget(self):
+        """Test viewing a recipe prefetches tags and ingredients"""
+        self.recipe.tags.add(*Tag.objects.all())
+        self.assertQueryBudget(3, detail_url(self.recipe.id))
+
+    def test_tag_list_budget(self):
+        """Test listing tags runs the version lookup and a single query"""
+        self.assertQueryBudget(2, TAGS_URL, {'assigned_only': 1})
+
+    def test_ingredient_list_budget(self):
+        """Test listing ingredients runs the version lookup and a query"""
+        self.assertQueryBudget(2, INGREDIENTS_URL, {'assigned_only': 1})
+
+    def test_recipe_stats_budget(self):
+        """Test the stats are read from the rollup in a single query"""
+        # The rollups are updated on commit, which never comes in TestCase
+        stats.rebuild([self.user.id])
+        self.assertQueryBudget(1, RECIPE_STATS_URL)
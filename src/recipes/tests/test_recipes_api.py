@@ -11,6 +11,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.tests.samples import sample_recipe
 
 from recipes.serializers import RecipeSerializer, RecipeDetailSerializer
 
@@ -37,17 +38,6 @@ def sample_ingredient(user, name='Salt') -> Ingredient:
     return Ingredient.objects.create(user=user, name=name)
 
 
-def sample_recipe(user, **kwargs) -> Recipe:
-    """Creates a sample recipe"""
-    defaults = {
-        'title': 'Cheese burger',
-        'time_minutes': 10,
-        'price': 5.00
-    }
-    defaults.update(kwargs)
-    return Recipe.objects.create(user=user, **defaults)
-
-
 class PublicRecipeApiTests(TestCase):
     """Test unauthenticated recipe API access"""
 
@@ -82,7 +72,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Tests retrieving recipes only from the user"""
@@ -98,8 +88,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """Tests viewing a recipe detail"""
@@ -252,9 +242,9 @@ class RecipeImageUploadTests(TestCase):
 
         res = self.client.get(RECIPES_URL, payload)
 
-        self.assertIn(curry_data, res.data)
-        self.assertIn(barbecue_data, res.data)
-        self.assertNotIn(carrot_cake_data, res.data)
+        self.assertIn(curry_data, res.data['results'])
+        self.assertIn(barbecue_data, res.data['results'])
+        self.assertNotIn(carrot_cake_data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test retuning recipes with specific ingredients"""
@@ -277,6 +267,6 @@ class RecipeImageUploadTests(TestCase):
 
         res = self.client.get(RECIPES_URL, payload)
 
-        self.assertIn(curry_data, res.data)
-        self.assertIn(barbecue_data, res.data)
-        self.assertNotIn(carrot_cake_data, res.data)
+        self.assertIn(curry_data, res.data['results'])
+        self.assertIn(barbecue_data, res.data['results'])
+        self.assertNotIn(carrot_cake_data, res.data['results'])
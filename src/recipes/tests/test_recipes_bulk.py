@@ -0,0 +1,122 @@
+from django.contrib import auth
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+BULK_URL = reverse('recipes:recipe-bulk')
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test creating recipes in bulk"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def test_bulk_create(self):
+        """Test creating several recipes with their links"""
+        payload = [
+            {
+                'title': 'Sorbet',
+                'time_minutes': 20,
+                'price': '4.00',
+                'tags': [self.vegan.id, self.dessert.id],
+            },
+            {
+                'title': 'Fries',
+                'time_minutes': 15,
+                'price': '3.50',
+                'tags': [self.vegan.id],
+                'ingredients': [self.salt.id],
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data], ['Sorbet', 'Fries'])
+        sorbet = Recipe.objects.get(title='Sorbet')
+        fries = Recipe.objects.get(title='Fries')
+        self.assertEqual(sorbet.user, self.user)
+        self.assertEqual(set(sorbet.tags.all()), {self.vegan, self.dessert})
+        self.assertEqual(list(sorbet.ingredients.all()), [])
+        self.assertEqual(list(fries.ingredients.all()), [self.salt])
+        self.assertEqual(sorted(res.data[0]['tags']),
+                         sorted([self.vegan.id, self.dessert.id]))
+
+    def test_bulk_create_query_count(self):
+        """Test the links are validated with a single query per type"""
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '1.00',
+                'tags': [self.vegan.id, self.dessert.id],
+                'ingredients': [self.salt.id],
+            }
+            for i in range(20)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(BULK_URL, payload, format='json')
+        lookups = [
+            query['sql'] for query in queries
+            if '"core_tag"."user_id" =' in query['sql']
+        ]
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(lookups), 1)
+        self.assertEqual(Recipe.objects.count(), 20)
+        self.assertEqual(Recipe.tags.through.objects.count(), 40)
+
+    def test_bulk_create_other_users_tag(self):
+        """Test linking another user's tag fails and creates nothing"""
+        another_user = auth.get_user_model().objects.create_user(
+            'another@example.com',
+            'pwd123'
+        )
+        foreign = Tag.objects.create(user=another_user, name='Secret')
+        payload = [
+            {'title': 'Ok', 'time_minutes': 1, 'price': '1.00'},
+            {
+                'title': 'Not ok',
+                'time_minutes': 1,
+                'price': '1.00',
+                'tags': [self.vegan.id, foreign.id],
+            },
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_invalid_item(self):
+        """Test an invalid item rejects the whole batch"""
+        payload = [
+            {'title': 'Ok', 'time_minutes': 1, 'price': '1.00'},
+            {'title': 'Missing price', 'time_minutes': 1},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_empty(self):
+        """Test an empty batch is rejected"""
+        res = self.client.post(BULK_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
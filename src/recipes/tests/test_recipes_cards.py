@@ -0,0 +1,189 @@
+import json
+from io import StringIO
+
+from django.contrib import auth
+from django.core import management
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.samples import sample_recipe
+from recipes.cards import build_cards
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def stored_card(recipe: Recipe) -> dict:
+    """Return the card stored for the recipe"""
+    return json.loads(Recipe.objects.values_list('card', flat=True)
+                      .get(id=recipe.id))
+
+
+class RecipeCardTests(TransactionTestCase):
+    """Test the denormalized recipe cards"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tags = [Tag.objects.create(user=self.user, name=name)
+                     for name in ('Vegan', 'Dessert', 'Spicy')]
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.curry = sample_recipe(self.user, title='Curry', price=12.5,
+                                   link='https://example.com/curry')
+        self.curry.tags.add(self.tags[0], self.tags[2])
+        self.curry.ingredients.add(self.salt)
+        self.cake = sample_recipe(self.user, title='Cake', price=3)
+        self.cake.tags.add(self.tags[1])
+        Recipe.objects.filter(id=self.cake.id).update(
+            image='uploads/recipe/cake.jpg',
+            renditions_ready=True
+        )
+
+    def assertFresh(self, *recipes):
+        """Assert the stored cards are the ones built from scratch"""
+        cards = build_cards([recipe.id for recipe in recipes])
+        for recipe in recipes:
+            self.assertEqual(stored_card(recipe), cards[recipe.id])
+
+    def assertSameContent(self, params=None):
+        """Assert the card lists answer with the serializer's bytes"""
+        responses = []
+        for cards in (False, True):
+            with override_settings(RECIPE_CARD_LISTS=cards):
+                res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            responses.append(res.content)
+        self.assertEqual(responses[1], responses[0])
+
+    def test_card_content(self):
+        """Test the card holds the expanded list representation"""
+        self.assertEqual(stored_card(self.curry), {
+            'id': self.curry.id,
+            'title': 'Curry',
+            'time_minutes': 10,
+            'ingredients': [{'id': self.salt.id, 'name': 'Salt'}],
+            'tags': [
+                {'id': self.tags[0].id, 'name': 'Vegan'},
+                {'id': self.tags[2].id, 'name': 'Spicy'},
+            ],
+            'price': '12.50',
+            'link': 'https://example.com/curry',
+        })
+
+    def test_cards_refreshed_on_writes(self):
+        """Test the cards follow the recipes, links and renames"""
+        self.curry.title = 'Green curry'
+        self.curry.save()
+        self.curry.tags.remove(self.tags[0])
+        self.tags[1].recipe_set.add(self.curry)
+        self.tags[2].name = 'Hot'
+        self.tags[2].save()
+        self.salt.delete()
+        self.tags[1].recipe_set.clear()
+
+        self.assertFresh(self.curry, self.cake)
+        self.assertEqual(stored_card(self.curry)['tags'], [
+            {'id': self.tags[2].id, 'name': 'Hot'},
+        ])
+
+    def test_cards_of_api_writes(self):
+        """Test recipes created through the API get their card"""
+        res = self.client.post(RECIPES_URL, {
+            'title': 'Pie',
+            'time_minutes': 40,
+            'price': 7,
+            'tags': [self.tags[1].id],
+            'ingredients': [self.salt.id],
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        bulk = self.client.post(reverse('recipes:recipe-bulk'), [{
+            'title': 'Soup',
+            'time_minutes': 20,
+            'price': 4,
+            'tags': [self.tags[0].id],
+        }], format='json')
+        self.assertEqual(bulk.status_code, status.HTTP_201_CREATED)
+
+        self.assertFresh(
+            Recipe.objects.get(id=res.data['id']),
+            Recipe.objects.get(id=bulk.data[0]['id'])
+        )
+
+    def test_card_lists_match_serializer(self):
+        """Test the lists from the cards match the serializer"""
+        self.assertSameContent()
+        self.assertSameContent({'expand': 'tags,ingredients'})
+        self.assertSameContent({'expand': 'tags', 'ordering': '-price'})
+        self.assertSameContent({'fields': 'title,renditions,tags'})
+        self.assertSameContent({'page_size': 1})
+
+    def test_cards_refreshed_once_per_transaction(self):
+        """Test the cards of a transaction are rebuilt once on commit"""
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                self.curry.title = 'Green curry'
+                self.curry.save()
+                self.curry.tags.add(self.tags[1])
+                self.curry.ingredients.clear()
+
+        updates = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "core_recipe" SET "card"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertFresh(self.curry)
+
+    def test_uncommitted_cards_built(self):
+        """Test the lists build the cards not stored yet"""
+        Recipe.objects.filter(id=self.curry.id).update(card='')
+
+        self.assertSameContent({'expand': 'tags,ingredients'})
+
+    @override_settings(RECIPE_CARD_LISTS=True)
+    def test_card_list_skips_relations(self):
+        """Test the expanded list is read without joining the relations"""
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CheckRecipeCardsTests(TransactionTestCase):
+    """Test the command finding the stale recipe cards"""
+
+    def setUp(self) -> None:
+        user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.recipe = sample_recipe(user)
+        sample_recipe(user)
+
+    def test_fresh_cards(self):
+        """Test the command passes when every card is fresh"""
+        out = StringIO()
+        management.call_command('check_recipe_cards', stdout=out)
+
+        self.assertIn('fresh', out.getvalue())
+
+    def test_stale_cards(self):
+        """Test the command reports and fixes the stale cards"""
+        Recipe.objects.filter(id=self.recipe.id).update(title='Changed')
+
+        with self.assertRaisesMessage(CommandError, str(self.recipe.id)):
+            management.call_command('check_recipe_cards', stdout=StringIO())
+
+        management.call_command('check_recipe_cards', '--fix',
+                                stdout=StringIO())
+        self.assertEqual(stored_card(self.recipe)['title'], 'Changed')
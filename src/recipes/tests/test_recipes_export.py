@@ -0,0 +1,144 @@
+import csv
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.samples import sample_recipe
+
+EXPORT_URL = reverse('recipes:recipe-export')
+
+
+def streamed(res) -> str:
+    """Return the whole body of a streaming response"""
+    return b''.join(res.streaming_content).decode()
+
+
+class RecipeExportTests(TestCase):
+    """Test the streaming recipe export"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.recipe = sample_recipe(self.user, title='Thai curry')
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Spicy')
+        )
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Coconut milk')
+        )
+        sample_recipe(self.user, title='Plain rice')
+
+    def test_export_requires_authentication(self):
+        """Test that authentication is required to export recipes"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline delimited JSON"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in streamed(res).splitlines()]
+        self.assertEqual(rows[0], {
+            'id': self.recipe.id,
+            'title': 'Thai curry',
+            'time_minutes': 10,
+            'price': '5.00',
+            'link': '',
+            'tags': ['Spicy', 'Vegan'],
+            'ingredients': ['Coconut milk'],
+        })
+        self.assertEqual(rows[1]['title'], 'Plain rice')
+        self.assertEqual(rows[1]['tags'], [])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(streamed(res))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['title'], 'Thai curry')
+        self.assertEqual(rows[0]['tags'], 'Spicy;Vegan')
+        self.assertEqual(rows[1]['ingredients'], '')
+
+    def test_export_csv_formulas_quoted(self):
+        """Test the cells a spreadsheet would evaluate are quoted"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='=HYPERLINK("http://example.com")',
+            time_minutes=5,
+            price=1.00
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='@risk'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='-1 egg')
+        )
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        row = list(csv.DictReader(StringIO(streamed(res))))[-1]
+        self.assertEqual(row['title'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['tags'], "'@risk")
+        self.assertEqual(row['ingredients'], "'-1 egg")
+
+    def test_export_csv_empty(self):
+        """Test exporting no recipes returns the CSV header"""
+        Recipe.objects.all().delete()
+
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(
+            streamed(res).strip(),
+            'id,title,time_minutes,price,link,tags,ingredients'
+        )
+
+    def test_export_invalid_type(self):
+        """Test exporting to an unknown format fails"""
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_limited_to_user_and_filters(self):
+        """Test only the matching recipes of the user are exported"""
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        sample_recipe(other, title='Someone else curry')
+        tag = self.recipe.tags.first()
+
+        res = self.client.get(EXPORT_URL, {'tags': tag.id})
+
+        rows = [json.loads(line) for line in streamed(res).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.recipe.id])
+
+    @patch('recipes.export.CHUNK_SIZE', 2)
+    def test_export_queries_per_chunk(self):
+        """Test tags and ingredients are fetched once per chunk"""
+        for i in range(3):
+            recipe = sample_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+        res = self.client.get(EXPORT_URL)
+
+        # One read of the recipes plus two lookups for each of 3 chunks
+        with self.assertNumQueries(7):
+            lines = streamed(res).splitlines()
+        self.assertEqual(len(lines), 5)
@@ -0,0 +1,120 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.samples import sample_recipe
+from core.profiling import QueryRecorder
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def detail_url(recipe_id: int) -> str:
+    """Return recipe detail URL"""
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsetTests(TestCase):
+    """Test selecting the recipe fields with ?fields= and ?expand="""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Salt'
+        )
+        self.recipe = sample_recipe(self.user, title='Curry')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        sample_recipe(self.user, title='Soup', price=2.00)
+
+    def test_list_only_requested_fields(self):
+        """Test listing recipes with a subset of their fields"""
+        self.client.get(RECIPES_URL)
+        with QueryRecorder() as recorder:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': recipe.id, 'title': recipe.title}
+             for recipe in Recipe.objects.order_by('-id')]
+        )
+        # The recipes are read in one narrow query, without the relations
+        sql = [q['sql'] for q in recorder.queries if 'core_recipe' in q['sql']]
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn('price', sql[0])
+        self.assertNotIn('core_tag', ' '.join(sql))
+
+    def test_list_ordered_by_unrequested_field(self):
+        """Test ordering by a field that is not rendered"""
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'title', 'ordering': 'price'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'title': 'Soup'}, {'title': 'Curry'}]
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_expand_nests_relations(self):
+        """Test expanding the tags nests them in the recipes"""
+        res = self.client.get(
+            RECIPES_URL,
+            {'fields': 'id,tags,ingredients', 'expand': 'tags'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        curry = res.data['results'][-1]
+        self.assertEqual(
+            curry['tags'],
+            [{'id': self.tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(curry['ingredients'], [self.ingredient.id])
+
+    def test_unknown_fields_rejected(self):
+        """Test requesting unknown fields or relations fails"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'price'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+    def test_retrieve_only_requested_fields(self):
+        """Test retrieving a recipe with a subset of its fields"""
+        res = self.client.get(
+            detail_url(self.recipe.id),
+            {'fields': 'title,tags'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            {'title': 'Curry', 'tags': [{'id': self.tag.id, 'name': 'Vegan'}]}
+        )
+
+    def test_all_fields_by_default(self):
+        """Test the recipes keep all their fields without ?fields="""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'time_minutes', 'ingredients', 'tags', 'price',
+             'link', 'renditions']
+        )
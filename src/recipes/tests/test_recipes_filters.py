@@ -0,0 +1,94 @@
+from django.contrib import auth
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.samples import sample_recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.oil = Ingredient.objects.create(user=self.user, name='Oil')
+
+        self.salad = sample_recipe(self.user, title='Salad')
+        self.salad.tags.add(self.vegan, self.quick)
+        self.salad.ingredients.add(self.salt, self.oil)
+        self.stew = sample_recipe(self.user, title='Stew')
+        self.stew.tags.add(self.vegan)
+        self.stew.ingredients.add(self.salt)
+        self.toast = sample_recipe(self.user, title='Toast')
+        self.toast.tags.add(self.quick)
+
+    def get_titles(self, params: dict) -> list:
+        """Return the titles of the recipes matching the filters"""
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return sorted(recipe['title'] for recipe in res.data['results'])
+
+    def test_filter_any_returns_distinct_recipes(self):
+        """Test matching several tags and ingredients lists recipes once"""
+        titles = self.get_titles({
+            'tags': f'{self.vegan.id},{self.quick.id}',
+            'ingredients': f'{self.salt.id},{self.oil.id}',
+        })
+        self.assertEqual(titles, ['Salad', 'Stew'])
+
+    def test_filter_all_tags(self):
+        """Test returning recipes having every given tag"""
+        titles = self.get_titles({
+            'tags_all': f'{self.vegan.id},{self.quick.id}'
+        })
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_all_ingredients(self):
+        """Test returning recipes having every given ingredient"""
+        titles = self.get_titles({'ingredients_all': f'{self.salt.id}'})
+        self.assertEqual(titles, ['Salad', 'Stew'])
+
+    def test_filter_all_repeated_ids(self):
+        """Test repeating an id does not change the result"""
+        titles = self.get_titles({
+            'tags_all': f'{self.vegan.id},{self.vegan.id}'
+        })
+        self.assertEqual(titles, ['Salad', 'Stew'])
+
+    def test_filter_all_combined(self):
+        """Test combining the tag and ingredient filters"""
+        titles = self.get_titles({
+            'tags_all': f'{self.vegan.id}',
+            'ingredients_all': f'{self.salt.id},{self.oil.id}',
+            'tags': f'{self.quick.id}',
+        })
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_all_no_match(self):
+        """Test an id linked to no recipe returns nothing"""
+        unused = Tag.objects.create(user=self.user, name='Unused')
+        titles = self.get_titles({
+            'tags_all': f'{self.vegan.id},{unused.id}'
+        })
+        self.assertEqual(titles, [])
+
+    def test_filter_invalid_ids(self):
+        """Test ids that are not integers are rejected"""
+        for param in ('tags', 'tags_all', 'ingredients_all'):
+            res = self.client.get(RECIPES_URL, {param: f'{self.vegan.id},x'})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(param, res.data)
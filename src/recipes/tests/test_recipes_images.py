@@ -0,0 +1,178 @@
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib import auth
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipes.images import available_renditions, generate_renditions, \
+    rendition_name
+
+
+def image_upload_url(recipe_id: int):
+    """Return url for recipe image upload"""
+    return reverse('recipes:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image(size=(2000, 1000), exif=True) -> ContentFile:
+    """Return a JPEG image, tagged with camera metadata"""
+    image = Image.new('RGB', size, color='red')
+    buffer = BytesIO()
+    if exif:
+        metadata = Image.Exif()
+        metadata[0x010F] = 'Camera maker'
+        image.save(buffer, format='JPEG', exif=metadata)
+    else:
+        image.save(buffer, format='JPEG')
+    return ContentFile(buffer.getvalue(), name='photo.jpg')
+
+
+class RecipeRenditionsTests(TestCase):
+    """Test the generation of recipe image renditions"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        self.recipe.image.save('photo.jpg', sample_image())
+
+    def tearDown(self) -> None:
+        storage = self.recipe.image.storage
+        for rendition in available_renditions():
+            storage.delete(rendition_name(self.recipe.image.name, rendition))
+        self.recipe.image.delete()
+
+    def test_generate_renditions(self):
+        """Test renditions are resized, stripped and flagged as ready"""
+        self.assertTrue(generate_renditions(self.recipe.id))
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.renditions_ready)
+        storage = self.recipe.image.storage
+        for rendition in available_renditions():
+            name = rendition_name(self.recipe.image.name, rendition)
+            with storage.open(name) as image_file:
+                image = Image.open(image_file)
+                self.assertLessEqual(max(image.size), 1024)
+                self.assertEqual(len(image.getexif()), 0)
+
+        with storage.open(rendition_name(self.recipe.image.name,
+                                         'thumbnail')) as image_file:
+            self.assertEqual(Image.open(image_file).size, (320, 160))
+
+    def test_generate_renditions_replaced_image(self):
+        """Test renditions of a replaced image are not flagged as ready"""
+        original = Recipe.objects.get(id=self.recipe.id).image.name
+
+        def replace(*args, **kwargs):
+            Recipe.objects.filter(id=self.recipe.id).update(image='new.jpg')
+            return original
+
+        with patch('recipes.images.rendition_name', side_effect=replace):
+            generate_renditions(self.recipe.id)
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.renditions_ready)
+        self.recipe.image.name = original
+
+    def test_renditions_hidden_until_ready(self):
+        """Test the recipe exposes rendition URLs once they are ready"""
+        url = reverse('recipes:recipe-detail', args=[self.recipe.id])
+        res = self.client.get(url)
+        self.assertIsNone(res.data['renditions'])
+
+        generate_renditions(self.recipe.id)
+        res = self.client.get(url)
+
+        self.assertEqual(
+            set(res.data['renditions']),
+            set(available_renditions())
+        )
+        self.assertTrue(
+            res.data['renditions']['thumbnail'].startswith('http://')
+        )
+
+    @patch('recipes.views.schedule_renditions')
+    def test_upload_image_resets_renditions(self, schedule_renditions):
+        """Test uploading an image marks its renditions as pending"""
+        Recipe.objects.filter(id=self.recipe.id).update(renditions_ready=True)
+
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': sample_image(exif=False)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['renditions'])
+        self.recipe.image.delete()
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.renditions_ready)
+
+    def test_backfill_renditions(self):
+        """Test the backfill command renders the pending images"""
+        out = StringIO()
+        call_command('backfill_renditions', stdout=out)
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.renditions_ready)
+        self.assertIn('Rendered 1 images, 0 failed', out.getvalue())
+
+        out = StringIO()
+        call_command('backfill_renditions', stdout=out)
+        self.assertIn('Rendering 0 recipe images', out.getvalue())
+
+
+class RecipeImageReplacedTests(TransactionTestCase):
+    """Test replacing a recipe image once the upload commits"""
+
+    @patch('recipes.views.schedule_renditions')
+    def test_previous_renditions_deleted(self, schedule_renditions):
+        """Test the renditions of the replaced image are deleted"""
+        user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        recipe = Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.image.save('photo.jpg', sample_image())
+        previous = recipe.image
+        self.addCleanup(previous.delete, save=False)
+        generate_renditions(recipe.id)
+
+        res = client.post(
+            image_upload_url(recipe.id),
+            {'image': sample_image(exif=False)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.addCleanup(recipe.image.delete, save=False)
+        for rendition in available_renditions():
+            self.assertFalse(previous.storage.exists(
+                rendition_name(previous.name, rendition)
+            ))
@@ -0,0 +1,141 @@
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe, RecipeAttrQuerySet
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+def detail_url(recipe_id: int):
+    """Return recipe detail URL"""
+    return reverse('recipes:recipe-detail', args=[recipe_id])
+
+
+class RecipeNamesApiTests(TestCase):
+    """Test linking tags and ingredients to recipes by name"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_recipe_with_names(self):
+        """Test the missing attrs are created and the others reused"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        spicy = Tag.objects.create(user=self.user, name='Spicy')
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        Ingredient.objects.create(user=other, name='Salt')
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': 8.00,
+            'tags': [spicy.id],
+            'tag_names': ['VEGAN', 'Dinner', 'dinner'],
+            'ingredient_names': ['Salt', 'Rice'],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('tag_names', res.data)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        dinner = Tag.objects.get(user=self.user, name='Dinner')
+        self.assertEqual(set(recipe.tags.all()), {vegan, spicy, dinner})
+        self.assertEqual(
+            set(res.data['tags']),
+            {vegan.id, spicy.id, dinner.id}
+        )
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', 'user')),
+            [('Rice', self.user.id), ('Salt', self.user.id)]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_update_recipe_with_names(self):
+        """Test a relation only given by name is replaced"""
+        recipe = Recipe.objects.create(user=self.user, title='Toast',
+                                       time_minutes=5, price=1)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Bread')
+        )
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'tag_names': ['Snack']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('name', flat=True)),
+            ['Snack']
+        )
+        self.assertEqual(
+            list(recipe.ingredients.values_list('name', flat=True)),
+            ['Bread']
+        )
+
+    def test_invalid_names(self):
+        """Test blank names are refused and nothing is created"""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': 8.00,
+            'tag_names': ['Vegan', ''],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_names', res.data)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_non_ascii_names(self):
+        """Test the names are matched as the database lowers them"""
+        eclair = Tag.objects.create(user=self.user, name='Éclair')
+        payload = {
+            'title': 'Dessert',
+            'time_minutes': 30,
+            'price': 8.00,
+            'tag_names': ['Éclair', 'ÉCLAIR', 'Crème'],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        creme = Tag.objects.get(user=self.user, name='Crème')
+        self.assertEqual(set(res.data['tags']), {eclair.id, creme.id})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_names_deleted_meanwhile(self):
+        """Test a name whose attr is deleted meanwhile is refused"""
+        with patch.object(RecipeAttrQuerySet, 'get_or_create_by_names',
+                          return_value=({}, [])):
+            res = self.client.post(RECIPES_URL, {
+                'title': 'Curry',
+                'time_minutes': 30,
+                'price': 8.00,
+                'tag_names': ['Vegan'],
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Vegan', res.data['tag_names'])
+
+    def test_names_not_listed(self):
+        """Test the name fields cannot be requested in the lists"""
+        res = self.client.get(RECIPES_URL, {'fields': 'title,tag_names'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
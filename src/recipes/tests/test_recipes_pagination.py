@@ -0,0 +1,102 @@
+from django.contrib import auth
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.tests.samples import sample_recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+
+
+class RecipePaginationTests(TestCase):
+    """Test keyset pagination of the recipe list"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        prices = [3, 1, 2, 2, 5, 4, 2]
+        self.recipes = [
+            sample_recipe(self.user, title=f'Recipe {i}', price=price)
+            for i, price in enumerate(prices)
+        ]
+
+    def walk(self, params: dict) -> list:
+        """Follow the next links and return the ids of every page"""
+        pages = []
+        res = self.client.get(RECIPES_URL, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([recipe['id'] for recipe in res.data['results']])
+            if not res.data['next']:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_default_ordering_newest_first(self):
+        """Test recipes are listed by descending id by default"""
+        pages = self.walk({'page_size': 3})
+        ids = [recipe.id for recipe in reversed(self.recipes)]
+
+        self.assertEqual(pages, [ids[:3], ids[3:6], ids[6:]])
+
+    def test_ordering_with_ties(self):
+        """Test rows sharing a sort key are neither skipped nor repeated"""
+        pages = self.walk({'page_size': 2, 'ordering': 'price'})
+        expected = Recipe.objects.order_by('price', 'id') \
+            .values_list('id', flat=True)
+
+        self.assertEqual(sum(pages, []), list(expected))
+        self.assertTrue(all(len(page) <= 2 for page in pages))
+
+    def test_seekable_bound(self):
+        """Test the next page is bounded by the sort key of the position"""
+        params = {'page_size': 2, 'ordering': 'price'}
+        res = self.client.get(RECIPES_URL, params)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        page_query = next(
+            query['sql'] for query in queries.captured_queries
+            if 'LIMIT' in query['sql']
+        )
+        self.assertIn('"core_recipe"."price" >= ', page_query)
+
+    def test_descending_ordering(self):
+        """Test a descending ordering walks the rows backwards"""
+        pages = self.walk({'page_size': 2, 'ordering': '-price'})
+        expected = Recipe.objects.order_by('-price', '-id') \
+            .values_list('id', flat=True)
+
+        self.assertEqual(sum(pages, []), list(expected))
+
+    def test_previous_link(self):
+        """Test following the previous link returns the earlier page"""
+        params = {'page_size': 2, 'ordering': 'title'}
+        first = self.client.get(RECIPES_URL, params)
+        second = self.client.get(first.data['next'])
+        res = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertEqual(res.data['next'], first.data['next'])
+
+    def test_unknown_ordering_ignored(self):
+        """Test an unsupported ordering falls back to the default"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'link'})
+        ids = [recipe.id for recipe in reversed(self.recipes)]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['results']], ids)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns not found"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'garbage'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
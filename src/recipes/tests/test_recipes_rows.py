@@ -0,0 +1,82 @@
+from django.contrib import auth
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.tests.samples import sample_recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+TAGS_URL = reverse('recipes:tag-list')
+INGREDIENTS_URL = reverse('recipes:ingredient-list')
+
+
+class FastListTests(TestCase):
+    """Test rendering the lists from rows matches the serializers"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert', 'Spicy')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Salt', 'Sugar')]
+        curry = sample_recipe(self.user, title='Curry', price=12.5,
+                              link='https://example.com/curry')
+        curry.tags.add(tags[2], tags[0])
+        curry.ingredients.add(ingredients[0])
+        cake = sample_recipe(self.user, title='Cake', price=3)
+        cake.tags.add(tags[1])
+        cake.ingredients.add(*ingredients)
+        sample_recipe(self.user, title='Toast', price=0.5)
+        Recipe.objects.filter(id=cake.id).update(
+            image='uploads/recipe/cake.jpg',
+            renditions_ready=True
+        )
+
+    def assertSameContent(self, url: str, params=None):
+        """Assert the fast path answers with the serializer's bytes"""
+        responses = []
+        for fast in (False, True):
+            cache.clear()
+            with override_settings(RECIPE_FAST_LISTS=fast):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            responses.append(res.content)
+        self.assertEqual(responses[1], responses[0])
+
+    def test_recipes_match_serializer(self):
+        """Test the recipe lists from rows match the serializer"""
+        self.assertSameContent(RECIPES_URL)
+        self.assertSameContent(RECIPES_URL, {'ordering': '-price'})
+        self.assertSameContent(RECIPES_URL, {'page_size': 2})
+        self.assertSameContent(RECIPES_URL, {'fields': 'title,price'})
+        self.assertSameContent(
+            RECIPES_URL,
+            {'expand': 'tags,ingredients', 'ordering': 'title'}
+        )
+
+    def test_attrs_match_serializer(self):
+        """Test the tag and ingredient lists from rows match the serializer"""
+        self.assertSameContent(TAGS_URL)
+        self.assertSameContent(TAGS_URL, {'assigned_only': 1})
+        self.assertSameContent(INGREDIENTS_URL)
+
+    @override_settings(RECIPE_FAST_LISTS=True)
+    def test_recipes_from_rows_queries(self):
+        """Test the rows are listed with one query per relation"""
+        cache.clear()
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, {'fields': 'id,title'})
@@ -0,0 +1,137 @@
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.samples import sample_recipe
+
+RECIPES_URL = reverse('recipes:recipe-list')
+BULK_URL = reverse('recipes:recipe-bulk')
+
+
+class RecipeSearchTests(TransactionTestCase):
+    """Test full text search of recipes"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.soup = sample_recipe(self.user, title='Tomato soup')
+        self.salad = sample_recipe(self.user, title='Green salad')
+        self.tomato = Ingredient.objects.create(user=self.user, name='Tomato')
+        self.salad.ingredients.add(self.tomato)
+
+    def search(self, query: str, **params) -> list:
+        """Return the titles of the recipes matching the query"""
+        res = self.client.get(RECIPES_URL, {'search': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title(self):
+        """Test searching recipes by title"""
+        self.assertEqual(self.search('soup'), ['Tomato soup'])
+
+    def test_search_all_words(self):
+        """Test every word of the query must match"""
+        self.assertEqual(self.search('green tomato'), ['Green salad'])
+        self.assertEqual(self.search('green soup'), [])
+
+    def test_search_ranks_title_first(self):
+        """Test title matches rank above ingredient matches"""
+        self.assertEqual(self.search('tomato'), ['Tomato soup', 'Green salad'])
+
+    def test_search_explicit_ordering(self):
+        """Test an explicit ordering overrides the ranking"""
+        titles = self.search('tomato', ordering='title')
+        self.assertEqual(titles, ['Green salad', 'Tomato soup'])
+
+    def test_search_paginated_by_rank(self):
+        """Test walking the ranked results page by page"""
+        params = {'search': 'tomato', 'page_size': 1}
+        res = self.client.get(RECIPES_URL, params)
+        first = res.data['results']
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(first[0]['title'], 'Tomato soup')
+        self.assertEqual(res.data['results'][0]['title'], 'Green salad')
+        self.assertIsNone(res.data['next'])
+
+    def test_search_tag_names(self):
+        """Test searching recipes by the name of their tags"""
+        self.soup.tags.add(Tag.objects.create(user=self.user, name='Winter'))
+        self.assertEqual(self.search('winter'), ['Tomato soup'])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never returned"""
+        another_user = auth.get_user_model().objects.create_user(
+            'another@example.com',
+            'pwd123'
+        )
+        sample_recipe(another_user, title='Onion soup')
+        self.assertEqual(self.search('soup'), ['Tomato soup'])
+
+    def test_search_without_words(self):
+        """Test a query without words matches nothing"""
+        self.assertEqual(self.search('*'), [])
+
+    def test_index_follows_title_change(self):
+        """Test the index follows updated titles"""
+        self.soup.title = 'Pumpkin soup'
+        self.soup.save()
+        self.assertEqual(self.search('pumpkin'), ['Pumpkin soup'])
+        self.assertEqual(self.search('tomato'), ['Green salad'])
+
+    def test_index_updated_once_per_transaction(self):
+        """Test a recipe changed several times is reindexed on commit"""
+        with patch('core.search.update_search_index') as update:
+            with transaction.atomic():
+                recipe = sample_recipe(self.user, title='Pumpkin soup')
+                recipe.tags.add(Tag.objects.create(user=self.user, name='Hot'))
+                recipe.ingredients.add(self.tomato)
+                update.assert_not_called()
+
+        update.assert_called_once()
+        self.assertEqual(list(update.call_args[0][0]), [recipe.id])
+
+    def test_index_follows_rename_and_delete(self):
+        """Test the index follows renamed and deleted ingredients"""
+        self.tomato.name = 'Cucumber'
+        self.tomato.save()
+        self.assertEqual(self.search('cucumber'), ['Green salad'])
+
+        self.tomato.delete()
+        self.assertEqual(self.search('cucumber'), [])
+
+    def test_index_follows_unlinking(self):
+        """Test the index follows removed links, from both sides"""
+        self.salad.ingredients.remove(self.tomato)
+        self.assertEqual(self.search('tomato'), ['Tomato soup'])
+
+        self.tomato.recipe_set.add(self.salad)
+        self.tomato.recipe_set.clear()
+        self.assertEqual(self.search('tomato'), ['Tomato soup'])
+
+    def test_index_follows_bulk_create(self):
+        """Test recipes created in bulk are indexed"""
+        payload = [{
+            'title': 'Gazpacho',
+            'time_minutes': 10,
+            'price': '4.00',
+            'ingredients': [self.tomato.id],
+        }]
+        self.client.post(BULK_URL, payload, format='json')
+        self.assertIn('Gazpacho', self.search('tomato'))
+
+    def test_deleted_recipe_not_found(self):
+        """Test deleted recipes leave the index"""
+        self.soup.delete()
+        self.assertEqual(self.search('soup'), [])
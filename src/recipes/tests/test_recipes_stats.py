@@ -0,0 +1,64 @@
+from django.contrib import auth
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.tests.samples import sample_recipe
+
+RECIPE_STATS_URL = reverse('recipes:recipe-stats')
+
+
+class RecipeStatsApiTests(TransactionTestCase):
+    """Test the recipe stats endpoint"""
+
+    def setUp(self) -> None:
+        self.user = auth.get_user_model().objects.create_user(
+            'test@example.com',
+            'pwd123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        """Test that login is required for the stats"""
+        res = APIClient().get(RECIPE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats_of_own_recipes(self):
+        """Test the stats count the user's recipes only"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        sample_recipe(self.user, price=4).tags.add(tag)
+        sample_recipe(self.user, price=8, time_minutes=90)
+        other = auth.get_user_model().objects.create_user(
+            'other@example.com',
+            'pwd123'
+        )
+        sample_recipe(other, price=100)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 2)
+        self.assertEqual(res.data['price']['average'], '6.00')
+        self.assertEqual(res.data['price']['max'], '8.00')
+        self.assertEqual(
+            [bucket['recipes'] for bucket in res.data['time_minutes']],
+            [1, 0, 0, 1, 0]
+        )
+        self.assertEqual(res.data['tags'], [
+            {'id': tag.id, 'name': 'Vegan', 'recipes': 1},
+        ])
+        self.assertEqual(res.data['ingredients'], [])
+
+    def test_stats_without_recipes(self):
+        """Test the stats of a user without recipes"""
+        res = self.client.get(RECIPE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 0)
+        self.assertIsNone(res.data['price']['average'])
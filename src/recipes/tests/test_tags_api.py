@@ -1,4 +1,5 @@
 from django.contrib import auth
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
@@ -27,6 +28,7 @@ class PublicTagsApiTests(TestCase):
 class PrivateTagsApiTests(TestCase):
 
     def setUp(self) -> None:
+        cache.clear()
         self.user = auth.get_user_model().objects.create_user(
             'test@example.com',
             'pass123'
@@ -73,6 +75,27 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertTrue(exists)
 
+    def test_create_existing_tag_returns_it(self):
+        """Tests creating a tag with an existing name, in any case"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.post(TAGS_URL, {'name': 'VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, TagSerializer(tag).data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_name_taken_by_another_user(self):
+        """Tests tag names are only unique per user"""
+        another_user = auth.get_user_model().objects.create_user(
+            'another@example.com',
+            'pass123'
+        )
+        Tag.objects.create(user=another_user, name='Vegan')
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.get(id=res.data['id']).user, self.user)
+
     def test_create_tag_invalid(self):
         """Tests creating a new tag with invalid payload"""
         payload = {'name': ''}
@@ -1,79 +1,299 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from core import stats as recipe_stats
+from core.models import Tag, Ingredient, Recipe, UserVersion
+from core.profiling import serialization
+from core.search import search_recipes
+from recipes.autocomplete import autocomplete
+from recipes.cards import CARD_FIELDS, RELATIONS
+from recipes.cache import get_attr_list
+from recipes.export import EXPORT_FORMATS
+from recipes.images import delete_renditions, schedule_renditions
 from recipes.serializers import (
     TagSerializer, IngredientSerializer,
-    RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer
+    RecipeSerializer, RecipeDetailSerializer, RecipeImageSerializer,
+    RecipeBulkSerializer
 )
+from recipes.pagination import RecipePagination
+from recipes.rows import represent_cards, represent_recipes
+from users.authentication import CachedTokenAuthentication
+
+
+class ConditionalListMixin:
+    """Answer the list requests of unchanged data with 304 Not Modified"""
+
+    def list_etag(self, request) -> str:
+        """Return the ETag of the list at the user's current data version"""
+        version = UserVersion.objects.current(request.user.id)
+        key = f'{request.user.id}:{version}:{request.accepted_media_type}:' \
+            f'{request.get_full_path()}'
+        return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        """List the objects unless the client has them already"""
+        etag = self.list_etag(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if if_none_match.strip() == '*' or etag in parse_etags(if_none_match):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
 
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+
+    def _assigned_only(self) -> bool:
+        """Return whether only attrs assigned to recipes are requested"""
+        return bool(int(self.request.query_params.get('assigned_only', 0)))
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
         queryset = self.queryset
-        if assigned_only:
+        if self._assigned_only():
             queryset = queryset.filter(recipe__isnull=False)
 
         return queryset.filter(user=self.request.user) \
             .order_by('-name') \
             .distinct()
 
-    def perform_create(self, serializer):
-        """Create a new attr"""
-        serializer.save(user=self.request.user)
+    def list(self, request, *args, **kwargs):
+        """List the attrs, serving them from the per-user cache"""
+        data = get_attr_list(
+            self.queryset.model,
+            request.user.id,
+            self._assigned_only(),
+            self._list_data
+        )
+        return Response(data)
+
+    def _list_data(self):
+        """Return the representation of the listed attrs"""
+        if settings.RECIPE_FAST_LISTS:
+            fields = self.get_serializer_class().Meta.fields
+            return self.get_queryset().values(*fields)
+        return self.get_serializer(self.get_queryset(), many=True).data
+
+    def create(self, request, *args, **kwargs):
+        """Create a new attr, or return the one having the same name"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance, created = self.queryset.model.objects.get_or_create_by_name(
+            request.user,
+            serializer.validated_data['name']
+        )
+        return Response(
+            self.get_serializer(instance).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=False)
+    def autocomplete(self, request):
+        """Return the most used attrs whose name starts with ?prefix="""
+        prefix = request.query_params.get('prefix', '')
+        if not prefix:
+            raise ValidationError({'prefix': [_('This field is required.')]})
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = self.autocomplete_limit
+        limit = max(1, min(limit, self.autocomplete_max_limit))
+
+        return Response(autocomplete(
+            self.queryset.model,
+            request.user.id,
+            prefix,
+            limit
+        ))
 
 
-class TagViewSet(BaseRecipeAttrViewSet):
+class TagViewSet(ConditionalListMixin, BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(BaseRecipeAttrViewSet):
+class IngredientViewSet(ConditionalListMixin, BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+    # Recipe columns read by each serializer field
+    field_columns = {
+        'title': ('title',),
+        'time_minutes': ('time_minutes',),
+        'price': ('price',),
+        'link': ('link',),
+        'renditions': ('image', 'renditions_ready'),
+    }
+
+    def list(self, request, *args, **kwargs):
+        """
+        List the recipes from plain rows when RECIPE_FAST_LISTS or
+        RECIPE_CARD_LISTS is set, the latter reading the tags and
+        ingredients from the recipe cards
+        """
+        if not settings.RECIPE_FAST_LISTS and not settings.RECIPE_CARD_LISTS:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_serializer()
+        # Parsing the cards only pays off over joining the relations
+        cards = settings.RECIPE_CARD_LISTS and \
+            any(name in RELATIONS for name in serializer.fields)
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = {'id', 'card'} if cards else {'id'}
+        for name in serializer.fields:
+            if not cards or name not in CARD_FIELDS:
+                columns.update(self.field_columns.get(name, ()))
+        # The paginator reads the sort key of the rows to build its cursors
+        columns.add(self.paginator.get_ordering(request, queryset)[0])
+        queryset = queryset.prefetch_related(None).values(*columns)
 
-    def _params_to_ints(self, query_string):
+        rows = self.paginate_queryset(queryset)
+        represent = represent_cards if cards else represent_recipes
+        with serialization(request):
+            data = represent(serializer, rows)
+        return self.get_paginated_response(data)
+
+    def _params_to_ints(self, query_string, param: str):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in query_string.split(',')]
+        try:
+            return [int(str_id) for str_id in query_string.split(',')]
+        except ValueError:
+            msg = _('Expected a comma separated list of ids.')
+            raise ValidationError({param: [msg]})
 
     def get_queryset(self):
         """Retrieves the recipes for the current authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
         queryset = self.queryset
 
-        if tags:
-            tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+        for relation in ('tags', 'ingredients'):
+            any_ids = self.request.query_params.get(relation)
+            if any_ids:
+                ids = self._params_to_ints(any_ids, relation)
+                queryset = queryset.with_any(relation, ids)
+
+            all_ids = self.request.query_params.get(f'{relation}_all')
+            if all_ids:
+                ids = self._params_to_ints(all_ids, f'{relation}_all')
+                queryset = queryset.with_all(relation, ids)
+
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+
+        queryset = queryset.filter(user=self.request.user)
+
+        return self._prefetch_related(queryset)
+
+    def _requested(self, param: str, allowed):
+        """Return the names listed in a query parameter, if it was given"""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+
+        names = [name for name in value.split(',') if name]
+        unknown = sorted(set(names) - set(allowed))
+        if unknown:
+            msg = _('Unknown fields {names}')
+            raise ValidationError({param: [msg.format(names=unknown)]})
+        return names
+
+    def _sparse_fields(self):
+        """Return the fields requested with ?fields=, None for all"""
+        meta = RecipeSerializer.Meta
+        return self._requested(
+            'fields',
+            [name for name in meta.fields if name not in meta.names]
+        )
+
+    def _expanded_fields(self):
+        """Return the relations to nest, requested with ?expand="""
+        if self.action == 'retrieve':
+            return ('tags', 'ingredients')
+        return self._requested(
+            'expand',
+            RecipeSerializer.Meta.expandable
+        ) or ()
+
+    def _prefetch_related(self, queryset):
+        """Prefetch the relations rendered by the current action"""
+        if self.action in ('list', 'retrieve'):
+            return self._sparse(queryset)
+        elif self.action in ('update', 'partial_update', 'bulk'):
+            return queryset.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.only('id')),
+                Prefetch('ingredients', queryset=Ingredient.objects.only('id'))
+            )
+        return queryset
+
+    def _sparse(self, queryset):
+        """Load only the columns and relations of the requested fields"""
+        fields = self._sparse_fields()
+        expand = self._expanded_fields()
+        if fields is None:
+            fields = RecipeSerializer.Meta.fields
+            queryset = queryset.defer('card')
+        else:
+            columns = {'id'}
+            for name in fields:
+                columns.update(self.field_columns.get(name, ()))
+            ordering = self.request.query_params.get(
+                self.paginator.ordering_query_param,
+                ''
+            ).lstrip('-')
+            if ordering in self.paginator.ordering_fields:
+                columns.add(ordering)
+            queryset = queryset.only(*columns)
 
-        if ingredients:
-            ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+        for relation, model in (('tags', Tag), ('ingredients', Ingredient)):
+            if relation not in fields:
+                continue
+            elif relation in expand:
+                queryset = queryset.prefetch_related(relation)
+            else:
+                queryset = queryset.prefetch_related(
+                    Prefetch(relation, queryset=model.objects.only('id'))
+                )
+        return queryset
 
-        return queryset.filter(user=self.request.user)
+    def get_serializer(self, *args, **kwargs):
+        """Restrict the serializer to the requested fields"""
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self._sparse_fields())
+            kwargs.setdefault('expand', self._expanded_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -81,6 +301,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'bulk':
+            return RecipeBulkSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
@@ -97,7 +319,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            previous = recipe.image.name
+            serializer.save(renditions_ready=False)
+            transaction.on_commit(lambda: schedule_renditions(recipe.id))
+            if previous and previous != recipe.image.name:
+                storage = recipe.image.storage
+                transaction.on_commit(
+                    lambda: delete_renditions(storage, previous)
+                )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create a list of recipes with bulk inserts"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save(user=request.user)
+
+        queryset = self._prefetch_related(
+            Recipe.objects.filter(id__in=[recipe.id for recipe in recipes])
+        ).order_by('id')
+        data = RecipeSerializer(queryset, many=True).data
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        """
+        Return the statistics of all the user's recipes, read from their
+        rollup; the list filters do not apply.
+        """
+        return Response(
+            recipe_stats.summary(recipe_stats.read(request.user.id))
+        )
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """Stream all the matching recipes as NDJSON or CSV"""
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in EXPORT_FORMATS:
+            msg = _('Expected one of {types}')
+            return Response(
+                {'type': [msg.format(types=', '.join(EXPORT_FORMATS))]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        content_type, export = EXPORT_FORMATS[export_type]
+        response = StreamingHttpResponse(
+            export(self.get_queryset()),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{export_type}"'
+        return response
@@ -0,0 +1,187 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Thread safe LRU of authenticated (user, token) pairs with a TTL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+
+    def get(self, key: str):
+        """Return the cached (user, token) pair, if still fresh"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[:2]
+
+    def set(self, key: str, user, token):
+        """Cache the pair, evicting the least recently used entries"""
+        expires_at = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (user, token, expires_at)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._pop(next(iter(self._entries)))
+
+    def get_user_token(self, user_id: int):
+        """Return a fresh cached token of the user, if any"""
+        with self._lock:
+            now = time.monotonic()
+            for key in self._keys_by_user.get(user_id, ()):
+                entry = self._entries[key]
+                if entry[2] >= now:
+                    return entry[1]
+            return None
+
+    def delete(self, key: str):
+        with self._lock:
+            self._pop(key)
+
+    def delete_user(self, user_id: int):
+        """Drop every cached token of the user"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry[0].pk)
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_user[entry[0].pk]
+
+
+_tokens = TokenCache()
+
+
+def shared_cache_key(key: str) -> str:
+    """Return the shared cache key of a token, without leaking the token"""
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return f'auth-token:{digest}'
+
+
+def invalidate_token(key: str):
+    """Drop a token from the process and shared caches"""
+    _tokens.delete(key)
+    if settings.AUTH_TOKEN_SHARED_CACHE:
+        cache.delete(shared_cache_key(key))
+
+
+def invalidate_user_tokens(user_id: int):
+    """Drop every token of a user from the process and shared caches"""
+    _tokens.delete_user(user_id)
+    if settings.AUTH_TOKEN_SHARED_CACHE:
+        keys = Token.objects.filter(user_id=user_id) \
+            .values_list('key', flat=True)
+        cache.delete_many([shared_cache_key(key) for key in keys])
+
+
+def clear_token_cache():
+    """Drop every token cached by this process"""
+    _tokens.clear()
+
+
+def token_expired(token) -> bool:
+    """Return whether the token is older than the configured lifetime"""
+    if settings.AUTH_TOKEN_EXPIRE_AFTER is None:
+        return False
+    lifetime = timedelta(seconds=settings.AUTH_TOKEN_EXPIRE_AFTER)
+    return token.created < timezone.now() - lifetime
+
+
+def cache_token(key: str, user, token):
+    """Cache an authenticated pair in the shared cache, else the process"""
+    if settings.AUTH_TOKEN_SHARED_CACHE:
+        cache.set(
+            shared_cache_key(key),
+            (user, token),
+            settings.AUTH_TOKEN_CACHE_TTL
+        )
+    else:
+        _tokens.set(key, user, token)
+
+
+def get_valid_token(user) -> Token:
+    """
+    Return the user's token, replacing it when it has expired.
+
+    Without a shared cache, a token the user authenticated with recently
+    is reused from the process cache, without querying it. When
+    concurrent logins replace the same expired token, the ones losing
+    the race return the token of the winner.
+    """
+    if not settings.AUTH_TOKEN_SHARED_CACHE:
+        token = _tokens.get_user_token(user.pk)
+        if token is not None and not token_expired(token):
+            return token
+
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token):
+        token.delete()
+        try:
+            with transaction.atomic():
+                token = Token.objects.create(user=user)
+        except IntegrityError:
+            token = Token.objects.get(user=user)
+    cache_token(token.key, user, token)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers recently seen tokens.
+
+    Tokens are kept for AUTH_TOKEN_CACHE_TTL seconds in the default cache
+    when AUTH_TOKEN_SHARED_CACHE is set, so that a token revoked by any
+    process is rejected by all of them, and otherwise in an in-process
+    LRU, so most requests skip the token and user lookup. Cached entries
+    are dropped when the token is deleted or its user is saved, and each
+    request gets its own copy of the cached user.
+    """
+
+    def authenticate_credentials(self, key):
+        if settings.AUTH_TOKEN_SHARED_CACHE:
+            entry = cache.get(shared_cache_key(key))
+        else:
+            entry = _tokens.get(key)
+
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            cache_token(key, *entry)
+
+        user, token = entry
+        if token_expired(token):
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        return copy.copy(user), token
@@ -0,0 +1,106 @@
+"""
+Password verification of the logins in a bounded pool.
+
+A burst of logins would otherwise hash passwords on every request thread
+at once, starving the other requests. The hashing runs instead on at most
+LOGIN_HASH_WORKERS threads, hashlib releasing the GIL meanwhile, and the
+logins beyond LOGIN_HASH_QUEUE_SIZE waiting ones are refused with a 503.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.hashers import check_password, make_password
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions, status
+
+
+class LoginUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again later.')
+    default_code = 'login_unavailable'
+    # Sent back as the Retry-After header
+    wait = 1
+
+
+class HashingPool:
+    """Bounded pool running the password hashing off the request threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def run(self, function, *args):
+        """Return the result of the function, run in the pool"""
+        with self._lock:
+            if self._slots is None:
+                if settings.LOGIN_HASH_WORKERS > 0:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.LOGIN_HASH_WORKERS,
+                        thread_name_prefix='login'
+                    )
+                self._slots = threading.BoundedSemaphore(
+                    max(settings.LOGIN_HASH_WORKERS, 1) +
+                    settings.LOGIN_HASH_QUEUE_SIZE
+                )
+
+        if not self._slots.acquire(blocking=False):
+            raise LoginUnavailable()
+        try:
+            if self._executor is None:
+                return function(*args)
+            return self._executor.submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """Stop the workers, a new pool being started on the next run"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+            self._slots = None
+
+
+pool = HashingPool()
+
+
+def verify_password(password: str, encoded: str):
+    """Return whether the password matches, and whether to rehash it"""
+    updates = []
+    valid = check_password(password, encoded, setter=updates.append)
+    return valid, bool(updates)
+
+
+def authenticate(request, email: str, password: str):
+    """
+    Return the active user having these credentials, or None.
+
+    This is what ModelBackend does, the user being looked up on the
+    request thread and only the password hashed in the pool.
+    """
+    user_model = auth.get_user_model()
+    try:
+        user = user_model._default_manager.get_by_natural_key(email)
+    except user_model.DoesNotExist:
+        # Hash anyway, not to reveal which emails have an account
+        pool.run(make_password, password)
+        user = None
+    else:
+        valid, rehash = pool.run(verify_password, password, user.password)
+        if valid and rehash:
+            user.set_password(password)
+            user.save(update_fields=['password'])
+        if not valid or not user.is_active:
+            user = None
+
+    if user is None:
+        auth.user_login_failed.send(
+            sender=__name__,
+            credentials={'username': email},
+            request=request
+        )
+    return user
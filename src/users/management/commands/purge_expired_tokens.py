@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    """Django command to delete authentication tokens that have expired"""
+    help = 'Delete authentication tokens older than AUTH_TOKEN_EXPIRE_AFTER'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of tokens deleted per query'
+        )
+
+    def handle(self, *args, **options):
+        if settings.AUTH_TOKEN_EXPIRE_AFTER is None:
+            raise CommandError('AUTH_TOKEN_EXPIRE_AFTER is not set')
+
+        lifetime = timedelta(seconds=settings.AUTH_TOKEN_EXPIRE_AFTER)
+        expired = Token.objects.filter(created__lt=timezone.now() - lifetime)
+        purged = 0
+        while True:
+            keys = list(
+                expired.values_list('key', flat=True)[:options['batch_size']]
+            )
+            if not keys:
+                break
+            purged += Token.objects.filter(key__in=keys).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} tokens'))
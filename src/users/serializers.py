@@ -3,6 +3,9 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from users.login import authenticate
+from users.throttling import login_throttle
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
@@ -38,18 +41,19 @@ class UserLoginSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         """Validate and authenticates the user"""
+        request = self.context.get('request')
         email = attrs.get('email')
         password = attrs.get('password')
 
-        user = auth.authenticate(
-            request=self.context.get('request'),
-            username=email,
-            password=password
-        )
+        login_throttle.check(request, email)
+        user = authenticate(request, email, password)
 
         if not user:
+            login_throttle.failed(request, email)
             msg = _('Unable to authenticate with provided credentials')
             raise serializers.ValidationError(msg, code='authentication')
 
+        login_throttle.succeeded(request, email)
+
         attrs['user'] = user
         return attrs
@@ -0,0 +1,21 @@
+from django.contrib import auth
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from users.authentication import invalidate_token, invalidate_user_tokens
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """Drop a cached token when it is replaced or deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=auth.get_user_model())
+@receiver(post_delete, sender=auth.get_user_model())
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    """Drop the cached tokens of a changed, deactivated or deleted user"""
+    invalidate_user_tokens(instance.pk)
@@ -0,0 +1,166 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.core import management
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.authentication import clear_token_cache
+
+LOGIN_USER_URL = reverse('users:login')
+PROFILE_USER_URL = reverse('users:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication backend"""
+
+    def setUp(self) -> None:
+        clear_token_cache()
+        self.user = auth.get_user_model().objects.create_user(
+            email='test@example.com',
+            password='pwd1234',
+            name='Test Example'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached(self):
+        """Test a seen token is authenticated without queries"""
+        self.client.get(PROFILE_USER_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token(self):
+        """Test an unknown token is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(PROFILE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a cached token revokes it"""
+        self.client.get(PROFILE_USER_URL)
+        self.token.delete()
+
+        res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user revokes the cached token"""
+        self.client.get(PROFILE_USER_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_user_refreshed(self):
+        """Test changes to the user are visible on the next request"""
+        self.client.get(PROFILE_USER_URL)
+        self.user.name = 'New Name'
+        self.user.save()
+
+        res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_shared_cache(self):
+        """Test tokens are shared through the cache between processes"""
+        self.client.get(PROFILE_USER_URL)
+        clear_token_cache()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE=True)
+    def test_shared_cache_revocation(self):
+        """Test a token revoked by another process is rejected at once"""
+        self.client.get(PROFILE_USER_URL)
+        # Another process only drops the token from its own LRU
+        with patch('users.authentication._tokens'):
+            self.token.delete()
+
+        res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_EXPIRE_AFTER=60)
+    def test_expired_token_rejected(self):
+        """Test a token older than the lifetime is rejected"""
+        self.client.get(PROFILE_USER_URL)
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(minutes=5)
+        )
+        clear_token_cache()
+
+        res = self.client.get(PROFILE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_EXPIRE_AFTER=60)
+    def test_login_replaces_expired_token(self):
+        """Test signing in returns a new token once the old one expired"""
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(minutes=5)
+        )
+        payload = {'email': 'test@example.com', 'password': 'pwd1234'}
+
+        res = self.client.post(LOGIN_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token.key)
+        self.assertTrue(Token.objects.filter(key=res.data['token']).exists())
+
+    @override_settings(AUTH_TOKEN_EXPIRE_AFTER=60)
+    def test_concurrent_logins_replace_token_once(self):
+        """Test a login losing the race to replace the token returns it"""
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(minutes=5)
+        )
+        replaced = []
+
+        def delete_and_replace(token):
+            # A concurrent login replacing the token meanwhile
+            Token.objects.filter(key=token.key).delete()
+            replaced.append(Token.objects.create(user=self.user))
+
+        payload = {'email': 'test@example.com', 'password': 'pwd1234'}
+        with patch.object(Token, 'delete', delete_and_replace):
+            res = self.client.post(LOGIN_USER_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['token'], replaced[0].key)
+
+    @override_settings(AUTH_TOKEN_EXPIRE_AFTER=60)
+    def test_purge_expired_tokens(self):
+        """Test the purge command deletes only the expired tokens"""
+        another_user = auth.get_user_model().objects.create_user(
+            email='another@example.com',
+            password='pwd1234'
+        )
+        fresh = Token.objects.create(user=another_user)
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(minutes=5)
+        )
+
+        out = StringIO()
+        management.call_command('purge_expired_tokens', stdout=out)
+
+        self.assertIn('Purged 1 tokens', out.getvalue())
+        self.assertEqual(list(Token.objects.all()), [fresh])
@@ -0,0 +1,143 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users.authentication import clear_token_cache
+from users.login import pool
+from users.throttling import TokenBucket, login_throttle
+
+LOGIN_USER_URL = reverse('users:login')
+
+
+@override_settings(LOGIN_EMAIL_FAILURES=(2, 60), LOGIN_IP_FAILURES=(3, 60))
+class LoginTests(TestCase):
+    """Test the throttled and pooled login"""
+
+    def setUp(self) -> None:
+        clear_token_cache()
+        login_throttle.clear()
+        self.user = auth.get_user_model().objects.create_user(
+            email='test@example.com',
+            password='pwd1234'
+        )
+        self.client = APIClient()
+
+    def login(self, email='test@example.com', password='pwd1234', **extra):
+        return self.client.post(
+            LOGIN_USER_URL,
+            {'email': email, 'password': password},
+            **extra
+        )
+
+    def test_token_reused(self):
+        """Test logging in again returns the token without writes"""
+        token = self.login().data['token']
+
+        with self.assertNumQueries(1):
+            res = self.login()
+
+        self.assertEqual(res.data['token'], token)
+
+    def test_failures_throttled_per_email(self):
+        """Test repeated bad passwords are refused before hashing"""
+        for _ in range(2):
+            res = self.login(password='wrong')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch.object(pool, 'run') as run:
+            res = self.login()
+            run.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(res['Retry-After']), 0)
+
+        res = self.login(email='other@example.com', password='wrong')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failures_throttled_per_address(self):
+        """Test a client failing with many emails is refused"""
+        for index in range(3):
+            self.login(email=f'user{index}@example.com')
+
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.login(REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_success_forgives_email(self):
+        """Test a successful login forgives the failures of the email"""
+        self.login(password='wrong')
+        self.login()
+
+        res = self.login(password='wrong')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_pool_full(self):
+        """Test logins are refused while the hashing pool is full"""
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with patch.object(pool, '_slots', slots):
+            res = self.login()
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(res['Retry-After'], '1')
+
+    def test_inactive_user(self):
+        """Test inactive users cannot log in"""
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.login()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_outdated_hash_upgraded(self):
+        """Test a password hashed with an outdated hasher is rehashed"""
+        self.user.password = make_password('pwd1234', hasher='md5')
+        self.user.save()
+
+        res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+
+class TokenBucketTests(TestCase):
+    """Test the token buckets"""
+
+    @patch('time.monotonic')
+    def test_refill(self, monotonic):
+        """Test an empty bucket refills over time"""
+        monotonic.return_value = 100
+        bucket = TokenBucket(2, 10, max_keys=10)
+        bucket.take('key')
+        bucket.take('key')
+        self.assertEqual(bucket.wait('key'), 5)
+
+        monotonic.return_value = 105
+        self.assertEqual(bucket.wait('key'), 0)
+
+    def test_max_keys(self):
+        """Test the least recently used buckets are forgotten"""
+        bucket = TokenBucket(1, 60, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            bucket.take(key)
+
+        self.assertEqual(bucket.wait('a'), 0)
+        self.assertGreater(bucket.wait('c'), 0)
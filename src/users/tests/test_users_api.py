@@ -5,6 +5,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from users.throttling import login_throttle
+
 CREATE_USER_URL = reverse('users:create')
 LOGIN_USER_URL = reverse('users:login')
 PROFILE_USER_URL = reverse('users:me')
@@ -17,6 +19,7 @@ def create_user(**kwargs):
 class PublicUserApiTest(TestCase):
 
     def setUp(self) -> None:
+        login_throttle.clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from rest_framework import exceptions
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucket:
+    """
+    Thread safe token buckets, one per key, holding up to ``capacity``
+    tokens and refilled at ``capacity / period`` tokens per second.
+
+    Full buckets are forgotten and at most ``max_keys`` buckets are kept,
+    the least recently used being dropped first.
+    """
+
+    def __init__(self, capacity: int, period: float, max_keys: int):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def wait(self, key: str) -> float:
+        """Return the seconds until the bucket holds a token, 0 if it does"""
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        if tokens >= 1:
+            return 0.0
+        return (1 - tokens) / self.rate
+
+    def take(self, key: str):
+        """Take a token from the bucket, which may go empty"""
+        now = time.monotonic()
+        with self._lock:
+            tokens = max(self._tokens(key, now) - 1, 0.0)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+    def reset(self, key: str):
+        """Fill the bucket"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def _tokens(self, key: str, now: float) -> float:
+        entry = self._buckets.get(key)
+        if entry is None:
+            return self.capacity
+        tokens, updated = entry
+        tokens = min(tokens + (now - updated) * self.rate, self.capacity)
+        if tokens >= self.capacity:
+            del self._buckets[key]
+        return tokens
+
+
+class LoginThrottle:
+    """
+    Refuse the logins of an email or a client address that recently
+    failed too often, before their password is hashed.
+
+    Each failed login takes a token from the email's bucket and from the
+    address's one; LOGIN_EMAIL_FAILURES and LOGIN_IP_FAILURES give the
+    number of failures allowed and the seconds in which they are forgiven.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = None
+
+    def buckets(self) -> dict:
+        with self._lock:
+            if self._buckets is None:
+                self._buckets = {
+                    scope: TokenBucket(
+                        *failures,
+                        max_keys=settings.LOGIN_THROTTLE_MAX_KEYS
+                    )
+                    for scope, failures in (
+                        ('email', settings.LOGIN_EMAIL_FAILURES),
+                        ('ip', settings.LOGIN_IP_FAILURES),
+                    )
+                }
+            return self._buckets
+
+    def keys(self, request, email: str) -> dict:
+        """Return the bucket keys of a login attempt"""
+        return {
+            'email': email.lower(),
+            'ip': BaseThrottle().get_ident(request),
+        }
+
+    def check(self, request, email: str):
+        """Raise Throttled when the email or address must wait"""
+        buckets = self.buckets()
+        wait = max(
+            buckets[scope].wait(key)
+            for scope, key in self.keys(request, email).items()
+        )
+        if wait:
+            raise exceptions.Throttled(wait)
+
+    def failed(self, request, email: str):
+        """Count a failed login against the email and address"""
+        buckets = self.buckets()
+        for scope, key in self.keys(request, email).items():
+            buckets[scope].take(key)
+
+    def succeeded(self, request, email: str):
+        """Forgive the failed logins of the email"""
+        self.buckets()['email'].reset(self.keys(request, email)['email'])
+
+    def clear(self):
+        """Forget every failure and the settings of the buckets"""
+        with self._lock:
+            self._buckets = None
+
+
+login_throttle = LoginThrottle()
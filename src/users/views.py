@@ -1,10 +1,11 @@
 
 from rest_framework.generics import CreateAPIView, RetrieveUpdateAPIView
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from users.authentication import CachedTokenAuthentication, get_valid_token
 from users.serializers import UserSerializer, UserLoginSerializer
 
 
@@ -18,11 +19,21 @@ class LoginUserView(ObtainAuthToken):
     serializer_class = UserLoginSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        """Return the user's token, replacing it when it has expired"""
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token = get_valid_token(serializer.validated_data['user'])
+        return Response({'token': token.key})
+
 
 class ManageUserView(RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):